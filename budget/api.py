@@ -0,0 +1,79 @@
+"""
+Чтение операций в JSON (transactions_json) для клиентов и скриптов.
+
+Клиент выбирает поля параметром fields=; запрос читает только нужные
+колонки (связанные таблицы присоединяются, только если их поля запрошены)
+через values_list, без создания моделей. Строки — кортежи, поля
+преобразуются в типы JSON заранее, поэтому кодировщику не нужен default().
+Суммы передаются строками, чтобы не терять точность Decimal.
+"""
+API_FIELDS = {
+    # имя в ответе: (поле для values_list, преобразование в тип JSON)
+    'id': ('id', None),
+    'date': ('date', lambda value: value.isoformat()),
+    'amount': ('amount', str),
+    'amount_base': ('amount_base', str),
+    'currency': ('currency__code', None),
+    'category': ('category_id', None),
+    'category_name': ('category__name', None),
+    'is_income': ('category__is_income', None),
+    'description': ('description', None),
+}
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+
+def parse_fields(value):
+    """Список полей из параметра fields=; без параметра — все поля"""
+    if not value:
+        return list(API_FIELDS)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    if not fields:
+        raise ValueError(f'fields: не указано ни одного поля; доступны: {", ".join(API_FIELDS)}')
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise ValueError(f'неизвестные поля: {", ".join(unknown)}; доступны: {", ".join(API_FIELDS)}')
+    return fields
+
+
+def parse_per_page(value):
+    if not value:
+        return DEFAULT_PER_PAGE
+    try:
+        per_page = int(value)
+    except ValueError:
+        per_page = 0
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        raise ValueError(f'per_page — число от 1 до {MAX_PER_PAGE}')
+    return per_page
+
+
+def columns(fields, ordering):
+    """Колонки values_list: запрошенные поля и поля порядка для курсора страницы"""
+    result = [API_FIELDS[name][0] for name in fields]
+    for name in ordering:
+        name = name.lstrip('-')
+        if name not in result:
+            result.append(name)
+    return result
+
+
+def serialize(rows, fields, columns):
+    """Словари ответа из кортежей values_list с колонками columns"""
+    plain = []
+    converted = []
+    for name in fields:
+        column, convert = API_FIELDS[name]
+        index = columns.index(column)
+        if convert is None:
+            plain.append((name, index))
+        else:
+            converted.append((name, index, convert))
+    result = []
+    for row in rows:
+        item = {name: row[index] for name, index in plain}
+        for name, index, convert in converted:
+            value = row[index]
+            item[name] = None if value is None else convert(value)
+        result.append(item)
+    return result
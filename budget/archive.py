@@ -0,0 +1,199 @@
+"""
+Архив старых операций (команда archive_transactions).
+
+Операции месяцев старше ARCHIVE_AFTER_MONTHS переносятся из budget_transaction
+в TransactionArchive: запись на пользователя и месяц (и ещё одна при
+повторной архивации) с gzip-сжатым JSON-списком строк и итогами по
+категории и валюте. Индексы и выборки таблицы операций больше не проходят
+по этим строкам.
+
+Отчёты читают MonthlyRollup, который при архивации не меняется (строки
+удаляются SQL-запросом, без сигналов), поэтому monthly_summary и аналитика
+остаются прежними. Версия данных пользователя (report_cache) всё равно
+меняется, иначе список операций отдавал бы прежний ETag.
+rollups.rebuild() добавляет к итогам живых операций итоги из архива.
+Итоги и строки удалённых позже категорий не учитываются, как если бы
+операции удалились каскадом. Пересчёт amount_base (recompute_amount_base)
+архив не затрагивает.
+
+Выгрузка CSV с архивом читает его по месяцам; restore_month() возвращает
+операции месяца в таблицу с прежними id.
+"""
+import gzip
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import connection, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import currency_cache, report_cache
+from .dates import add_months, month_start
+from .models import Category, RecurringTransaction, Transaction, TransactionArchive
+
+ARCHIVE_AFTER_MONTHS = 24
+COLUMNS = ('id', 'date', 'category_id', 'currency_id', 'amount', 'amount_base',
+           'recurring_id', 'description')
+EXPORT_CHUNK_SIZE = 12
+CENT = Decimal('0.01')
+
+
+@dataclass
+class ArchiveReport:
+    months: int = 0
+    transactions: int = 0
+
+
+def cutoff(today=None, months=ARCHIVE_AFTER_MONTHS):
+    """Первый месяц, который остаётся в таблице операций"""
+    return add_months(month_start(today or date.today()), -months)
+
+
+def encode(rows):
+    return gzip.compress(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode())
+
+
+def decode(data):
+    """Строки архива словарями с полями COLUMNS"""
+    rows = json.loads(gzip.decompress(bytes(data)))
+    result = [dict(zip(COLUMNS, row)) for row in rows]
+    for row in result:
+        row['date'] = date.fromisoformat(row['date'])
+    return result
+
+
+def _cents(value):
+    """Сумма строкой с двумя знаками: SQLite возвращает из RETURNING 40, а не 40.00"""
+    return str(Decimal(str(value)).quantize(CENT))
+
+
+def _totals(rows):
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for row in rows:
+        total = totals[row[2], row[3]]
+        total[0] += Decimal(row[4])
+        total[1] += Decimal(row[5])
+        total[2] += 1
+    return [[category_id, currency_id, _cents(total), _cents(total_base), count]
+            for (category_id, currency_id), (total, total_base, count) in sorted(totals.items())]
+
+
+def archive_month(user_id, month):
+    """Переносит операции пользователя за месяц в архив; возвращает их число"""
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE user_id = %s AND date >= %s AND date < %s '
+            f'RETURNING {", ".join(COLUMNS)}',
+            [user_id, month, add_months(month, 1)],
+        )
+        rows = sorted(
+            ((id_, date.fromisoformat(str(day)), category_id, currency_id, _cents(amount),
+              _cents(amount_base), recurring_id, description)
+             for id_, day, category_id, currency_id, amount, amount_base, recurring_id, description
+             in cursor.fetchall()),
+            key=lambda row: (row[1], row[0]),
+        )
+        if not rows:
+            return 0
+        TransactionArchive.objects.create(
+            user_id=user_id,
+            month=month,
+            count=len(rows),
+            totals=_totals(rows),
+            data=encode([[id_, day.isoformat(), *rest] for id_, day, *rest in rows]),
+            created=timezone.now(),
+        )
+        # Строки ушли из таблицы без сигналов: ETag списка операций должен смениться
+        report_cache.changed([user_id])
+    return len(rows)
+
+
+def archive_transactions(before, user=None):
+    """Архивирует операции всех месяцев до before (для одного или всех пользователей)"""
+    months = Transaction.objects.filter(date__lt=month_start(before))
+    if user is not None:
+        months = months.filter(user=user)
+    months = (
+        months.annotate(month=TruncMonth('date'))
+        .values_list('user_id', 'month').distinct().order_by('user_id', 'month')
+    )
+    report = ArchiveReport()
+    # Каждый месяц — своя транзакция: блокировки строк держатся недолго
+    for user_id, month in list(months):
+        count = archive_month(user_id, month)
+        if count:
+            report.months += 1
+            report.transactions += count
+    return report
+
+
+def archived_totals(user=None):
+    """Итоги архива в формате rollups.collect(): {(user_id, month, category_id, currency_id): [...]}"""
+    archives = TransactionArchive.objects.all()
+    categories = Category.objects.all()
+    if user is not None:
+        archives = archives.filter(user=user)
+        categories = categories.filter(user=user)
+    existing = set(categories.values_list('id', flat=True))
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for user_id, month, rows in archives.values_list('user_id', 'month', 'totals').iterator():
+        for category_id, currency_id, total, total_base, count in rows:
+            if category_id in existing:
+                row = totals[user_id, month, category_id, currency_id]
+                row[0] += Decimal(total)
+                row[1] += Decimal(total_base)
+                row[2] += count
+    return totals
+
+
+def export_rows(user):
+    """
+    Строки архива для выгрузки, от новых к старым:
+    (дата, id, категория, сумма, описание, валюта, сумма в BYN)
+    """
+    names = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+    archives = (
+        TransactionArchive.objects.filter(user=user)
+        .order_by('-month').values_list('month', 'data')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for _, chunks in groupby(archives, key=lambda archive: archive[0]):
+        rows = [row for _, data in chunks for row in decode(data) if row['category_id'] in names]
+        rows.sort(key=lambda row: (row['date'], row['id']), reverse=True)
+        for row in rows:
+            currency = currency_cache.get_currency(row['currency_id'])
+            yield (row['date'], row['id'], names[row['category_id']], row['amount'],
+                   row['description'], currency.code if currency else '', row['amount_base'])
+
+
+def restore_month(user, month):
+    """Возвращает операции месяца из архива в таблицу; возвращает их число"""
+    with transaction.atomic():
+        archives = list(
+            TransactionArchive.objects.select_for_update().filter(user=user, month=month_start(month))
+        )
+        categories = set(Category.objects.filter(user=user).values_list('id', flat=True))
+        recurring = set(RecurringTransaction.objects.filter(user=user).values_list('id', flat=True))
+        # Итоги восстановленных строк уже в MonthlyRollup — bulk_create без rollups.add_transactions
+        restored = Transaction.objects.bulk_create(
+            (
+                Transaction(
+                    id=row['id'], user=user, date=row['date'], category_id=row['category_id'],
+                    currency_id=row['currency_id'], amount=Decimal(row['amount']),
+                    amount_base=Decimal(row['amount_base']), description=row['description'],
+                    recurring_id=row['recurring_id'] if row['recurring_id'] in recurring else None,
+                )
+                for archive in archives for row in decode(archive.data)
+                if row['category_id'] in categories
+            ),
+            batch_size=1000,
+        )
+        TransactionArchive.objects.filter(pk__in=[archive.pk for archive in archives]).delete()
+        if restored:
+            report_cache.changed([user.pk])
+    return len(restored)
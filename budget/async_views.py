@@ -0,0 +1,108 @@
+"""
+Асинхронные версии dashboard и данных аналитики для запуска под ASGI.
+
+Подключаются вместо синхронных при ASYNC_VIEWS = True (см. budget/urls.py).
+Независимые запросы выполняются одновременно через budget.concurrency;
+все данные для шаблона загружаются заранее, при отрисовке запросов нет.
+Под WSGI выгоды нет: каждый запрос запускал бы свой цикл событий.
+"""
+from datetime import date
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import report_cache
+from .concurrency import run_concurrently
+from .conditional import conditional_page
+from .dates import month_filter, month_start
+from .models import Budget, Category, MonthlyBudget, UserPreferences
+from .views import (
+    analytics_categories_etag, analytics_month, analytics_trend_etag,
+    get_category_breakdown, get_category_budget_data, get_category_totals,
+    get_expense_trend, get_month_totals, get_monthly_summary,
+)
+
+
+def user_loaded(view):
+    """Загружает пользователя асинхронно: дальше request.user не обращается к базе"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+@user_loaded
+@conditional_page
+async def dashboard(request):
+    user = request.user
+    today = date.today()
+
+    # Категории загружаются всегда, одновременно с остальным: проверка кеша
+    # фрагментов до отрисовки не гарантирует, что фрагмент доживёт до неё
+    preferences, categories, version = await run_concurrently(
+        lambda: UserPreferences.objects.get_or_create(user=user)[0],
+        lambda: list(Category.objects.filter(user=user).order_by('pk')),
+        lambda: report_cache.category_version(user.id),
+    )
+
+    context = {
+        'expense_categories': [c for c in categories if not c.is_income],
+        'income_categories': [c for c in categories if c.is_income],
+        'category_version': version,
+        'budget_type': preferences.budget_type,
+    }
+
+    if preferences.budget_type == 'monthly':
+        monthly_budget, totals = await run_concurrently(
+            lambda: MonthlyBudget.objects.filter(user=user, **month_filter('month', today)).first(),
+            lambda: get_month_totals(user, today),
+        )
+        if monthly_budget:
+            # Валюта берётся из кеша, который может обратиться к базе, — тоже в потоке пула
+            context['monthly_summary'], = await run_concurrently(
+                lambda: get_monthly_summary(user, monthly_budget, totals)
+            )
+    else:
+        # Итоги берутся за месяц целиком: категории бюджетов ещё неизвестны
+        budgets, totals = await run_concurrently(
+            lambda: list(Budget.objects.filter(
+                user=user, **month_filter('month', today)
+            ).select_related('category')),
+            lambda: get_category_totals(user, months=[month_start(today)]),
+        )
+        context['budget_data'], = await run_concurrently(
+            lambda: get_category_budget_data(user, budgets, totals)
+        )
+
+    return render(request, 'budget/dashboard.html', context)
+
+
+@login_required
+@user_loaded
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=analytics_categories_etag)
+async def analytics_categories(request):
+    start_date = analytics_month(request)
+    data, = await run_concurrently(lambda: report_cache.get_or_compute(
+        request.user.pk, 'analytics_categories',
+        lambda: get_category_breakdown(request.user, start_date),
+        start_date.isoformat(),
+    ))
+    return JsonResponse({'month': start_date.strftime('%Y-%m'), **data})
+
+
+@login_required
+@user_loaded
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=analytics_trend_etag)
+async def analytics_trend(request):
+    data, = await run_concurrently(lambda: report_cache.get_or_compute(
+        request.user.pk, 'analytics_trend', lambda: get_expense_trend(request.user)
+    ))
+    return JsonResponse(data)
@@ -0,0 +1,55 @@
+"""
+Нагрузочные тесты. Запуск: python manage.py benchmark <имя> [параметры].
+
+Каждый модуль пакета описывает HELP, add_arguments(parser) и run(stdout, **options).
+Все изменения в базе откатываются после прогона. Модули с ATOMIC = False
+работают с зафиксированными данными (их читают другие соединения), получают
+параметр keep и удаляют свои данные сами.
+"""
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+
+BENCHMARKS = [
+    'api',
+    'async_dashboard',
+    'connection_pool',
+    'csv_import',
+    'month_filter',
+    'monthly_summary',
+    'pages',
+    'recurring',
+    'render',
+    'search',
+]
+
+
+def create_user(prefix='bench'):
+    # Без пароля: хеширование заметно в прогонах с сотнями пользователей
+    return User.objects.create(username=f'{prefix}_{time.monotonic_ns()}')
+
+
+@contextmanager
+def timer():
+    """Замер времени: with timer() as t: ...; t.seconds"""
+    class Result:
+        seconds = 0.0
+    result = Result()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.seconds = time.perf_counter() - start
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу: percentile(times, 0.95)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(stdout, label, count, seconds, unit='строк'):
+    rate = count / seconds if seconds else float('inf')
+    stdout.write(f'{label}: {count} {unit} за {seconds:.2f} с — {rate:,.0f} {unit}/с')
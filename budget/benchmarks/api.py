@@ -0,0 +1,74 @@
+"""Скорость выдачи операций в JSON: python manage.py benchmark api"""
+import json
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from .. import api
+from ..models import Transaction
+from ..query_plans import analyze
+from ..seed import seed_user
+from . import create_user, report, timer
+
+HELP = 'Строк в секунду: модели и values_list при сериализации, весь ответ transactions_json'
+
+ORDERING = ('-date', '-id')
+
+
+def add_arguments(parser):
+    parser.add_argument('--transactions', type=int, default=100_000)
+    parser.add_argument('--per-page', type=int, default=api.MAX_PER_PAGE)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--fields', default='', help='Поля через запятую; по умолчанию все')
+
+
+def from_models(transactions, count):
+    """Как сериализовал бы представление на моделях: select_related и словарь на строку"""
+    rows = transactions.select_related('category', 'currency').order_by(*ORDERING)[:count]
+    return json.dumps([
+        {
+            'id': t.id, 'date': t.date.isoformat(), 'amount': str(t.amount),
+            'amount_base': str(t.amount_base), 'currency': t.currency.code,
+            'category': t.category_id, 'category_name': t.category.name,
+            'is_income': t.category.is_income, 'description': t.description,
+        }
+        for t in rows
+    ])
+
+
+def from_values(transactions, count, fields):
+    columns = api.columns(fields, ORDERING)
+    rows = transactions.values_list(*columns, named=True).order_by(*ORDERING)[:count]
+    return json.dumps(api.serialize(rows, fields, columns))
+
+
+def run(stdout, transactions, per_page, pages, fields, **options):
+    user = create_user()
+    seed_user(user, transactions=transactions)
+    analyze()
+    fields = api.parse_fields(fields)
+    queryset = Transaction.objects.filter(user=user)
+    count = min(per_page * pages, transactions)
+
+    from_models(queryset, per_page)  # прогрев
+    with timer() as t:
+        from_models(queryset, count)
+    report(stdout, 'Модели, все поля', count, t.seconds)
+    with timer() as t:
+        from_values(queryset, count, fields)
+    report(stdout, f'values_list, поля: {",".join(fields)}', count, t.seconds)
+
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    client.force_login(user)
+    url = reverse('transactions_json')
+    params = {'per_page': per_page, 'fields': ','.join(fields)}
+    rows = 0
+    with timer() as t:
+        for _ in range(pages):
+            data = json.loads(client.get(url, params).content)
+            rows += len(data['results'])
+            if not data['next']:
+                break
+            params['after'] = data['next']
+    report(stdout, f'transactions_json, страницы по {per_page}', rows, t.seconds)
@@ -0,0 +1,80 @@
+"""Синхронный и асинхронный dashboard: python manage.py benchmark async_dashboard"""
+import asyncio
+import time
+
+from django.test import RequestFactory
+
+from .. import async_views, views
+from ..models import UserPreferences
+from ..query_plans import analyze
+from ..seed import seed_user
+from . import create_user, percentile
+
+HELP = 'p50/p95 dashboard: синхронное представление (WSGI) и асинхронное (ASGI)'
+
+# Данные читают потоки пула со своими соединениями — без общей транзакции
+ATOMIC = False
+
+
+def add_arguments(parser):
+    parser.add_argument('--transactions', type=int, default=20_000)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--requests', type=int, default=300)
+
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+
+    async def auser():
+        return user
+
+    request.auser = auser
+    return request
+
+
+def measure_sync(user, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        views.dashboard(make_request(user))
+        times.append(time.perf_counter() - start)
+    return times
+
+
+async def measure_async(user, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await async_views.dashboard(make_request(user))
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(stdout, transactions, categories, requests, keep=False, **options):
+    user = create_user()
+    try:
+        seed_user(user, transactions=transactions, extra_categories=categories)
+        analyze()
+        for budget_type in ('monthly', 'category'):
+            UserPreferences.objects.update_or_create(user=user, defaults={'budget_type': budget_type})
+            measure_sync(user, 10)  # прогрев
+            asyncio.run(measure_async(user, 10))
+
+            results = {
+                'WSGI': measure_sync(user, requests),
+                'ASGI': asyncio.run(measure_async(user, requests)),
+            }
+            for name, times in results.items():
+                stdout.write(
+                    f'{budget_type} {name}: p50 {percentile(times, 0.5) * 1000:.2f} мс, '
+                    f'p95 {percentile(times, 0.95) * 1000:.2f} мс'
+                )
+            for share in (0.5, 0.95):
+                sync_time = percentile(results['WSGI'], share)
+                async_time = percentile(results['ASGI'], share)
+                reduction = (1 - async_time / sync_time) * 100
+                stdout.write(f'{budget_type} p{share * 100:.0f}: снижение на {reduction:.0f}%')
+    finally:
+        if not keep:
+            user.delete()
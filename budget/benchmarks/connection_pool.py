@@ -0,0 +1,139 @@
+"""Пул соединений под нагрузкой: python manage.py benchmark connection_pool"""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.urls import reverse
+
+from . import create_user, percentile
+
+HELP = 'Запросов в секунду к gunicorn: соединение на запрос, постоянные соединения, пул psycopg'
+
+# Сессию и пользователя читают воркеры gunicorn — данные должны быть зафиксированы
+ATOMIC = False
+
+MODES = {
+    'new': {'POSTGRES_POOL': '0', 'POSTGRES_CONN_MAX_AGE': '0'},
+    'persistent': {'POSTGRES_POOL': '0', 'POSTGRES_CONN_MAX_AGE': '600'},
+    'pool': {'POSTGRES_POOL': '1', 'POSTGRES_CONN_MAX_AGE': '0'},
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--url', help='Страница для нагрузки, по умолчанию — аналитика')
+    parser.add_argument('--mode', choices=list(MODES), action='append',
+                        help='Режимы соединений (по умолчанию все)')
+    parser.add_argument('--workers', type=int, default=4, help='Воркеры gunicorn')
+    parser.add_argument('--concurrency', type=int, default=8, help='Одновременные клиенты')
+    parser.add_argument('--seconds', type=float, default=10)
+
+
+def login_cookie(user):
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers, env):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'finance_manager.wsgi:application',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+        cwd=settings.BASE_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}{reverse("login")}', timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn не запустился за 30 с')
+
+
+def load(url, cookie, concurrency, seconds):
+    """Клиенты в потоках запрашивают url до истечения времени: (время ответов, ошибки)"""
+    times, errors = [], []
+    deadline = time.monotonic() + seconds
+
+    def client():
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+            except OSError as error:
+                errors.append(error)
+                continue
+            times.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return times, errors
+
+
+def run(stdout, url, mode, workers, concurrency, seconds, keep=False, **options):
+    user = create_user()
+    cache_dir = tempfile.mkdtemp(prefix='budget-bench-cache-')
+    rates = {}
+    try:
+        cookie = login_cookie(user)
+        for name in mode or MODES:
+            # Общий файловый кеш: через него pool_stats читает статистику воркеров
+            env = {
+                **os.environ, **MODES[name],
+                'DJANGO_CACHE_BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'DJANGO_CACHE_LOCATION': os.path.join(cache_dir, name),
+            }
+            port = free_port()
+            target = f'http://127.0.0.1:{port}{url or reverse("analytics")}'
+            server = start_server(port, workers, env)
+            try:
+                load(target, cookie, concurrency, 1)  # прогрев
+                times, errors = load(target, cookie, concurrency, seconds)
+            finally:
+                server.terminate()
+                server.wait()
+
+            rates[name] = len(times) / seconds
+            stdout.write(
+                f'{name}: {rates[name]:.0f} запросов/с, p50 {percentile(times, 0.5) * 1000:.1f} мс, '
+                f'p95 {percentile(times, 0.95) * 1000:.1f} мс, ошибок: {len(errors)}'
+            )
+            if name == 'pool':
+                # Снимки воркеров остаются в кеше STALE_AFTER секунд после остановки
+                stats = subprocess.run(
+                    [sys.executable, 'manage.py', 'pool_stats'],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+                )
+                stdout.write(stats.stdout.rstrip())
+
+        for name in rates:
+            if name != 'new' and 'new' in rates:
+                stdout.write(f'{name} / new: {rates[name] / rates["new"]:.2f}x')
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        if not keep:
+            user.delete()
@@ -0,0 +1,51 @@
+"""Скорость импорта CSV: python manage.py benchmark csv_import --rows 100000"""
+import csv
+import io
+import random
+from datetime import date, timedelta
+
+from ..csv_io import import_transactions
+from ..seed import ensure_currencies
+from . import create_user, report, timer
+
+HELP = 'Импорт CSV-файла через import_transactions'
+
+CATEGORY_NAMES = [
+    'Продукты', 'Транспорт', 'Кафе', 'Аптека', 'Связь', 'Коммунальные',
+    'Одежда', 'Развлечения', 'Подарки', 'Спорт', 'Книги', 'Путешествия',
+]
+
+
+def add_arguments(parser):
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+
+
+def build_csv(rows, currency_codes, seed=0):
+    rnd = random.Random(seed)
+    start = date(2020, 1, 1)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Дата', 'Категория', 'Сумма', 'Описание', 'Валюта'])
+    for i in range(rows):
+        writer.writerow([
+            start + timedelta(days=rnd.randrange(2000)),
+            rnd.choice(CATEGORY_NAMES),
+            f'{rnd.uniform(1, 500):.2f}',
+            f'Операция {i}',
+            rnd.choice(currency_codes),
+        ])
+    return io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+
+def run(stdout, rows, batch_size, **options):
+    currencies = ensure_currencies()
+    user = create_user()
+    file = build_csv(rows, [c.code for c in currencies])
+
+    with timer() as t:
+        result = import_transactions(user, file, batch_size=batch_size)
+
+    report(stdout, 'Импорт', result.created, t.seconds)
+    if result.error_count:
+        stdout.write(f'Ошибок: {result.error_count}')
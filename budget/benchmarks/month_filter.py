@@ -0,0 +1,46 @@
+"""Фильтр месяца через EXTRACT против диапазона дат: python manage.py benchmark month_filter"""
+from datetime import date
+
+from django.db.models import Sum
+
+from ..dates import month_filter
+from ..models import Transaction
+from ..query_plans import analyze
+from ..seed import month_starts, seed_user
+from . import create_user, timer
+
+HELP = 'Сравнение date__year/date__month и полуоткрытого диапазона дат'
+
+
+def add_arguments(parser):
+    parser.add_argument('--transactions', type=int, default=200_000)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+
+
+def run(stdout, transactions, months, repeat, **options):
+    user = create_user()
+    seed_user(user, transactions=transactions, months=months)
+    analyze()
+
+    qs = Transaction.objects.filter(user=user)
+    starts = month_starts(date.today(), months)
+
+    def extract():
+        for month in starts:
+            qs.filter(date__year=month.year, date__month=month.month).aggregate(Sum('amount_base'))
+
+    def date_range():
+        for month in starts:
+            qs.filter(**month_filter('date', month)).aggregate(Sum('amount_base'))
+
+    results = {}
+    for name, func in (('EXTRACT', extract), ('диапазон', date_range)):
+        func()  # прогрев
+        with timer() as t:
+            for _ in range(repeat):
+                func()
+        results[name] = t.seconds / (repeat * len(starts)) * 1000
+        stdout.write(f'{name}: {results[name]:.2f} мс на месяц')
+
+    stdout.write(f'Ускорение: {results["EXTRACT"] / results["диапазон"]:.1f}x')
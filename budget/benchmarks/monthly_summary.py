@@ -0,0 +1,53 @@
+"""Время monthly_summary при росте числа бюджетов: python manage.py benchmark monthly_summary"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .. import report_cache, rollups
+from ..models import Category, MonthlyBudget, Transaction
+from ..seed import ensure_currencies, month_starts
+from ..views import monthly_summary
+from . import create_user, timer
+
+HELP = 'Время ответа monthly_summary для 12…600 месячных бюджетов'
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=int, nargs='+', default=[12, 60, 120, 600])
+    parser.add_argument('--repeat', type=int, default=20)
+
+
+def seed_history(user, months, currency):
+    category = Category.objects.create(user=user, name='Продукты')
+    starts = month_starts(date(2024, 12, 1), months)
+    MonthlyBudget.objects.bulk_create([
+        MonthlyBudget(user=user, month=month, income_plan=Decimal(3000),
+                      expense_plan=Decimal(2500), currency=currency)
+        for month in starts
+    ])
+    rollups.add_transactions(Transaction.objects.bulk_create([
+        Transaction(user=user, category=category, amount=Decimal(10), amount_base=Decimal(10),
+                    currency=currency, date=month)
+        for month in starts
+    ]))
+
+
+def run(stdout, sizes, repeat, **options):
+    currency = ensure_currencies()[0]
+    factory = RequestFactory()
+    for size in sizes:
+        user = create_user()
+        seed_history(user, size, currency)
+        request = factory.get(reverse('monthly_summary'))
+        request.user = user
+        monthly_summary(request)  # прогрев
+        seconds = 0.0
+        for _ in range(repeat):
+            # Иначе замер покажет готовый отчёт из report_cache, а не расчёт
+            report_cache.changed([user.pk])
+            with timer() as t:
+                monthly_summary(request)
+            seconds += t.seconds
+        stdout.write(f'Бюджетов: {size:>5} — {seconds / repeat * 1000:.1f} мс на запрос')
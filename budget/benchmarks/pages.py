@@ -0,0 +1,119 @@
+"""
+Все страницы budget/urls.py на нескольких объёмах данных:
+python manage.py benchmark pages --output bench.json [--compare base.json]
+"""
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+
+from ..models import UserPreferences
+from ..query_budgets import QUERY_BUDGETS, count_queries, fetch, pages, request_body
+from ..query_plans import analyze
+from ..seed import RECURRING_RULES, seed_user
+from . import create_user, percentile
+
+HELP = 'Время и число запросов каждой страницы; результаты в JSON для сравнения между коммитами'
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help='Операций у пользователя')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    parser.add_argument('--compare', dest='compare_with', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Во сколько раз p50 может вырасти без пометки о регрессии')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(size, repeat):
+    user = create_user()
+    seed_user(user, transactions=size, recurring=len(RECURRING_RULES))
+    UserPreferences.objects.create(user=user, budget_type='monthly')
+    analyze()
+
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    client.force_login(user)
+    results = {}
+    for name, url in pages(user):
+        status, queries = count_queries(client, user, url)
+        body = request_body(user, url)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fetch(client, url, body)
+            times.append(time.perf_counter() - start)
+        results[name] = {
+            'url': url,
+            'status': status,
+            'queries': queries,
+            'budget': QUERY_BUDGETS.get(name),
+            'p50_ms': round(percentile(times, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(times, 0.95) * 1000, 2),
+        }
+    return results
+
+
+def compare(stdout, baseline, report, threshold):
+    stdout.write(f'Сравнение с {baseline.get("commit") or "прошлым прогоном"}:')
+    for size, results in report['results'].items():
+        for name, new in results.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if not old:
+                continue
+            ratio = new['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 1
+            mark = '!' if ratio > threshold or new['queries'] > old['queries'] else ' '
+            stdout.write(
+                f'{mark} {size:>7} {name}: p50 {old["p50_ms"]:.1f} → {new["p50_ms"]:.1f} мс '
+                f'({ratio - 1:+.0%}), запросов {old["queries"]} → {new["queries"]}'
+            )
+
+
+def run(stdout, sizes, repeat, output, compare_with=None, threshold=1.25, **options):
+    report = {
+        'commit': current_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'database': connection.vendor,
+        'results': {},
+    }
+    problems = []
+    for size in sizes:
+        results = report['results'][str(size)] = measure(size, repeat)
+        stdout.write(f'Операций: {size}')
+        for name, result in results.items():
+            stdout.write(
+                f'  {name:<32} {result["status"]}  запросов {result["queries"]:>2}/{result["budget"]}  '
+                f'p50 {result["p50_ms"]:7.1f} мс  p95 {result["p95_ms"]:7.1f} мс'
+            )
+            if result['budget'] is None or result['queries'] > result['budget']:
+                problems.append(f'{name} ({size}): {result["queries"]} запросов, бюджет {result["budget"]}')
+
+    smallest = report['results'][str(sizes[0])]
+    for size in sizes[1:]:
+        for name, result in report['results'][str(size)].items():
+            if result['queries'] > smallest[name]['queries']:
+                problems.append(f'{name}: число запросов растёт с объёмом данных ({size})')
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        stdout.write(f'Результаты записаны в {output}')
+    if compare_with:
+        with open(compare_with, encoding='utf-8') as file:
+            compare(stdout, json.load(file), report, threshold)
+    if problems:
+        raise CommandError('Превышены бюджеты запросов:\n' + '\n'.join(problems))
@@ -0,0 +1,43 @@
+"""Проведение регулярных операций: python manage.py benchmark recurring --rules 100000"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from ..models import Category, RecurringTransaction
+from ..recurring import BATCH_SIZE, process_due
+from ..seed import ensure_currencies
+from . import create_user, report, timer
+
+HELP = 'Пропускная способность process_due на большом числе правил'
+
+
+def add_arguments(parser):
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--rules-per-user', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+
+def run(stdout, rules, rules_per_user, batch_size, **options):
+    rnd = random.Random(0)
+    currencies = ensure_currencies()
+    today = date.today()
+
+    for offset in range(0, rules, rules_per_user):
+        user = create_user()
+        category = Category.objects.create(user=user, name='Подписки')
+        items = []
+        for _ in range(min(rules_per_user, rules - offset)):
+            # Правила с пропущенными повторениями за последние 1–3 месяца
+            start = today - timedelta(days=rnd.randrange(1, 90))
+            items.append(RecurringTransaction(
+                user=user, category=category, amount=Decimal(rnd.randrange(100, 10000)) / 100,
+                currency=rnd.choice(currencies), description='Подписка',
+                frequency=rnd.choice(['monthly', 'weekly']), start_date=start, next_date=start,
+            ))
+        RecurringTransaction.objects.bulk_create(items, batch_size=5000)
+
+    with timer() as t:
+        result = process_due(today=today, batch_size=batch_size)
+
+    report(stdout, 'Правила', result.items, t.seconds, unit='правил')
+    report(stdout, 'Создано операций', result.created, t.seconds, unit='операций')
@@ -0,0 +1,95 @@
+"""Отрисовка dashboard у пользователя с сотнями категорий: python manage.py benchmark render"""
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.template import engines
+from django.test import RequestFactory
+
+from .. import report_cache, views
+from ..dates import month_filter
+from ..models import Budget, Category, UserPreferences
+from ..query_plans import analyze
+from ..seed import EXPENSE_CATEGORIES, INCOME_CATEGORIES, seed_user
+from . import create_user, percentile
+
+HELP = 'p50/p95 dashboard с кешем фрагмента категорий и без него; вычисления в шаблоне и в Python'
+
+# Так шаблон считал проценты и превышение до переноса вычислений в представление
+TEMPLATE_MATH = (
+    '{% load budget_extras %}{% for b in budget_data %}'
+    '{{ b.spent|minus:b.limit_byn|floatformat:2 }} {{ b.spent|div:b.limit_byn|mul:100|floatformat:0 }}'
+    '{% endfor %}'
+)
+PRECOMPUTED = (
+    '{% for b in budget_data %}'
+    '{{ b.overrun|floatformat:2 }} {{ b.used_percent|floatformat:0 }}'
+    '{% endfor %}'
+)
+
+
+def add_arguments(parser):
+    parser.add_argument('--categories', type=int, default=200, help='Всего категорий у пользователя')
+    parser.add_argument('--transactions', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200)
+
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    return request
+
+
+def measure(func, count, before=None):
+    times = []
+    for _ in range(count):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(stdout, label, times):
+    stdout.write(
+        f'{label:<36} p50 {percentile(times, 0.5) * 1000:7.2f} мс  '
+        f'p95 {percentile(times, 0.95) * 1000:7.2f} мс'
+    )
+
+
+def run(stdout, categories, transactions, requests, **options):
+    user = create_user()
+    extra = max(categories - len(EXPENSE_CATEGORIES) - len(INCOME_CATEGORIES), 0)
+    seed_user(user, transactions=transactions, extra_categories=extra)
+
+    # Бюджет текущего месяца на каждую категорию расходов: карточек столько же, сколько кнопок
+    today = date.today()
+    month = today.replace(day=1)
+    with_budget = Budget.objects.filter(user=user, **month_filter('month', today)).values('category_id')
+    currency_id = Budget.objects.filter(user=user).values_list('currency_id', flat=True).first()
+    Budget.objects.bulk_create([
+        Budget(user=user, category=category, limit=Decimal(500), month=month, currency_id=currency_id)
+        for category in Category.objects.filter(user=user, is_income=False).exclude(pk__in=with_budget)
+    ])
+    UserPreferences.objects.create(user=user, budget_type='category')
+    analyze()
+    stdout.write(
+        f'Категорий: {Category.objects.filter(user=user).count()}, '
+        f'бюджетов в месяце: {Budget.objects.filter(user=user, **month_filter("month", today)).count()}'
+    )
+
+    dashboard = lambda: views.dashboard(make_request(user))
+    dashboard()
+    report(stdout, 'dashboard, фрагмент не в кеше', measure(
+        dashboard, requests, before=lambda: report_cache.categories_changed([user.pk])
+    ))
+    dashboard()
+    report(stdout, 'dashboard, фрагмент в кеше', measure(dashboard, requests))
+
+    budgets = Budget.objects.filter(user=user, **month_filter('month', today)).select_related('category')
+    context = {'budget_data': views.get_category_budget_data(user, budgets)}
+    engine, = engines.all()
+    for label, code in (('вычисления в шаблоне (фильтры)', TEMPLATE_MATH), ('готовые значения', PRECOMPUTED)):
+        template = engine.from_string(code)
+        report(stdout, label, measure(lambda: template.render(context), requests))
@@ -0,0 +1,69 @@
+"""Поиск по описанию: icontains против индекса: python manage.py benchmark search"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .. import rollups
+from ..models import Category, Currency, Transaction
+from ..query_plans import analyze
+from ..search import RANKED_ORDERING, search
+from ..seed import seed_user
+from . import create_user, timer
+
+HELP = 'Время первой страницы поиска: description__icontains и budget.search'
+
+# Редкие описания, добавляемые к сгенерированным (доля --rare)
+RARE_DESCRIPTIONS = [
+    'Ремонт велосипеда', 'Страховка автомобиля', 'Билеты в театр', 'Курсы английского',
+    'Замена масла', 'Ветеринарная клиника', 'Оплата парковки', 'Химчистка пальто',
+]
+# Частое слово, редкое слово в другой форме и слово, которого нет
+QUERIES = ['обед', 'велосипед', 'самокат']
+PAGE_SIZE = 51
+
+
+def add_arguments(parser):
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--rare', type=float, default=0.001,
+                        help='Доля операций с редкими описаниями')
+    parser.add_argument('--repeat', type=int, default=10)
+
+
+def add_rare(user, count, rnd):
+    categories = list(Category.objects.filter(user=user, is_income=False))
+    currency = Currency.objects.order_by('pk').first()
+    today = date.today()
+    created = Transaction.objects.bulk_create(
+        Transaction(
+            user=user, category=rnd.choice(categories), amount=Decimal(10),
+            currency=currency, amount_base=Decimal(10) * currency.rate,
+            date=today - timedelta(days=rnd.randrange(720)),
+            description=rnd.choice(RARE_DESCRIPTIONS),
+        )
+        for _ in range(count)
+    )
+    rollups.add_transactions(created)
+
+
+def run(stdout, transactions, rare, repeat, **options):
+    user = create_user()
+    seed_user(user, transactions=transactions)
+    add_rare(user, int(transactions * rare), random.Random(0))
+    analyze()
+
+    qs = Transaction.objects.filter(user=user)
+    variants = (
+        ('icontains', lambda text: qs.filter(description__icontains=text).order_by('-date', '-id')),
+        ('search', lambda text: search(qs, text).order_by(*RANKED_ORDERING)),
+    )
+
+    for text in QUERIES:
+        results = {}
+        for name, build in variants:
+            found = len(build(text)[:PAGE_SIZE])  # прогрев
+            with timer() as t:
+                for _ in range(repeat):
+                    list(build(text)[:PAGE_SIZE])
+            results[name] = t.seconds / repeat * 1000
+            stdout.write(f'«{text}» {name}: {results[name]:.1f} мс, строк на странице: {found}')
+        stdout.write(f'«{text}» ускорение: {results["icontains"] / results["search"]:.1f}x')
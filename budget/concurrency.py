@@ -0,0 +1,44 @@
+"""
+Параллельное выполнение синхронных запросов ORM из асинхронных представлений.
+
+Асинхронный ORM Django выполняет запросы через sync_to_async в одном общем
+потоке, то есть по очереди. Здесь каждая функция запускается в отдельном
+потоке пула со своим соединением к базе, и независимые запросы идут
+одновременно. Соединения потоков берутся из пула соединений (POSTGRES_POOL)
+или живут между запросами по правилам CONN_MAX_AGE; число потоков
+(ASYNC_DB_WORKERS) — это и число дополнительных соединений на процесс.
+
+Потоки пула не видят незафиксированных изменений вызывающего кода, поэтому
+вызывать run_concurrently внутри transaction.atomic() нельзя.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_DB_WORKERS', 4),
+    thread_name_prefix='budget-db',
+)
+
+
+def _with_fresh_connection(func):
+    # Как request_started/request_finished: устаревшие и сломанные соединения
+    # потока закрываются, при CONN_MAX_AGE = 0 — после каждой функции
+    def run():
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def run_concurrently(*funcs):
+    """Выполняет функции без аргументов одновременно, возвращает список результатов"""
+    return await asyncio.gather(*(
+        sync_to_async(_with_fresh_connection(func), thread_sensitive=False, executor=_executor)()
+        for func in funcs
+    ))
@@ -0,0 +1,61 @@
+"""
+Условные GET-запросы для страниц, зависящих только от данных пользователя.
+
+ETag строится из версий данных пользователя (budget.report_cache), имени
+представления, параметров запроса, текущей даты и CSRF-cookie: токен
+вставляется в формы страницы, и после его смены старая копия непригодна.
+Если ETag совпадает, представление не вызывается — ответ 304 обходится
+без предпочтений, категорий и агрегатов.
+
+Шаблоны этих страниц не выводят сообщения (messages), поэтому ответ 304
+ничего не скрывает: сообщения остаются в очереди до страницы, которая их
+показывает. Если страница начнёт их выводить, 304 отдавать нельзя, пока
+очередь не пуста.
+"""
+import hashlib
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import report_cache
+
+
+def page_etag(request, name):
+    global_version, user_version = report_cache.versions(request.user.pk)
+    parts = (
+        name,
+        global_version,
+        user_version,
+        timezone.localdate().isoformat(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.GET.urlencode(),
+    )
+    return hashlib.sha256('\n'.join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def page_last_modified(request):
+    """
+    Время последнего изменения данных, но не раньше начала текущего дня
+    (на странице есть «сегодня»). Точность — секунда, поэтому основной
+    валидатор — ETag; клиенты сначала сверяют его.
+    """
+    changed_ns = max(report_cache.versions(request.user.pk))
+    changed = datetime.fromtimestamp(-(-changed_ns // 10**9), tz=dt_timezone.utc)
+    today = timezone.make_aware(datetime.combine(timezone.localdate(), dt_time.min))
+    return max(changed, today)
+
+
+def conditional_page(view):
+    """
+    ETag/Last-Modified по данным пользователя; ставится под login_required.
+    Подходит и для асинхронных представлений, если request.user уже загружен.
+    """
+    name = view.__name__
+    view = condition(
+        etag_func=lambda request, *args, **kwargs: page_etag(request, name),
+        last_modified_func=lambda request, *args, **kwargs: page_last_modified(request),
+    )(view)
+    return cache_control(private=True, no_cache=True)(view)
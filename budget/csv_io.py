@@ -0,0 +1,231 @@
+"""Импорт и экспорт операций в формате CSV"""
+import csv
+import heapq
+import io
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction as db_transaction
+
+from . import archive, currency_cache, metrics, report_cache, rollups
+from .models import Category, Transaction
+
+IMPORT_BATCH_SIZE = 2000
+EXPORT_CHUNK_SIZE = 2000
+# Сколько строк собирать в один кусок ответа при выгрузке
+EXPORT_ROWS_PER_WRITE = 500
+MAX_REPORTED_ERRORS = 500
+DEFAULT_CURRENCY_CODE = 'BYN'
+EXPORT_HEADER = ['Дата', 'Категория', 'Сумма', 'Описание', 'Валюта', 'Сумма в BYN']
+
+CENT = Decimal('0.01')
+# DecimalField(max_digits=10, decimal_places=2)
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+class RowError(ValueError):
+    """Ошибка в отдельной строке файла"""
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    created_categories: int = 0
+    error_count: int = 0
+    # Список (номер строки, сообщение), не длиннее MAX_REPORTED_ERRORS
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(value.strip().replace(',', '.'))
+    except InvalidOperation:
+        raise RowError(f'некорректная сумма «{value}»')
+    if not amount.is_finite():
+        raise RowError(f'некорректная сумма «{value}»')
+    amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    if abs(amount) > MAX_AMOUNT:
+        raise RowError(f'слишком большая сумма «{value}»')
+    return amount
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        raise RowError(f'некорректная дата «{value}», ожидается ГГГГ-ММ-ДД')
+
+
+def parse_row(row, currencies, default_currency):
+    """Разбор строки: Дата, Категория, Сумма, Описание[, Валюта[, Сумма в BYN]]"""
+    if len(row) < 4:
+        raise RowError(f'ожидается не менее 4 колонок, получено {len(row)}')
+
+    category_name = row[1].strip()
+    if not category_name:
+        raise RowError('не указана категория')
+    if len(category_name) > 100:
+        raise RowError('слишком длинное название категории')
+
+    currency = default_currency
+    if len(row) > 4 and row[4].strip():
+        code = row[4].strip().upper()
+        currency = currencies.get(code)
+        if currency is None:
+            raise RowError(f'неизвестная валюта «{code}»')
+    if currency is None:
+        raise RowError('не указана валюта')
+
+    amount = parse_amount(row[2])
+    transaction_date = parse_date(row[0])
+    if len(row) > 5 and row[5].strip():
+        # Файл из нашей выгрузки — сохраняем исходную сумму в BYN
+        amount_base = parse_amount(row[5])
+    else:
+        rate = currency_cache.get_rate(currency.pk, transaction_date)
+        amount_base = (amount * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+        if abs(amount_base) > MAX_AMOUNT:
+            raise RowError(f'слишком большая сумма «{row[2]}»')
+
+    return {
+        'date': transaction_date,
+        'category_name': category_name,
+        'amount': amount,
+        'amount_base': amount_base,
+        'currency': currency,
+        'description': row[3],
+    }
+
+
+def import_transactions(user, file, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Потоковый импорт операций из CSV-файла.
+
+    Категории загружаются заранее одним запросом, валюты берутся из кеша,
+    недостающие категории создаются пачкой, операции записываются через
+    bulk_create в одной транзакции БД. Возвращает ImportReport с ошибками
+    по строкам.
+    """
+    report = ImportReport()
+
+    currencies = currency_cache.by_code()
+    default_currency = currencies.get(DEFAULT_CURRENCY_CODE)
+
+    # Операции импортируются как расходы: категории доходов с тем же именем не подходят
+    categories = {
+        category.name: category
+        for category in Category.objects.filter(user=user, is_income=False)
+    }
+
+    csv_file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(csv_file)
+
+    rollup_deltas = rollups.collect([])
+
+    def flush(pending):
+        new_names = {row['category_name'] for _, row in pending} - categories.keys()
+        if new_names:
+            created = Category.objects.bulk_create([
+                Category(user=user, name=name, is_income=False)
+                for name in sorted(new_names)
+            ])
+            for category in created:
+                categories[category.name] = category
+            report.created_categories += len(created)
+            report_cache.categories_changed([user.id])
+
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                category=categories[row['category_name']],
+                amount=row['amount'],
+                amount_base=row['amount_base'],
+                currency=row['currency'],
+                date=row['date'],
+                description=row['description'],
+            )
+            for _, row in pending
+        ])
+        rollups.collect(transactions, into=rollup_deltas)
+        report.created += len(transactions)
+
+    try:
+        with db_transaction.atomic():
+            next(reader, None)  # Пропускаем заголовок
+            pending = []
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                try:
+                    pending.append((reader.line_num, parse_row(row, currencies, default_currency)))
+                except RowError as e:
+                    report.add_error(reader.line_num, str(e))
+                    continue
+                if len(pending) >= batch_size:
+                    flush(pending)
+                    pending = []
+            if pending:
+                flush(pending)
+            rollups.apply(rollup_deltas)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Файл целиком не читается — ничего не сохраняем
+        report.created = 0
+        report.created_categories = 0
+        report.add_error(reader.line_num, f'не удалось прочитать файл: {e}')
+    finally:
+        csv_file.detach()
+
+    metrics.IMPORT_ROWS.labels('imported').inc(report.created)
+    metrics.IMPORT_ROWS.labels('error').inc(report.error_count)
+    metrics.TRANSACTIONS_CREATED.labels('import').inc(report.created)
+    return report
+
+
+def export_transactions(user, chunk_size=EXPORT_CHUNK_SIZE, include_archive=False):
+    """
+    Генератор CSV-выгрузки операций пользователя.
+
+    Строки читаются курсором на стороне сервера уже с названием категории
+    и кодом валюты, поэтому память не растёт с объёмом истории. С
+    include_archive в выгрузку в том же порядке попадают и операции из
+    архива (budget.archive); в памяти держится один архивный месяц.
+    """
+    rows = (
+        Transaction.objects
+        .filter(user=user)
+        .order_by('-date', '-id')
+        .values_list('date', 'id', 'category__name', 'amount', 'description',
+                     'currency__code', 'amount_base')
+        .iterator(chunk_size=chunk_size)
+    )
+    if include_archive:
+        rows = heapq.merge(rows, archive.export_rows(user),
+                           key=lambda row: (row[0], row[1]), reverse=True)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    # BOM для корректного открытия в Excel
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_HEADER)
+    yield drain()
+
+    for i, (day, _, *values) in enumerate(rows, 1):
+        writer.writerow((day, *values))
+        if i % EXPORT_ROWS_PER_WRITE == 0:
+            yield drain()
+    tail = drain()
+    if tail:
+        yield tail
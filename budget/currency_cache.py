@@ -0,0 +1,115 @@
+"""
+Кеш валют в памяти процесса.
+
+Таблица валют маленькая и меняется редко, поэтому каждый процесс держит
+её целиком. Актуальность проверяется по номеру версии в общем кеше Django:
+при сохранении Currency номер меняется, и остальные воркеры gunicorn
+перечитывают таблицу при следующем обращении. Для этого кеш Django должен
+быть общим для воркеров (файловый, memcached, redis). Версия читается из
+общего кеша не чаще раза в VERSION_CHECK_INTERVAL секунд, так что другой
+воркер видит новые курсы с такой задержкой; сам процесс, сохранивший
+Currency, сбрасывает свой кеш сразу.
+
+Вместе с валютами загружается история курсов (ExchangeRate): курс на дату —
+последний с effective_date не позже этой даты, а до первой записи истории
+действует Currency.rate. Операции и бюджеты берут курс только через
+get_rate(), поэтому после первой записи истории правка Currency.rate меняет
+курс лишь для более ранних дат.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import DateField
+
+from .models import Currency, ExchangeRate
+
+VERSION_KEY = 'budget:currency_version'
+VERSION_CHECK_INTERVAL = 2
+
+_to_date = DateField().to_python
+
+_lock = threading.Lock()
+_version = None
+_currencies = None
+_history = None
+_checked_at = None
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _load_history():
+    """{currency_id: ([даты], [курсы])}, даты по возрастанию"""
+    history = defaultdict(lambda: ([], []))
+    rates = ExchangeRate.objects.order_by('currency_id', 'effective_date').values_list(
+        'currency_id', 'effective_date', 'rate'
+    )
+    for currency_id, effective_date, rate in rates:
+        dates, values = history[currency_id]
+        dates.append(effective_date)
+        values.append(rate)
+    return dict(history)
+
+
+def _state():
+    global _version, _currencies, _history, _checked_at
+    currencies, history, checked_at = _currencies, _history, _checked_at
+    now = time.monotonic()
+    fresh = checked_at is not None and now - checked_at < VERSION_CHECK_INTERVAL
+    if currencies is not None and fresh:
+        return currencies, history
+    version = _shared_version()
+    if currencies is None or version != _version:
+        with _lock:
+            currencies = {c.pk: c for c in Currency.objects.all()}
+            history = _load_history()
+            _currencies, _history, _version = currencies, history, version
+    _checked_at = now
+    return currencies, history
+
+
+def get_currencies():
+    """Словарь {pk: Currency}. Объекты общие для всего процесса — не изменяйте их"""
+    return _state()[0]
+
+
+def get_currency(pk):
+    """Валюта по первичному ключу; None, если такой нет"""
+    return get_currencies().get(pk)
+
+
+def get_rate(pk, on_date=None):
+    """
+    Курс валюты на дату on_date (date или строка ISO — как в Transaction.date
+    до full_clean); без даты — текущий Currency.rate
+    """
+    currencies, history = _state()
+    if on_date is not None and pk in history:
+        on_date = _to_date(on_date)
+        dates, rates = history[pk]
+        index = bisect_right(dates, on_date)
+        if index:
+            return rates[index - 1]
+    return currencies[pk].rate
+
+
+def by_code():
+    return {c.code.upper(): c for c in get_currencies().values()}
+
+
+def invalidate():
+    """Сбрасывает кеш этого процесса и меняет версию для остальных"""
+    global _currencies, _history
+    _currencies = _history = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,50 @@
+"""
+Работа с месяцами. Фильтры строятся как полуоткрытый диапазон
+[начало месяца, начало следующего), а не через __year/__month:
+EXTRACT по колонке не позволяет использовать btree-индекс по дате.
+"""
+import calendar
+from datetime import date
+
+
+def month_start(value):
+    """Первое число месяца для даты или строки 'ГГГГ-ММ[-ДД]'"""
+    if isinstance(value, str):
+        year, month = map(int, value.split('-')[:2])
+        return date(year, month, 1)
+    return date(value.year, value.month, 1)
+
+
+def next_month_start(value):
+    start = month_start(value)
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def month_range(value):
+    """Полуоткрытый диапазон месяца: (начало, начало следующего месяца)"""
+    return month_start(value), next_month_start(value)
+
+
+def year_range(year):
+    """Полуоткрытый диапазон года: (1 января, 1 января следующего года)"""
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def month_filter(field, value):
+    """Условия для .filter(): month_filter('date', today) -> date__gte, date__lt"""
+    start, end = month_range(value)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def add_months(value, months, day=None):
+    """
+    Сдвиг даты на months календарных месяцев. day — желаемое число месяца
+    (по умолчанию число исходной даты); в коротких месяцах берётся последний день.
+    """
+    index = value.year * 12 + value.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, min(day or value.day, last_day))
@@ -0,0 +1,90 @@
+"""
+Статистика пула соединений psycopg (включается переменной POSTGRES_POOL=1).
+
+Пул свой у каждого процесса, поэтому воркеры по окончании запроса, не чаще
+раза в PUBLISH_INTERVAL секунд, кладут снимок статистики в общий кеш, а
+команда pool_stats собирает снимки всех процессов. Снимок живёт STALE_AFTER
+секунд: остановленные воркеры пропадают из отчёта сами. Те же значения
+попадают в метрики budget_db_pool_* (budget.metrics).
+"""
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import metrics
+
+PIDS_KEY = 'budget:db_pool:pids'
+SNAPSHOT_KEY = 'budget:db_pool:{}'
+PUBLISH_INTERVAL = 5
+STALE_AFTER = 60
+
+_lock = threading.Lock()
+_last_published = 0.0
+
+
+def get_pool(alias=DEFAULT_DB_ALIAS):
+    # У SQLite атрибута нет, у PostgreSQL без OPTIONS['pool'] он равен None
+    return getattr(connections[alias], 'pool', None)
+
+
+def stats(alias=DEFAULT_DB_ALIAS):
+    """Статистика пула этого процесса или None, если пул не настроен"""
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+    raw = pool.get_stats()
+    requests = raw.get('requests_num', 0)
+    wait_ms = raw.get('requests_wait_ms', 0)
+    return {
+        'size': raw['pool_size'],
+        'max_size': raw['pool_max'],
+        'checked_out': raw['pool_size'] - raw['pool_available'],
+        'available': raw['pool_available'],
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': requests,
+        # Запросы, которым не хватило свободного соединения, и общее время ожидания
+        'queued': raw.get('requests_queued', 0),
+        'wait_ms': wait_ms,
+        'avg_wait_ms': wait_ms / requests if requests else 0.0,
+        'timeouts': raw.get('requests_errors', 0),
+        'connections': raw.get('connections_num', 0),
+        'connect_ms': raw.get('connections_ms', 0),
+        'connections_lost': raw.get('connections_lost', 0),
+    }
+
+
+def publish():
+    """Снимок статистики этого процесса в общий кеш"""
+    global _last_published
+    now = time.monotonic()
+    with _lock:
+        if now - _last_published < PUBLISH_INTERVAL:
+            return
+        _last_published = now
+
+    snapshot = stats()
+    if snapshot is None:
+        return
+    metrics.POOL_CONNECTIONS.labels('checked_out').set(snapshot['checked_out'])
+    metrics.POOL_CONNECTIONS.labels('available').set(snapshot['available'])
+    metrics.POOL_WAITING.set(snapshot['waiting'])
+    pid = os.getpid()
+    cache.set(SNAPSHOT_KEY.format(pid), {'pid': pid, 'time': time.time(), **snapshot}, STALE_AFTER)
+    # Список процессов обновляется без блокировки: потерянный при гонке pid
+    # вернётся со следующим снимком
+    pids = cache.get(PIDS_KEY, set())
+    if pid not in pids:
+        cache.set(PIDS_KEY, pids | {pid}, timeout=None)
+
+
+def collect():
+    """Свежие снимки всех процессов: {pid: статистика}"""
+    pids = cache.get(PIDS_KEY, set())
+    found = cache.get_many([SNAPSHOT_KEY.format(pid) for pid in pids])
+    snapshots = {snapshot['pid']: snapshot for snapshot in found.values()}
+    if len(snapshots) < len(pids):
+        cache.set(PIDS_KEY, set(snapshots), timeout=None)
+    return snapshots
@@ -1,8 +1,44 @@
 from django import forms
-from .models import Category, Transaction, Budget, RecurringTransaction, MonthlyBudget, UserPreferences
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from .models import Category, Currency, Transaction, Budget, RecurringTransaction, MonthlyBudget, UserPreferences
+from .currency_cache import get_currencies
+from .search import RANKED_ORDERING, search
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 
+
+class CachedCurrencyIterator(ModelChoiceIterator):
+    """Варианты выбора валюты из кеша процесса, без запроса к БД"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for currency in sorted(get_currencies().values(), key=lambda c: c.pk):
+            yield self.choice(currency)
+
+    def __len__(self):
+        return len(get_currencies()) + (self.field.empty_label is not None)
+
+
+class CurrencyChoiceField(forms.ModelChoiceField):
+    iterator = CachedCurrencyIterator
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Currency):
+            return value
+        try:
+            return get_currencies()[int(value)]
+        except (KeyError, ValueError, TypeError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+
+
 class CategoryForm(forms.ModelForm):
     color = forms.CharField(
         widget=forms.TextInput(attrs={'type': 'color'}),
@@ -21,6 +57,7 @@ class TransactionForm(forms.ModelForm):
     class Meta:
         model = Transaction
         fields = ['category', 'amount', 'currency', 'date', 'description']
+        field_classes = {'currency': CurrencyChoiceField}
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'})
         }
@@ -35,6 +72,7 @@ class BudgetForm(forms.ModelForm):
     class Meta:
         model = Budget
         fields = ['category', 'limit', 'currency', 'month']
+        field_classes = {'currency': CurrencyChoiceField}
 
 class RegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -83,10 +121,42 @@ class TransactionFilterForm(forms.Form):
         super().__init__(*args, **kwargs)
         self.fields['category'].queryset = Category.objects.filter(user=user)
 
+    def ordering(self):
+        """Порядок вывода: при поиске — по релевантности"""
+        if self.is_valid() and self.cleaned_data['search']:
+            return RANKED_ORDERING
+        return ('-date', '-id')
+
+    def filter_queryset(self, transactions):
+        """Применяет фильтры формы к queryset операций"""
+        if not self.is_valid():
+            return transactions
+        op_type = self.cleaned_data.get('operation_type')
+        if op_type == 'income':
+            transactions = transactions.filter(category__is_income=True)
+        elif op_type == 'expense':
+            transactions = transactions.filter(category__is_income=False)
+        if self.cleaned_data['search']:
+            transactions = search(transactions, self.cleaned_data['search'])
+        if self.cleaned_data['category']:
+            transactions = transactions.filter(
+                category=self.cleaned_data['category']
+            )
+        if self.cleaned_data['date_from']:
+            transactions = transactions.filter(
+                date__gte=self.cleaned_data['date_from']
+            )
+        if self.cleaned_data['date_to']:
+            transactions = transactions.filter(
+                date__lte=self.cleaned_data['date_to']
+            )
+        return transactions
+
 class RecurringTransactionForm(forms.ModelForm):
     class Meta:
         model = RecurringTransaction
         fields = ['category', 'amount', 'currency', 'description', 'frequency', 'start_date']
+        field_classes = {'currency': CurrencyChoiceField}
         widgets = {
             'start_date': forms.DateInput(attrs={'type': 'date'})
         }
@@ -118,6 +188,7 @@ class MonthlyBudgetForm(forms.ModelForm):
     class Meta:
         model = MonthlyBudget
         fields = ['month', 'income_plan', 'expense_plan', 'currency', 'notes']
+        field_classes = {'currency': CurrencyChoiceField}
 
 class UserPreferencesForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,59 @@
+"""
+Повтор запросов с заголовком Idempotency-Key без повторного выполнения.
+
+Ключ записывается в той же транзакции, что и результат запроса: пока первый
+запрос не зафиксирован, повтор с тем же ключом ждёт на уникальном индексе,
+а после фиксации получает сохранённый ответ. Если запрос упал, ключ
+откатывается вместе с данными и повтор выполнится заново. Тот же ключ с
+другим телом запроса — ошибка клиента. Ключи старше KEY_TTL считаются
+свободными; удаляет их команда clear_idempotency_keys.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+KEY_TTL = timedelta(hours=24)
+MAX_KEY_LENGTH = 255
+
+
+class KeyReused(Exception):
+    """Ключ уже использован для запроса с другим телом"""
+
+
+def request_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def run_once(user, key, body, handler):
+    """
+    (код ответа, данные ответа, повтор ли это) для handler() -> (код, данные).
+    handler выполняется в транзакции вместе с записью ключа.
+    """
+    digest = request_hash(body)
+    with transaction.atomic():
+        now = timezone.now()
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=user, key=key, defaults={'request_hash': digest, 'created': now},
+        )
+        if not created:
+            if record.created >= now - KEY_TTL and record.status_code is not None:
+                if record.request_hash != digest:
+                    raise KeyReused(key)
+                return record.status_code, record.response, True
+            # Устаревший ключ используется заново
+            record.request_hash = digest
+            record.created = now
+        record.status_code, record.response = handler()
+        record.save()
+    return record.status_code, record.response, False
+
+
+def clear_expired(now=None):
+    """Удаляет устаревшие ключи, возвращает их число"""
+    now = now or timezone.now()
+    deleted, _ = IdempotencyKey.objects.filter(created__lt=now - KEY_TTL).delete()
+    return deleted
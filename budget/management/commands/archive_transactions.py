@@ -0,0 +1,50 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from budget import archive, partitions
+from budget.dates import month_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит операции старых месяцев в сжатый архив (TransactionArchive), '
+        'сохраняя месячные итоги, или возвращает месяц из архива'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=archive.ARCHIVE_AFTER_MONTHS,
+                            help='Сколько последних месяцев оставить в таблице операций')
+        parser.add_argument('--before', type=date.fromisoformat,
+                            help='Архивировать месяцы до этой даты (вместо --months)')
+        parser.add_argument('--user', help='Только для пользователя с этим логином')
+        parser.add_argument('--restore', metavar='YYYY-MM',
+                            type=lambda value: date.fromisoformat(f'{value}-01'),
+                            help='Вернуть из архива операции месяца (нужен --user)')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+
+        if options['restore']:
+            if user is None:
+                raise CommandError('Для --restore нужен --user')
+            count = archive.restore_month(user, options['restore'])
+            self.stdout.write(self.style.SUCCESS(f'Восстановлено операций: {count}'))
+            return
+
+        before = options['before'] or archive.cutoff(months=options['months'])
+        start = time.perf_counter()
+        report = archive.archive_transactions(before, user)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Заархивировано операций: {report.transactions} за {elapsed:.2f} с, '
+            f'месяцев: {report.months} (до {before:%Y-%m})'
+        ))
+        for name in partitions.drop_empty_partitions(month_start(before)):
+            self.stdout.write(f'  удалена пустая секция {name}')
@@ -0,0 +1,31 @@
+import importlib
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from budget.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Запуск нагрузочных тестов из пакета budget.benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не откатывать созданные данные после прогона',
+        )
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name in BENCHMARKS:
+            module = importlib.import_module(f'budget.benchmarks.{name}')
+            module.add_arguments(subparsers.add_parser(name, help=module.HELP))
+
+    def handle(self, *args, benchmark, keep, **options):
+        module = importlib.import_module(f'budget.benchmarks.{benchmark}')
+        if not getattr(module, 'ATOMIC', True):
+            # Данные должны быть видны другим соединениям — модуль убирает их сам
+            module.run(self.stdout, keep=keep, **options)
+            return
+        with transaction.atomic():
+            module.run(self.stdout, **options)
+            if not keep:
+                transaction.set_rollback(True)
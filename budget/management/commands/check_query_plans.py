@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from budget import partitions
+from budget.query_plans import analyze, check_hot_queries, check_partition_pruning, seed_plan_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для основных запросов представлений и завершается '
+        'с ошибкой, если какой-то из них не использует свой индекс'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Проверить на данных существующего пользователя вместо сгенерированных',
+        )
+        parser.add_argument('--transactions', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов поддерживается только для PostgreSQL')
+
+        with transaction.atomic():
+            if options['user']:
+                user = User.objects.get(username=options['user'])
+                analyze()
+            else:
+                user = User.objects.create_user(username='query_plans_check')
+                seed_plan_data(user, transactions=options['transactions'])
+
+            results = check_hot_queries(user)
+            pruning = check_partition_pruning(user) if partitions.is_partitioned() else {}
+            transaction.set_rollback(True)
+
+        failed = []
+        for name, (indexes, expected) in results.items():
+            used = ", ".join(indexes) or "без индексов"
+            if expected and expected not in indexes:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {used} вместо {expected}'))
+            else:
+                self.stdout.write(f'{name}: {used}')
+
+        extra = []
+        for name, (scanned, expected) in pruning.items():
+            if set(scanned) - set(expected):
+                extra.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: лишние секции {", ".join(scanned)}'))
+            else:
+                self.stdout.write(f'{name}: секции {", ".join(scanned) or "не читаются"}')
+
+        if failed:
+            raise CommandError(f'Запросы без своих индексов: {", ".join(failed)}')
+        if extra:
+            raise CommandError(f'Лишние секции операций в запросах: {", ".join(extra)}')
+        self.stdout.write(self.style.SUCCESS('Все выборочные запросы используют свои индексы'))
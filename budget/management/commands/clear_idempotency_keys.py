@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from budget import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Удаляет ключи Idempotency-Key старше суток (запускать по расписанию)'
+
+    def handle(self, *args, **options):
+        count = idempotency.clear_expired()
+        self.stdout.write(self.style.SUCCESS(f'Удалено ключей: {count}'))
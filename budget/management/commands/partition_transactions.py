@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from budget import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирование таблицы операций по дате (PostgreSQL): переводит '
+        'budget_transaction в секционированную таблицу или создаёт недостающие '
+        'будущие секции, если она уже секционирована. Переход блокирует таблицу '
+        'на время копирования данных. По расписанию (ежедневно) запускайте с --ensure'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', choices=partitions.INTERVALS, default='month',
+                            help='Секция на месяц или на год (только при переходе)')
+        parser.add_argument('--ahead', type=int,
+                            help='Сколько будущих периодов создать заранее')
+        parser.add_argument('--revert', action='store_true',
+                            help='Вернуть обычную несекционированную таблицу')
+        parser.add_argument('--ensure', action='store_true',
+                            help='Только создать недостающие будущие секции; обычную таблицу '
+                                 'не трогать (для запуска по расписанию)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование поддерживается только для PostgreSQL')
+
+        if options['ensure']:
+            # Без секционирования — не ошибка: расписание одно для всех развёртываний
+            if not partitions.is_partitioned():
+                self.stdout.write('Таблица операций не секционирована — секции не нужны')
+                return
+            created = partitions.ensure_partitions(ahead=options['ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Создано секций: {len(created)}'))
+            for name in created:
+                self.stdout.write(f'  {name}')
+            return
+
+        if options['revert']:
+            if not partitions.is_partitioned():
+                raise CommandError('Таблица операций не секционирована')
+            partitions.unpartition_table()
+            self.stdout.write(self.style.SUCCESS('Таблица операций снова обычная'))
+            return
+
+        if not partitions.is_partitioned():
+            partitions.partition_table(options['interval'], options['ahead'])
+            self.stdout.write(self.style.SUCCESS('Таблица операций секционирована'))
+        else:
+            created = partitions.ensure_partitions(ahead=options['ahead'])
+            self.stdout.write(f'Создано секций: {len(created)}')
+
+        for name, start, end in partitions.partitions():
+            self.stdout.write(f'  {name}: {start} — {end}')
+        self.stdout.write(f'  {partitions.DEFAULT_PARTITION}: остальные даты')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from budget import db_pool
+
+COLUMNS = (
+    ('pid', 'pid'), ('size', 'размер'), ('checked_out', 'занято'), ('waiting', 'ждут'),
+    ('requests', 'выдано'), ('queued', 'с ожиданием'), ('avg_wait_ms', 'ожидание, мс'),
+    ('timeouts', 'таймауты'), ('connections', 'подключений'), ('connections_lost', 'потеряно'),
+)
+TOTALS = ('size', 'checked_out', 'waiting', 'requests', 'queued', 'wait_ms', 'timeouts',
+          'connections', 'connections_lost')
+
+
+class Command(BaseCommand):
+    help = (
+        'Статистика пулов соединений работающих процессов (POSTGRES_POOL=1). '
+        'Процессы публикуют её в кеш, поэтому кеш должен быть общим'
+    )
+
+    def handle(self, *args, **options):
+        snapshots = db_pool.collect()
+        if not snapshots:
+            self.stdout.write(
+                'Нет данных: пул выключен, процессы не обслуживали запросов '
+                f'последние {db_pool.STALE_AFTER} с или кеш не общий для процессов'
+            )
+            return
+
+        rows = [dict(snapshots[pid]) for pid in sorted(snapshots)]
+        total = {'pid': 'всего', **{key: sum(row[key] for row in rows) for key in TOTALS}}
+        total['avg_wait_ms'] = total['wait_ms'] / total['requests'] if total['requests'] else 0.0
+        rows.append(total)
+
+        cells = [[title for _, title in COLUMNS]] + [
+            [f'{row[key]:.1f}' if key == 'avg_wait_ms' else str(row[key]) for key, _ in COLUMNS]
+            for row in rows
+        ]
+        widths = [max(len(line[i]) for line in cells) for i in range(len(COLUMNS))]
+        for line in cells:
+            self.stdout.write('  '.join(cell.rjust(width) for cell, width in zip(line, widths)))
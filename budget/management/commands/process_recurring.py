@@ -0,0 +1,34 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from budget.recurring import BATCH_SIZE, process_due
+
+
+class Command(BaseCommand):
+    help = (
+        'Проводит наступившие регулярные операции всех пользователей. '
+        'Можно запускать несколько экземпляров параллельно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Обработать только пользователя с этим логином')
+        parser.add_argument('--date', type=date.fromisoformat, help='Дата проведения (по умолчанию сегодня)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+
+        start = time.perf_counter()
+        report = process_due(user=user, today=options['date'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+
+        rate = report.items / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано регулярных операций: {report.items}, создано операций: {report.created} '
+            f'за {elapsed:.2f} с ({rate:,.0f} правил/с)'
+        ))
@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from budget import rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает месячные итоги (MonthlyRollup) по таблице операций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Пересчитать только для пользователя с этим логином')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        count = rollups.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано строк итогов: {count}'))
@@ -0,0 +1,47 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from budget.models import Currency
+from budget.rates import BATCH_SIZE, recompute_amount_base
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает суммы в BYN (amount_base) по курсам на даты операций '
+        'и обновляет месячные итоги'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help='Первая дата операций (включительно)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help='Последняя дата операций (включительно)')
+        parser.add_argument('--currency', help='Код валюты, например USD')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Ширина окна по id на одну транзакцию')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Пересчёт поддерживается только для PostgreSQL')
+
+        currency = None
+        if options['currency']:
+            currency = Currency.objects.filter(code__iexact=options['currency']).first()
+            if currency is None:
+                raise CommandError(f'Неизвестная валюта {options["currency"]}')
+
+        start = time.perf_counter()
+        report = recompute_amount_base(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            currency=currency,
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено операций: {report.updated} за {elapsed:.2f} с, окон: {report.batches}'
+        ))
@@ -0,0 +1,53 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from budget.models import UserPreferences
+from budget.seed import RECURRING_RULES, seed_user
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт пользователей с категориями, бюджетами, регулярными операциями '
+        'и историей операций в нескольких валютах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=5000,
+                            help='Операций на пользователя')
+        parser.add_argument('--months', type=int, default=24, help='Глубина истории')
+        parser.add_argument('--recurring', type=int, default=len(RECURRING_RULES),
+                            help='Регулярных операций на пользователя')
+        parser.add_argument('--prefix', default='demo', help='Логины: <prefix>_1, <prefix>_2, …')
+        parser.add_argument('--password', default='demo', help='Пароль всех пользователей')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        usernames = [f'{prefix}_{i + 1}' for i in range(options['users'])]
+        existing = list(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if existing:
+            raise CommandError(f'Пользователи уже существуют: {", ".join(sorted(existing))}')
+
+        # Хеш один на всех: хеширование пароля заметно дольше генерации данных
+        password = make_password(options['password'])
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=username, password=password) for username in usernames
+            ])
+            for i, user in enumerate(users):
+                seed_user(
+                    user, transactions=options['transactions'], months=options['months'],
+                    seed=options['seed'] + i, recurring=options['recurring'],
+                )
+                # Половина пользователей — с бюджетом по категориям
+                UserPreferences.objects.create(
+                    user=user, budget_type='category' if i % 2 else 'monthly'
+                )
+                self.stdout.write(f'{user.username}: операций {options["transactions"]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, пароль: {options["password"]}'
+        ))
@@ -0,0 +1,89 @@
+"""
+Метрики в формате Prometheus на странице /metrics.
+
+Время ответа и SQL по имени URL пишет RequestTimingMiddleware
+(budget.timing), попадания в кеш отчётов — budget.report_cache, бизнес-
+события — импорт, регулярные операции и сигнал сохранения операции.
+
+Под gunicorn у каждого воркера свои значения: с переменной окружения
+PROMETHEUS_MULTIPROC_DIR (задаётся до запуска) воркеры пишут их в файлы
+каталога, и страница суммирует все процессы. gunicorn.conf.py очищает
+каталог при старте и отмечает завершившиеся воркеры. Без переменной
+метрики хранятся в памяти процесса (runserver, тесты).
+
+Страница доступна только с адресов METRICS_ALLOWED_NETWORKS и, если
+задан METRICS_TOKEN, с заголовком «Authorization: Bearer <токен>».
+"""
+import hmac
+import ipaddress
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+REQUEST_DURATION = Histogram(
+    'budget_request_duration_seconds', 'Время ответа по имени URL',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter('budget_db_queries', 'Число SQL-запросов по имени URL', ['view'])
+DB_DURATION = Counter('budget_db_query_seconds', 'Время SQL-запросов по имени URL', ['view'])
+TEMPLATE_DURATION = Counter(
+    'budget_template_render_seconds', 'Время отрисовки шаблонов без SQL по имени URL', ['view']
+)
+REPORT_CACHE = Counter('budget_report_cache_requests', 'Обращения к кешу отчётов', ['result'])
+
+TRANSACTIONS_CREATED = Counter('budget_transactions_created', 'Созданные операции', ['source'])
+IMPORT_ROWS = Counter('budget_import_rows', 'Строки импорта CSV', ['result'])
+RECURRING_PROCESSED = Counter(
+    'budget_recurring_processed', 'Проведённые регулярные операции (правила за проход)'
+)
+
+# Обновляются при публикации статистики пула (budget.db_pool), сумма по живым процессам
+POOL_CONNECTIONS = Gauge(
+    'budget_db_pool_connections', 'Соединения пула', ['state'], multiprocess_mode='livesum'
+)
+POOL_WAITING = Gauge(
+    'budget_db_pool_waiting', 'Запросы, ждущие соединения', multiprocess_mode='livesum'
+)
+
+
+def view_label(request):
+    match = request.resolver_match
+    return match.view_name if match else 'unmatched'
+
+
+def observe(request, response, timing, times):
+    """Замер запроса из budget.timing: times — в миллисекундах"""
+    view = view_label(request)
+    REQUEST_DURATION.labels(view, request.method, response.status_code).observe(times['total'] / 1000)
+    DB_QUERIES.labels(view).inc(timing.queries)
+    DB_DURATION.labels(view).inc(times['db'] / 1000)
+    TEMPLATE_DURATION.labels(view).inc(times['template'] / 1000)
+
+
+def allowed(request):
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    if not any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS):
+        return False
+    token = settings.METRICS_TOKEN
+    return not token or hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    if not allowed(request):
+        return HttpResponseForbidden()
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('budget', 'Transaction')
+    MonthlyRollup = apps.get_model('budget', 'MonthlyRollup')
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id', 'currency_id')
+        .annotate(total=Sum('amount'), total_base=Sum('amount_base'), count=Count('id'))
+        .order_by()
+    )
+    MonthlyRollup.objects.bulk_create(
+        (MonthlyRollup(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0011_budget_budget_budget_user_month_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_base', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='budget.category')),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='budget.currency')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'category', 'currency'), name='budget_rollup_unique_key')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0013_transaction_recurring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=10)),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='budget.currency')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('currency', 'effective_date'), name='budget_rate_currency_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,102 @@
+"""
+Полнотекстовый поиск по описанию операций (см. budget.search).
+
+PostgreSQL: хранимая генерируемая колонка search_vector (конфигурация
+'russian') с GIN-индексом и триграммный GIN-индекс по description
+(расширение pg_trgm; если на сервере его нет, индекс не создаётся и поиск
+работает без нечёткого сравнения). Добавление колонки переписывает
+таблицу — на больших базах миграцию лучше выполнять в окно обслуживания.
+
+SQLite: внешняя таблица FTS5 над budget_transaction и триггеры,
+поддерживающие её в актуальном состоянии.
+
+В модели колонок нет: ORM о них не знает, запросы строит budget.search.
+"""
+from django.db import migrations
+
+POSTGRES_FORWARDS = [
+    '''
+    ALTER TABLE budget_transaction ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('russian'::regconfig, coalesce(description, ''))) STORED
+    ''',
+    'CREATE INDEX budget_tx_search_idx ON budget_transaction USING GIN (search_vector)',
+]
+POSTGRES_TRIGRAM = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX budget_tx_description_trgm_idx ON budget_transaction USING GIN (description gin_trgm_ops)',
+]
+POSTGRES_BACKWARDS = [
+    'DROP INDEX IF EXISTS budget_tx_description_trgm_idx',
+    'ALTER TABLE budget_transaction DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARDS = [
+    '''
+    CREATE VIRTUAL TABLE budget_transaction_fts USING fts5(
+        description, content='budget_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER budget_transaction_fts_insert AFTER INSERT ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER budget_transaction_fts_delete AFTER DELETE ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts (budget_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END
+    ''',
+    '''
+    CREATE TRIGGER budget_transaction_fts_update AFTER UPDATE OF description ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts (budget_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO budget_transaction_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    ''',
+    "INSERT INTO budget_transaction_fts (budget_transaction_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARDS = [
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_update',
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_insert',
+    'DROP TABLE IF EXISTS budget_transaction_fts',
+]
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARDS
+        if trigram_available(schema_editor):
+            statements = statements + POSTGRES_TRIGRAM
+    elif vendor == 'sqlite':
+        statements = SQLITE_FORWARDS
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def backwards(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_BACKWARDS, 'sqlite': SQLITE_BACKWARDS}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0014_exchangerate'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
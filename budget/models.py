@@ -18,13 +18,35 @@ class Transaction(models.Model):
     description = models.TextField(blank=True, null=True)
     currency = models.ForeignKey('Currency', on_delete=models.PROTECT)
     amount_base = models.DecimalField(max_digits=10, decimal_places=2)
+    # Регулярная операция, из которой создана эта запись
+    recurring = models.ForeignKey(
+        'RecurringTransaction', on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
+
+    class Meta:
+        constraints = [
+            # Каждое повторение регулярной операции создаётся не более одного раза
+            models.UniqueConstraint(
+                fields=['recurring', 'date'],
+                condition=models.Q(recurring__isnull=False),
+                name='budget_tx_recurring_occurrence',
+            ),
+        ]
+        indexes = [
+            # Выборки пользователя за период и постраничный вывод по (date, id)
+            models.Index(fields=['user', 'date', 'id'], name='budget_tx_user_date_idx'),
+            # Суммы по категории за месяц (бюджеты по категориям)
+            models.Index(fields=['user', 'category', 'date'], name='budget_tx_user_cat_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.category}: {self.amount}"
 
     def save(self, *args, **kwargs):
-        if self.currency:
-            self.amount_base = self.amount * self.currency.rate
+        from .currency_cache import get_rate
+
+        if self.currency_id:
+            self.amount_base = self.amount * get_rate(self.currency_id, self.date)
         super().save(*args, **kwargs)
 
 class Budget(models.Model): 
@@ -34,6 +56,11 @@ class Budget(models.Model):
     month = models.DateField()  
     currency = models.ForeignKey('Currency', on_delete=models.PROTECT, default=1)  # default=1 — BYN
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month'], name='budget_budget_user_month_idx'),
+        ]
+
     def __str__(self):
         return f"{self.category} - {self.limit} {self.currency.symbol} ({self.month})"
 
@@ -60,7 +87,11 @@ class Currency(models.Model):
     code = models.CharField(max_length=3)  # Например, USD, EUR, RUB
     name = models.CharField(max_length=50)  # Доллар США, Евро, Рубль
     symbol = models.CharField(max_length=5)  # $, €, ₽
-    rate = models.DecimalField(max_digits=10, decimal_places=4)  # Курс к основной валюте
+    # Курс к основной валюте до первой записи ExchangeRate. Когда история есть,
+    # новый курс вводится записью ExchangeRate: операции и лимиты бюджетов
+    # считаются по истории (currency_cache.get_rate), а правка rate меняет
+    # курс только для дат раньше первой записи
+    rate = models.DecimalField(max_digits=10, decimal_places=4)
 
     class Meta:
         verbose_name_plural = "currencies"
@@ -68,6 +99,25 @@ class Currency(models.Model):
     def __str__(self):
         return self.code
 
+class ExchangeRate(models.Model):
+    """Курс валюты, действующий с effective_date до следующей записи"""
+    currency = models.ForeignKey(Currency, on_delete=models.CASCADE, related_name='rates')
+    effective_date = models.DateField()
+    rate = models.DecimalField(max_digits=10, decimal_places=4)
+
+    class Meta:
+        constraints = [
+            # Индекс этого ограничения отвечает и на «курс на дату D»:
+            # currency = X AND effective_date <= D ORDER BY effective_date DESC LIMIT 1
+            models.UniqueConstraint(
+                fields=['currency', 'effective_date'],
+                name='budget_rate_currency_date',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.currency} {self.effective_date}: {self.rate}"
+
 class MonthlyBudget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     month = models.DateField()
@@ -96,4 +146,64 @@ class UserPreferences(models.Model):
     )
 
     def __str__(self):
-        return f"Настройки пользователя {self.user.username}"
\ No newline at end of file
+        return f"Настройки пользователя {self.user.username}"
+
+class MonthlyRollup(models.Model):
+    """Итоги операций за месяц по категории и валюте, поддерживаются при записи Transaction"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()  # Первое число месяца
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    currency = models.ForeignKey('Currency', on_delete=models.PROTECT)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_base = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Сумма в BYN
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category', 'currency'],
+                name='budget_rollup_unique_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m} {self.category}: {self.total_base}"
+
+class IdempotencyKey(models.Model):
+    """Ответ на запрос с заголовком Idempotency-Key: повтор запроса получает его же"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # sha256 тела запроса
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='budget_idempotency_user_key'),
+        ]
+        indexes = [
+            # Удаление устаревших ключей
+            models.Index(fields=['created'], name='budget_idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.key}"
+
+class TransactionArchive(models.Model):
+    """Операции пользователя за месяц, перенесённые из Transaction в сжатый архив"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()  # Первое число месяца
+    count = models.IntegerField()
+    # [[category_id, currency_id, total, total_base, count], ...] — итоги для MonthlyRollup
+    totals = models.JSONField()
+    data = models.BinaryField()  # gzip JSON-списка строк, см. budget.archive
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'month'], name='budget_archive_user_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m}: {self.count}"
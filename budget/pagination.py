@@ -0,0 +1,131 @@
+"""Постраничный вывод по ключу (keyset) без OFFSET и COUNT(*)"""
+import base64
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор after/before не декодируется (при strict=True)"""
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _parse_ordering(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Возвращает значения ключа или None, если курсор повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    fields = _parse_ordering(ordering)
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        return [_to_python(model, name, value) for (name, _), value in zip(fields, values)]
+    except (ValidationError, TypeError):
+        return None
+
+
+def _to_python(model, name, value):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Аннотация (например, rank) — значение уже в типе JSON
+        if not isinstance(value, (int, float, str)) or isinstance(value, bool):
+            raise TypeError(name)
+        return value
+    return field.to_python(value)
+
+
+def _after(fields, values, backwards):
+    """
+    Условие «строго после ключа» в порядке сортировки:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(fields, values):
+        lookup = 'lt' if descending != backwards else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _key(item, fields):
+    if isinstance(item, dict):
+        return [item[name] for name, _ in fields]
+    return [getattr(item, name) for name, _ in fields]
+
+
+def _decode(cursor, model, ordering, strict, name):
+    values = decode_cursor(cursor, model, ordering)
+    if values is None and strict:
+        raise InvalidCursor(f'{name}: повреждённый курсор')
+    return values
+
+
+def paginate_keyset(queryset, ordering, after=None, before=None, per_page=50, strict=False):
+    """
+    Страница queryset, упорядоченного по ordering (последнее поле должно быть
+    уникальным, например '-id'). after/before — курсоры из предыдущей страницы.
+    Повреждённый курсор даёт первую страницу, а со strict=True — InvalidCursor.
+    """
+    fields = _parse_ordering(ordering)
+    model = queryset.model
+
+    if before:
+        values = _decode(before, model, ordering, strict, 'before')
+        if values is not None:
+            reverse_ordering = [name if descending else f'-{name}' for name, descending in fields]
+            items = list(
+                queryset.filter(_after(fields, values, backwards=True))
+                .order_by(*reverse_ordering)[:per_page + 1]
+            )
+            has_previous = len(items) > per_page
+            items = items[:per_page][::-1]
+            if not items:
+                return paginate_keyset(queryset, ordering, per_page=per_page)
+            return KeysetPage(
+                items=items,
+                next_cursor=encode_cursor(_key(items[-1], fields)),
+                previous_cursor=encode_cursor(_key(items[0], fields)) if has_previous else None,
+            )
+
+    queryset = queryset.order_by(*ordering)
+    values = _decode(after, model, ordering, strict, 'after') if after else None
+    if values is not None:
+        queryset = queryset.filter(_after(fields, values, backwards=False))
+
+    items = list(queryset[:per_page + 1])
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(_key(items[-1], fields)) if has_next else None,
+        previous_cursor=encode_cursor(_key(items[0], fields)) if values is not None and items else None,
+    )
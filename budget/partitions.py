@@ -0,0 +1,286 @@
+"""
+Необязательное секционирование budget_transaction по date (PostgreSQL).
+
+Таблица операций — единственная, растущая без ограничений, а выборки по
+ней почти всегда за месяц или диапазон месяцев. В режиме секционирования
+budget_transaction — таблица PARTITION BY RANGE (date) с секцией на месяц
+или год и секцией DEFAULT для дат вне созданных секций (вставка не падает,
+даже если новые секции вовремя не созданы).
+
+Переход и возврат выполняет команда partition_transactions: таблица
+пересоздаётся в одной транзакции под ACCESS EXCLUSIVE, данные копируются,
+индексы и ограничения переносятся под прежними именами. Секции создаются
+не раньше чем за HISTORY_YEARS лет до текущей даты: более старые строки
+(в том числе ошибочные даты вроде 0202 года) остаются в DEFAULT, а не
+порождают тысячи пустых секций. Первичный ключ
+секционированной таблицы — (id, date): уникальные ключи обязаны включать
+ключ секционирования; уникальность id обеспечивает последовательность.
+Модель и миграции Django о режиме не знают; миграции с CREATE INDEX
+CONCURRENTLY по budget_transaction в этом режиме не выполнятся.
+
+Секции на AHEAD периодов вперёд создаёт ensure_partitions() — её вызывает
+partition_transactions --ensure, которую нужно запускать по расписанию
+(например, ежедневно) отдельно от остальных задач. Если в DEFAULT уже есть
+строки нового периода, они переносятся в созданную секцию.
+Секции, опустевшие после архивации (budget.archive), удаляет
+drop_empty_partitions(); операции за их даты попадут в DEFAULT.
+"""
+import re
+from datetime import date
+
+from django.db import connection, transaction
+
+from .dates import add_months, month_start
+
+PARENT = 'budget_transaction'
+DEFAULT_PARTITION = f'{PARENT}_default'
+INTERVALS = ('month', 'year')
+# Сколько будущих периодов держать созданными
+AHEAD = {'month': 3, 'year': 1}
+# Глубина истории, для которой создаются секции; более старые даты — в DEFAULT
+HISTORY_YEARS = 10
+
+_bound = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [PARENT]
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions():
+    """[(имя, начало, конец)] секций по датам, без DEFAULT"""
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+        ''', [PARENT])
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        match = _bound.search(bound)
+        if match:
+            result.append((name, date.fromisoformat(match[1]), date.fromisoformat(match[2])))
+    return sorted(result, key=lambda row: row[1])
+
+
+def partition_names():
+    """Имена всех секций, включая DEFAULT"""
+    return {name for name, _, _ in partitions()} | {DEFAULT_PARTITION}
+
+
+def current_interval():
+    """Период секций: год, если есть секция длиннее месяца"""
+    return 'year' if any((end - start).days > 31 for _, start, end in partitions()) else 'month'
+
+
+def period_start(day, interval):
+    return day.replace(month=1, day=1) if interval == 'year' else month_start(day)
+
+
+def next_period(start, interval):
+    return add_months(start, 12 if interval == 'year' else 1)
+
+
+def partition_name(start, interval):
+    return f'{PARENT}_p{start:%Y}' if interval == 'year' else f'{PARENT}_p{start:%Y_%m}'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _columns(cursor, table):
+    """Колонки таблицы, кроме генерируемых (search_vector)"""
+    cursor.execute('''
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    ''', [table])
+    return ', '.join(_quote(name) for name, in cursor.fetchall())
+
+
+def _create_partition(cursor, start, interval):
+    end = next_period(start, interval)
+    name = partition_name(start, interval)
+    create = (
+        f'CREATE TABLE {_quote(name)} PARTITION OF {_quote(PARENT)} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {_quote(DEFAULT_PARTITION)} WHERE date >= %s AND date < %s)',
+        [start, end],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(create)
+        return name
+
+    # Секция не создаётся, пока в DEFAULT есть строки её диапазона — переносим их
+    columns = _columns(cursor, PARENT)
+    cursor.execute(
+        f'CREATE TEMPORARY TABLE budget_transaction_moving ON COMMIT DROP AS '
+        f'SELECT {columns} FROM {_quote(DEFAULT_PARTITION)} WITH NO DATA'
+    )
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {_quote(DEFAULT_PARTITION)} WHERE date >= %s AND date < %s '
+        f'RETURNING {columns}) INSERT INTO budget_transaction_moving SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(create)
+    cursor.execute(
+        f'INSERT INTO {_quote(PARENT)} ({columns}) OVERRIDING SYSTEM VALUE '
+        f'SELECT {columns} FROM budget_transaction_moving'
+    )
+    cursor.execute('DROP TABLE budget_transaction_moving')
+    return name
+
+
+def _create_partitions(cursor, first, last, interval, existing=()):
+    """Секции периодов с first по last включительно, которых ещё нет"""
+    created = []
+    start = period_start(first, interval)
+    while start <= last:
+        if partition_name(start, interval) not in existing:
+            created.append(_create_partition(cursor, start, interval))
+        start = next_period(start, interval)
+    return created
+
+
+def ensure_partitions(today=None, ahead=None):
+    """Создаёт недостающие секции до периода today + ahead; возвращает их имена"""
+    if not is_partitioned():
+        return []
+    today = today or date.today()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Параллельные вызовы (запуски по расписанию на нескольких узлах) ждут друг друга
+        cursor.execute(f'LOCK TABLE {_quote(PARENT)} IN SHARE ROW EXCLUSIVE MODE')
+        interval = current_interval()
+        existing = partitions()
+        last = period_start(today, interval)
+        for _ in range(AHEAD[interval] if ahead is None else ahead):
+            last = next_period(last, interval)
+        # Новые секции — после последней существующей: пропуски в истории остаются в DEFAULT
+        first = next_period(existing[-1][1], interval) if existing else period_start(today, interval)
+        return _create_partitions(cursor, first, last, interval, {name for name, _, _ in existing})
+
+
+def drop_empty_partitions(before):
+    """Удаляет пустые секции, целиком лежащие до before; возвращает их имена"""
+    if not is_partitioned():
+        return []
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        # DROP секции всё равно берёт ACCESS EXCLUSIVE у родителя — сразу, без повышения
+        cursor.execute(f'LOCK TABLE {_quote(PARENT)} IN ACCESS EXCLUSIVE MODE')
+        for name, _, end in partitions():
+            if end > before:
+                break
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {_quote(name)})')
+            if not cursor.fetchone()[0]:
+                cursor.execute(f'DROP TABLE {_quote(name)}')
+                dropped.append(name)
+    return dropped
+
+
+def _definitions(cursor, table):
+    """Первичный ключ, прочие ограничения и индексы таблицы для переноса на новую"""
+    cursor.execute('''
+        SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c')
+        ORDER BY conname
+    ''', [table])
+    constraints = cursor.fetchall()
+    primary_key = next(name for name, kind, _ in constraints if kind == 'p')
+    cursor.execute('''
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = %s
+        ORDER BY indexname
+    ''', [table])
+    owned = {name for name, kind, _ in constraints if kind in ('p', 'u')}
+    # У секционированной таблицы индексы родителя объявлены ON ONLY
+    indexes = [
+        definition.replace(' ON ONLY ', ' ON ')
+        for name, definition in cursor.fetchall() if name not in owned
+    ]
+    others = [(name, definition) for name, kind, definition in constraints if kind != 'p']
+    return primary_key, others, indexes
+
+
+def _rebuild(interval=None, ahead=0, today=None):
+    """Пересоздаёт budget_transaction секционированной (interval) или обычной (None)"""
+    old = f'{PARENT}_old'
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Отложенные проверки внешних ключей не дают удалить старую таблицу
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {_quote(PARENT)} IN ACCESS EXCLUSIVE MODE')
+        primary_key, constraints, indexes = _definitions(cursor, PARENT)
+        columns = _columns(cursor, PARENT)
+        cursor.execute(
+            "SELECT is_identity = 'YES', pg_get_serial_sequence(%s, 'id') "
+            "FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'id'",
+            [PARENT, PARENT],
+        )
+        identity, sequence = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {_quote(PARENT)} RENAME TO {_quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {_quote(PARENT)} (LIKE {_quote(old)} '
+            f'INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING IDENTITY)'
+            + (' PARTITION BY RANGE (date)' if interval else '')
+        )
+        if interval:
+            cursor.execute(f'CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {_quote(PARENT)} DEFAULT')
+            cursor.execute(f'SELECT min(date) FROM {_quote(old)}')
+            today = today or date.today()
+            horizon = period_start(add_months(today, -12 * HISTORY_YEARS), interval)
+            first = max(cursor.fetchone()[0] or today, horizon)
+            last = period_start(today, interval)
+            for _ in range(ahead):
+                last = next_period(last, interval)
+            _create_partitions(cursor, first, last, interval)
+
+        cursor.execute(
+            f'INSERT INTO {_quote(PARENT)} ({columns}) OVERRIDING SYSTEM VALUE '
+            f'SELECT {columns} FROM {_quote(old)}'
+        )
+        if not identity:
+            # serial: последовательность принадлежит старой таблице и удалилась бы с ней
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {_quote(PARENT)}.id')
+        cursor.execute(f'DROP TABLE {_quote(old)}')
+
+        key = '(id, date)' if interval else '(id)'
+        cursor.execute(f'ALTER TABLE {_quote(PARENT)} ADD CONSTRAINT {_quote(primary_key)} PRIMARY KEY {key}')
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {_quote(PARENT)} ADD CONSTRAINT {_quote(name)} {definition}')
+        for definition in indexes:
+            cursor.execute(definition)
+        if identity:
+            # Новая identity-последовательность начинается с 1
+            cursor.execute(f"SELECT pg_get_serial_sequence('{PARENT}', 'id')")
+            new_sequence, = cursor.fetchone()
+            cursor.execute(
+                f'SELECT setval(%s, coalesce((SELECT max(id) FROM {_quote(PARENT)}), 0) + 1, false)',
+                [new_sequence],
+            )
+            if new_sequence != sequence:
+                cursor.execute(f'ALTER SEQUENCE {new_sequence} RENAME TO {sequence.split(".")[-1]}')
+        cursor.execute(f'ANALYZE {_quote(PARENT)}')
+
+
+def partition_table(interval='month', ahead=None, today=None):
+    """Переводит budget_transaction в секционированную по date таблицу"""
+    if interval not in INTERVALS:
+        raise ValueError(f'interval: {", ".join(INTERVALS)}')
+    _rebuild(interval, AHEAD[interval] if ahead is None else ahead, today)
+
+
+def unpartition_table():
+    """Возвращает budget_transaction обычной таблицей"""
+    _rebuild()
@@ -0,0 +1,143 @@
+"""
+Бюджет SQL-запросов для каждой страницы budget/urls.py.
+
+Число запросов страницы не должно зависеть от объёма данных: N+1 в
+представлении проявляется как рост числа запросов вместе с числом операций
+или категорий. Проверяется тестом test_query_budgets на двух объёмах данных
+и бенчмарком pages. Бюджет — для первого запроса после изменения данных
+пользователя (кеш отчётов пуст), с учётом чтения сессии и пользователя.
+Страницы только для POST замеряются на запросе с телом из POST_BODIES.
+"""
+import json
+from datetime import date
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve, reverse
+
+from . import report_cache, urls
+from .models import Category, MonthlyBudget, RecurringTransaction
+
+QUERY_BUDGETS = {
+    'dashboard': 7,
+    'add_transaction': 3,
+    'add_category': 2,
+    'add_budget': 3,
+    'register': 2,
+    'analytics': 2,
+    'analytics_categories': 3,
+    'analytics_trend': 3,
+    'export_csv': 3,
+    'export_csv (архив)': 5,
+    'import_csv': 2,
+    'transactions_list': 4,
+    'transactions_list (фильтр)': 5,
+    'transactions_list (поиск)': 4,
+    'transactions_json': 3,
+    'transactions_json (фильтр)': 4,
+    'transactions_json (поиск)': 3,
+    'transactions_batch': 7,
+    'recurring_transactions': 4,
+    'process_recurring': 5,
+    'delete_recurring': 3,
+    'monthly_summary': 5,
+    'monthly_summary (прошлый год)': 5,
+    'add_monthly_budget': 2,
+    'budget_settings': 3,
+    'edit_monthly_budget': 3,
+    'transaction_create': 4,
+    'metrics': 0,
+}
+
+# Объект пользователя для страниц с <int:pk>
+URL_OBJECTS = {
+    'edit_monthly_budget': MonthlyBudget,
+    'delete_recurring': RecurringTransaction,
+}
+
+
+def _expense_filter(user):
+    category = Category.objects.filter(user=user, is_income=False).order_by('pk').first()
+    return {'operation_type': 'expense', 'category': category.pk}
+
+
+# Дополнительные варианты страниц с GET-параметрами
+VARIANTS = {
+    'transactions_list': {
+        'фильтр': _expense_filter,
+        'поиск': lambda user: {'search': 'обед'},
+    },
+    'transactions_json': {
+        'фильтр': lambda user: {**_expense_filter(user), 'fields': 'date,amount,category_name'},
+        'поиск': lambda user: {'search': 'обед'},
+    },
+    'export_csv': {
+        'архив': lambda user: {'archive': 1},
+    },
+    'monthly_summary': {
+        'прошлый год': lambda user: {'year': date.today().year - 1},
+    },
+}
+
+
+def _batch_items(user):
+    category = Category.objects.filter(user=user, is_income=False).order_by('pk').first()
+    return [
+        {'date': date.today().isoformat(), 'category': category.pk, 'amount': '12.30'}
+        for _ in range(100)
+    ]
+
+
+# Страницы только для POST: тело JSON-запроса при замере
+POST_BODIES = {
+    'transactions_batch': _batch_items,
+}
+
+
+def pages(user):
+    """[(имя, url)] всех страниц budget/urls.py для пользователя с данными из budget.seed"""
+    result = []
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue  # include('django.contrib.auth.urls') — страницы самого Django
+        kwargs = {}
+        if pattern.pattern.converters:
+            model = URL_OBJECTS[pattern.name]
+            kwargs['pk'] = model.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[0]
+        url = reverse(pattern.name, kwargs=kwargs)
+        result.append((pattern.name, url))
+        for label, params in VARIANTS.get(pattern.name, {}).items():
+            result.append((f'{pattern.name} ({label})', f'{url}?{urlencode(params(user))}'))
+    return result
+
+
+def request_body(user, url):
+    """Тело POST-запроса для страниц из POST_BODIES, для остальных None"""
+    name = resolve(urlsplit(url).path).url_name
+    return POST_BODIES[name](user) if name in POST_BODIES else None
+
+
+def fetch(client, url, body=None):
+    """
+    Ответ на GET или, если есть тело, на POST с JSON; потоковый ответ
+    читается целиком — запросы идут при чтении
+    """
+    if body is None:
+        response = client.get(url)
+    else:
+        response = client.post(url, json.dumps(body), content_type='application/json')
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def count_queries(client, user, url):
+    """(код ответа, число запросов) при пустом кеше отчётов и фрагментов пользователя"""
+    body = request_body(user, url)
+    fetch(client, url, body)  # настройки пользователя и cookie CSRF создаются при первом запросе
+    report_cache.changed([user.pk])
+    report_cache.categories_changed([user.pk])
+    with CaptureQueriesContext(connection) as queries:
+        response = fetch(client, url, body)
+    return response.status_code, len(queries)
@@ -0,0 +1,182 @@
+"""
+Проверка планов «горячих» запросов: выборочные запросы представлений должны
+читать таблицы по своим индексам (миграция 0011 и уникальные ключи). Только
+для PostgreSQL.
+
+EXPLAIN выполняется с настройками планировщика по умолчанию на данных после
+ANALYZE, поэтому данных должно быть достаточно, чтобы индекс был выгоднее
+чтения таблицы целиком: seed_plan_data() заполняет длинную историю
+проверяемого пользователя и нескольких соседей. Запросы по всей истории
+пользователя (тренд, сводка по годам, пересчёт итогов, поиск) индекс не
+проверяют: при большой доле пользователя в таблице Seq Scan для них верен.
+
+Если budget_transaction секционирована (budget.partitions), индексы секций
+считаются индексами родительской таблицы, а отдельно проверяется, что
+запросы операций за период (список, поиск, API) читают только секции этого
+периода. Отчёты читают MonthlyRollup и в этой проверке не участвуют, а
+выгрузка CSV читает всю историю.
+"""
+import json
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from . import partitions
+from .dates import month_filter, month_range
+from .models import Budget, Category, MonthlyBudget, MonthlyRollup, Transaction
+from .search import RANKED_ORDERING, search
+from .seed import seed_user
+
+CHECKED_TABLES = {
+    'budget_transaction', 'budget_budget', 'budget_monthlybudget', 'budget_monthlyrollup',
+}
+# Объём данных для проверки: на меньшем планировщику выгоднее читать таблицы целиком
+PLAN_MONTHS = 60
+PLAN_NEIGHBOURS = 5
+
+
+def seed_plan_data(user, transactions=5000, months=PLAN_MONTHS, neighbours=PLAN_NEIGHBOURS):
+    """История пользователя и соседей, на которой проверяются планы, и ANALYZE"""
+    seed_user(user, transactions=transactions, months=months)
+    for i in range(neighbours):
+        other = User.objects.create_user(username=f'{user.username}_neighbour_{i}')
+        seed_user(other, transactions=transactions // 2, months=months, seed=i + 1)
+    analyze()
+
+
+def unique_index(model, *columns):
+    """Имя индекса уникального ограничения модели по колонкам (unique_together)"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return next(
+        name for name, info in constraints.items()
+        if info['unique'] and info['columns'] == list(columns)
+    )
+
+
+def hot_queries(user, today=None):
+    """
+    {название: (запрос в том виде, в каком его выполняет представление,
+    ожидаемый индекс или None для запросов по всей истории)}
+    """
+    today = today or date.today()
+    month_rollups = MonthlyRollup.objects.filter(user=user, **month_filter('month', today))
+    category = Category.objects.filter(user=user, is_income=False).first()
+
+    return {
+        'dashboard: месячный бюджет': (MonthlyBudget.objects.filter(
+            user=user, **month_filter('month', today)
+        ), unique_index(MonthlyBudget, 'user_id', 'month')),
+        'dashboard: бюджеты по категориям': (Budget.objects.filter(
+            user=user, **month_filter('month', today)
+        ).select_related('category', 'currency'), 'budget_budget_user_month_idx'),
+        'get_monthly_summary': (month_rollups.filter(
+            category__is_income=False
+        ).values('total_base'), 'budget_rollup_unique_key'),
+        'get_category_budget_data': (month_rollups.filter(
+            category=category
+        ).values('total_base'), 'budget_rollup_unique_key'),
+        'analytics: месяцы': (MonthlyRollup.objects.filter(user=user).dates('month', 'month'), None),
+        'analytics: по категориям': (month_rollups.filter(
+            category__is_income=False
+        ).values('category__name', 'category__color').annotate(
+            total=Sum('total_base')
+        ), 'budget_rollup_unique_key'),
+        'analytics: тренд': (MonthlyRollup.objects.filter(
+            user=user, category__is_income=False
+        ).values('month').annotate(total=Sum('total_base')), None),
+        'monthly_summary': (MonthlyRollup.objects.filter(user=user).values(
+            'month', 'currency__code', 'category__is_income'
+        ).annotate(total=Sum('total_base')), None),
+        'transactions_list': (
+            Transaction.objects.filter(user=user).order_by('-date', '-id')[:51],
+            'budget_tx_user_date_idx',
+        ),
+        'transactions_list: категория': (
+            Transaction.objects.filter(user=user, category=category).order_by('-date', '-id')[:51],
+            'budget_tx_user_cat_date_idx',
+        ),
+        'transactions_list: поиск': (search(
+            Transaction.objects.filter(user=user), 'обед'
+        ).order_by(*RANKED_ORDERING)[:51], None),
+        'пересчёт итогов': (Transaction.objects.filter(user=user).annotate(
+            month=TruncMonth('date')
+        ).values('month', 'category_id', 'currency_id').annotate(total=Sum('amount_base')), None),
+    }
+
+
+def analyze():
+    """Обновляет статистику планировщика после загрузки тестовых данных"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {", ".join(sorted(CHECKED_TABLES))}')
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def explain(queryset):
+    """План запроса (настройки планировщика по умолчанию) в виде списка узлов"""
+    plan = json.loads(queryset.explain(format='json'))
+    return list(_plan_nodes(plan[0]['Plan']))
+
+
+def _parent_indexes():
+    """{индекс секции: индекс родительской таблицы}"""
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT c.relname, p.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind = 'i'
+        ''')
+        return dict(cursor.fetchall())
+
+
+def check_hot_queries(user, today=None):
+    """Возвращает {название запроса: (использованные индексы, ожидаемый индекс или None)}"""
+    parents = _parent_indexes() if partitions.is_partitioned() else {}
+    result = {}
+    for name, (queryset, expected) in hot_queries(user, today).items():
+        indexes = {node['Index Name'] for node in explain(queryset) if 'Index Name' in node}
+        result[name] = (sorted({parents.get(index, index) for index in indexes}), expected)
+    return result
+
+
+def period_queries(user, today=None):
+    """{название: (queryset, секции операций, которые ему нужны)} для запросов за месяц"""
+    today = today or date.today()
+    interval = partitions.current_interval()
+    current = {partitions.partition_name(partitions.period_start(today, interval), interval)}
+    first_day, next_month = month_range(today)
+    # Фильтр формы «с даты — по дату» за месяц
+    in_month = Transaction.objects.filter(
+        user=user, date__gte=first_day, date__lte=next_month - timedelta(days=1)
+    )
+    return {
+        'операции за месяц': (Transaction.objects.filter(
+            user=user, **month_filter('date', today)
+        ).values('category_id').annotate(total=Sum('amount_base')), current),
+        'transactions_list: фильтр по датам': (in_month.order_by('-date', '-id')[:51], current),
+        'transactions_list: поиск за месяц': (
+            search(in_month, 'обед').order_by(*RANKED_ORDERING)[:51], current,
+        ),
+        'transactions_json: фильтр по датам': (in_month.order_by('-date', '-id').values_list(
+            'date', 'id', 'category__name', 'amount', 'description', 'currency__code', 'amount_base'
+        )[:51], current),
+    }
+
+
+def check_partition_pruning(user, today=None):
+    """{название запроса: (прочитанные секции операций, нужные секции)}"""
+    names = partitions.partition_names()
+    result = {}
+    for name, (queryset, expected) in period_queries(user, today).items():
+        scanned = {node['Relation Name'] for node in explain(queryset) if node.get('Relation Name') in names}
+        result[name] = (sorted(scanned), sorted(expected))
+    return result
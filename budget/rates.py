@@ -0,0 +1,110 @@
+"""
+Пересчёт amount_base по истории курсов.
+
+Курс на дату берётся из ExchangeRate (последняя запись с effective_date не
+позже даты операции), а до первой записи — из Currency.rate. Пересчёт идёт
+окнами по id: каждое окно — одна транзакция с одним UPDATE ... FROM, поэтому
+блокировки и объём журнала ограничены размером окна при любом объёме таблицы.
+Изменения сумм в том же запросе сворачиваются в дельты месячных итогов.
+
+Запросы написаны для PostgreSQL (изменяющий CTE, date_trunc).
+"""
+from dataclasses import dataclass
+from datetime import date
+
+from django.db import connection, transaction
+
+from . import rollups
+from .models import Currency, ExchangeRate, Transaction
+
+BATCH_SIZE = 50000
+# Начало действия Currency.rate — раньше любой операции
+EPOCH = date(1, 1, 1)
+
+
+@dataclass
+class RecomputeReport:
+    batches: int = 0
+    updated: int = 0
+
+
+def _periods_sql():
+    """Периоды действия курсов: (currency_id, start, end, rate), end не включается"""
+    currency = connection.ops.quote_name(Currency._meta.db_table)
+    rates = connection.ops.quote_name(ExchangeRate._meta.db_table)
+    return f'''
+        SELECT currency_id, start, LEAD(start) OVER w AS "end", rate
+        FROM (
+            SELECT id AS currency_id, %s::date AS start, rate FROM {currency}
+            UNION ALL
+            SELECT currency_id, effective_date, rate FROM {rates}
+        ) AS r
+        WINDOW w AS (PARTITION BY currency_id ORDER BY start)
+    '''
+
+
+def _update_sql(conditions):
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    return f'''
+        WITH changed AS (
+            SELECT t.id, ROUND(t.amount * p.rate, 2) - t.amount_base AS diff
+            FROM {table} AS t
+            JOIN ({_periods_sql()}) AS p
+              ON p.currency_id = t.currency_id
+             AND t.date >= p.start AND (p."end" IS NULL OR t.date < p."end")
+            WHERE t.id >= %s AND t.id < %s {conditions}
+              AND t.amount_base <> ROUND(t.amount * p.rate, 2)
+        ), updated AS (
+            UPDATE {table} AS t
+            SET amount_base = t.amount_base + changed.diff
+            FROM changed
+            WHERE t.id = changed.id
+            RETURNING t.user_id, t.date, t.category_id, t.currency_id, changed.diff
+        )
+        SELECT user_id, date_trunc('month', date)::date, category_id, currency_id,
+               SUM(diff), COUNT(*)
+        FROM updated
+        GROUP BY 1, 2, 3, 4
+    '''
+
+
+def recompute_amount_base(date_from=None, date_to=None, currency=None, batch_size=BATCH_SIZE):
+    """
+    Приводит amount_base операций с date_from по date_to включительно
+    (и, если указано, только в валюте currency) к курсам на их даты.
+    """
+    transactions = Transaction.objects.all()
+    conditions, params = '', []
+    if date_from is not None:
+        transactions = transactions.filter(date__gte=date_from)
+        conditions += ' AND t.date >= %s'
+        params.append(date_from)
+    if date_to is not None:
+        transactions = transactions.filter(date__lte=date_to)
+        conditions += ' AND t.date <= %s'
+        params.append(date_to)
+    if currency is not None:
+        transactions = transactions.filter(currency=currency)
+        conditions += ' AND t.currency_id = %s'
+        params.append(getattr(currency, 'pk', currency))
+
+    report = RecomputeReport()
+    first = transactions.order_by('id').values_list('id', flat=True).first()
+    if first is None:
+        return report
+    last = transactions.order_by('-id').values_list('id', flat=True).first()
+
+    sql = _update_sql(conditions)
+    for start in range(first, last + 1, batch_size):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [EPOCH, start, start + batch_size, *params])
+                rows = cursor.fetchall()
+            # Изменилась только сумма в BYN: число операций и total те же
+            rollups.apply({
+                (user_id, month, category_id, currency_id): [0, diff, 0]
+                for user_id, month, category_id, currency_id, diff, _ in rows
+            })
+        report.batches += 1
+        report.updated += sum(row[5] for row in rows)
+    return report
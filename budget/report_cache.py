@@ -0,0 +1,122 @@
+"""
+Кеш отчётов (аналитика, сводка по месяцам) с версией данных пользователя.
+
+Ключ отчёта содержит номер версии данных пользователя и общий номер версии.
+Любая запись операций, категорий, бюджетов и настроек меняет версию пользователя
+(сигналы в budget.signals, массовые пути — через rollups.apply), массовый
+пересчёт по всем пользователям меняет общую версию. Старые записи больше не
+читаются и вытесняются бэкендом, поэтому срок жизни нужен только для уборки.
+
+Отдельная версия категорий пользователя — ключ кешированных фрагментов
+шаблона с кнопками категорий (dashboard.html): изменение операций их не
+сбрасывает.
+
+Версия меняется сразу и повторно после фиксации транзакции: иначе запрос,
+прочитавший данные до фиксации, мог бы сохранить их под новой версией.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+GLOBAL_VERSION_KEY = 'budget:data_version'
+USER_VERSION_KEY = 'budget:data_version:{}'
+CATEGORY_VERSION_KEY = 'budget:category_version:{}'
+# Устаревшие версии никто не читает; срок жизни — только чтобы они не копились
+TIMEOUT = 30 * 24 * 3600
+
+_missing = object()
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def _bump(key):
+    cache.set(key, time.time_ns(), timeout=None)
+
+
+def versions(user_id):
+    """Пара (общая версия, версия пользователя); отсутствующие создаются"""
+    keys = [GLOBAL_VERSION_KEY, USER_VERSION_KEY.format(user_id)]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return found[keys[0]], found[keys[1]]
+
+
+def changed(user_ids):
+    """Данные пользователей изменились: их отчёты из кеша больше не используются"""
+    keys = [USER_VERSION_KEY.format(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+
+    def bump():
+        for key in keys:
+            _bump(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def category_version(user_id):
+    """Версия категорий пользователя; отсутствующая создаётся"""
+    key = CATEGORY_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def categories_changed(user_ids):
+    """Категории пользователей изменились: фрагменты с их кнопками больше не используются"""
+    keys = [CATEGORY_VERSION_KEY.format(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+
+    def bump():
+        for key in keys:
+            _bump(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def changed_all():
+    """Изменились данные всех пользователей (массовый пересчёт)"""
+    _bump(GLOBAL_VERSION_KEY)
+    transaction.on_commit(lambda: _bump(GLOBAL_VERSION_KEY))
+
+
+def get_or_compute(user_id, name, compute, *parts):
+    """Результат compute() из кеша по ключу (пользователь, версия, name, parts)"""
+    global_version, user_version = versions(user_id)
+    key = ':'.join(map(str, ('budget:report', user_id, global_version, user_version, name, *parts)))
+    value = cache.get(key, _missing)
+    hit = value is not _missing
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+    metrics.REPORT_CACHE.labels('hit' if hit else 'miss').inc()
+    if not hit:
+        value = compute()
+        cache.set(key, value, timeout=TIMEOUT)
+    return value
+
+
+def etag(user_id, *parts):
+    """ETag ответа, зависящего только от данных пользователя и parts"""
+    global_version, user_version = versions(user_id)
+    return '-'.join(map(str, (global_version, user_version, *parts)))
+
+
+def stats():
+    """Счётчики попаданий и промахов этого процесса"""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0}
@@ -0,0 +1,133 @@
+"""
+Поддержка таблицы MonthlyRollup — месячных итогов по (пользователь, месяц,
+категория, валюта). Отчёты читают итоги отсюда, поэтому их стоимость зависит
+от числа месяцев и категорий, а не от числа операций.
+
+Одиночные save()/delete() учитываются сигналами (budget.signals), массовые
+пути (bulk_create) должны вызывать add_transactions() сами. QuerySet.update()
+итоги не обновляет — после него нужен rebuild() или команда rebuild_rollups.
+Архивация (budget.archive) удаляет операции, оставляя их итоги.
+Изменение итогов делает недействительными отчёты в кеше (budget.report_cache).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from . import archive, report_cache
+from .dates import month_start
+from .models import MonthlyRollup, Transaction
+
+UPSERT_BATCH_SIZE = 500
+
+
+def rollup_key(user_id, value, category_id, currency_id):
+    return (user_id, month_start(value), category_id, currency_id)
+
+
+def collect(transactions, sign=1, into=None):
+    """Суммирует операции (модели или словари значений) по ключу итогов"""
+    deltas = into if into is not None else defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for t in transactions:
+        if isinstance(t, dict):
+            key = rollup_key(t['user_id'], t['date'], t['category_id'], t['currency_id'])
+            amount, amount_base = t['amount'], t['amount_base']
+        else:
+            key = rollup_key(t.user_id, t.date, t.category_id, t.currency_id)
+            amount, amount_base = t.amount, t.amount_base
+        delta = deltas[key]
+        delta[0] += sign * Decimal(str(amount))
+        delta[1] += sign * Decimal(str(amount_base))
+        delta[2] += sign
+    return deltas
+
+
+def merge(*deltas):
+    result = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for part in deltas:
+        for key, (total, total_base, count) in part.items():
+            row = result[key]
+            row[0] += total
+            row[1] += total_base
+            row[2] += count
+    return result
+
+
+def apply(deltas):
+    """
+    Прибавляет изменения к итогам одним INSERT ... ON CONFLICT DO UPDATE на
+    пачку и сбрасывает отчёты затронутых пользователей; возвращает их id
+    """
+    rows = sorted(
+        (key, value) for key, value in deltas.items()
+        if value[2] or value[0] or value[1]
+    )
+    if not rows:
+        return set()
+
+    table = connection.ops.quote_name(MonthlyRollup._meta.db_table)
+    columns = ['user_id', 'month', 'category_id', 'currency_id', 'total', 'total_base', 'count']
+    quoted = [connection.ops.quote_name(c) for c in columns]
+    updates = ', '.join(
+        f'{c} = {table}.{c} + EXCLUDED.{c}' for c in quoted[4:]
+    )
+
+    with transaction.atomic(savepoint=False):
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                batch = rows[start:start + UPSERT_BATCH_SIZE]
+                values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(batch))
+                params = [v for key, value in batch for v in (*key, *value)]
+                cursor.execute(
+                    f'INSERT INTO {table} ({", ".join(quoted)}) VALUES {values} '
+                    f'ON CONFLICT ({", ".join(quoted[:4])}) DO UPDATE SET {updates}',
+                    params,
+                )
+        user_ids = {key[0] for key, _ in rows}
+        if any(value[2] < 0 for _, value in rows):
+            MonthlyRollup.objects.filter(user_id__in=user_ids, count__lte=0).delete()
+        report_cache.changed(user_ids)
+    return user_ids
+
+
+def add_transactions(transactions):
+    """Учитывает операции, созданные через bulk_create"""
+    apply(collect(transactions))
+
+
+def remove_transactions(transactions):
+    apply(collect(transactions, sign=-1))
+
+
+def rebuild(user=None):
+    """
+    Пересчитывает итоги по операциям с нуля (для одного или всех пользователей).
+    Итоги архивированных операций берутся из архива
+    """
+    transactions = Transaction.objects.all()
+    rollups = MonthlyRollup.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    rows = (
+        transactions
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category_id', 'currency_id')
+        .annotate(total=Sum('amount'), total_base=Sum('amount_base'), count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        MonthlyRollup.objects.bulk_create(
+            (MonthlyRollup(**row) for row in rows.iterator()),
+            batch_size=1000,
+        )
+        apply(archive.archived_totals(user))
+        if user is not None:
+            report_cache.changed([user.pk])
+        else:
+            report_cache.changed_all()
+    return rollups.count()
@@ -0,0 +1,89 @@
+"""
+Поиск операций по описанию с ранжированием.
+
+PostgreSQL: совпадение по search_vector (to_tsvector('russian'), учитывает
+словоформы) или триграммное сходство слов (опечатки). Оба условия
+обслуживаются GIN-индексами из миграции 0015. Ранг — сумма ts_rank и
+word_similarity. Если расширения pg_trgm на сервере нет, ищется только
+по search_vector.
+
+SQLite: FTS5 с префиксным поиском по каждому слову, ранг — bm25.
+
+Результат аннотирован полем rank; постраничный вывод — по RANKED_ORDERING.
+"""
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+RANKED_ORDERING = ('-rank', '-date', '-id')
+SEARCH_CONFIG = 'russian'
+
+_word = re.compile(r'\w+')
+
+
+def _column(queryset, name):
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    return f'{table}.{connection.ops.quote_name(name)}'
+
+
+@lru_cache
+def has_trigram():
+    """Установлено ли pg_trgm (проверяется один раз за процесс)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _postgresql(queryset, text):
+    vector = RawSQL(_column(queryset, 'search_vector'), [], output_field=SearchVectorField())
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    queryset = queryset.alias(search_vector=vector)
+    if not has_trigram():
+        matches = Q(search_vector=query)
+        rank = SearchRank(vector, query)
+    else:
+        matches = Q(search_vector=query) | Q(description__trigram_word_similar=text)
+        rank = SearchRank(vector, query) + TrigramWordSimilarity(text, 'description')
+    # real -> double: значение в курсоре страницы должно точно совпадать с вычисленным
+    return queryset.filter(matches).annotate(rank=Cast(rank, FloatField()))
+
+
+def fts5_query(text):
+    """Строка MATCH для FTS5: каждое слово в кавычках и как префикс"""
+    return ' '.join(f'"{word}"*' for word in _word.findall(text))
+
+
+def _sqlite(queryset, text):
+    match = fts5_query(text)
+    if not match:
+        return queryset.none()
+    rank = RawSQL(
+        f'SELECT -bm25(budget_transaction_fts) FROM budget_transaction_fts '
+        f'WHERE budget_transaction_fts MATCH %s AND rowid = {_column(queryset, "id")}',
+        [match],
+        output_field=FloatField(),
+    )
+    ids = RawSQL(
+        'SELECT rowid FROM budget_transaction_fts WHERE budget_transaction_fts MATCH %s',
+        [match],
+    )
+    return queryset.filter(id__in=ids).annotate(rank=rank)
+
+
+def search(queryset, text):
+    """Операции из queryset, подходящие под text, с аннотацией rank"""
+    if connection.vendor == 'postgresql':
+        return _postgresql(queryset, text)
+    if connection.vendor == 'sqlite':
+        return _sqlite(queryset, text)
+    # Прочие базы: без индекса и ранжирования
+    return queryset.filter(description__icontains=text).annotate(
+        rank=RawSQL('0', [], output_field=FloatField())
+    )
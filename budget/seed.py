@@ -0,0 +1,120 @@
+"""Генерация тестовых данных для проверки планов запросов и нагрузочных тестов"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+
+from . import report_cache, rollups
+from .models import Budget, Category, Currency, MonthlyBudget, RecurringTransaction, Transaction
+
+EXPENSE_CATEGORIES = [
+    ('Продукты', '#198754'), ('Транспорт', '#0d6efd'), ('Кафе', '#fd7e14'),
+    ('Аптека', '#dc3545'), ('Связь', '#6f42c1'), ('Коммунальные', '#20c997'),
+    ('Одежда', '#d63384'), ('Развлечения', '#ffc107'), ('Подарки', '#0dcaf0'),
+    ('Спорт', '#6610f2'),
+]
+INCOME_CATEGORIES = [
+    ('Зарплата', '#198754'), ('Подработка', '#0d6efd'), ('Проценты', '#6c757d'),
+]
+DESCRIPTIONS = [
+    'Покупка в магазине', 'Поездка на такси', 'Обед с коллегами', 'Оплата интернета',
+    'Лекарства', 'Кофе', 'Подарок на день рождения', 'Абонемент в зал', 'Аванс', 'Премия',
+]
+# Регулярные операции: категория, периодичность, сумма
+RECURRING_RULES = [
+    ('Зарплата', 'monthly', Decimal(2500)), ('Коммунальные', 'monthly', Decimal(150)),
+    ('Связь', 'monthly', Decimal(30)), ('Спорт', 'monthly', Decimal(60)),
+    ('Продукты', 'weekly', Decimal(80)),
+]
+BATCH_SIZE = 5000
+
+
+def ensure_currencies():
+    if not Currency.objects.exists():
+        call_command('loaddata', 'initial_currencies', verbosity=0)
+    return list(Currency.objects.order_by('pk'))
+
+
+def month_starts(end, months):
+    """Первые числа последних months месяцев, от старых к новым"""
+    result = []
+    current = end.replace(day=1)
+    for _ in range(months):
+        result.append(current)
+        current = (current - timedelta(days=1)).replace(day=1)
+    return result[::-1]
+
+
+def seed_user(user, transactions=1000, months=24, extra_categories=0, seed=0, today=None,
+              recurring=0):
+    """
+    Заполняет историю пользователя: категории, бюджеты по месяцам и
+    transactions операций, равномерно распределённых по months месяцам.
+    recurring — число регулярных операций (сроки в будущем, правила по кругу
+    из RECURRING_RULES).
+    """
+    rnd = random.Random(seed)
+    today = today or date.today()
+    currencies = ensure_currencies()
+    base = next((c for c in currencies if c.code == 'BYN'), currencies[0])
+
+    names = EXPENSE_CATEGORIES + [
+        (f'Категория {i + 1}', '#6c757d') for i in range(extra_categories)
+    ]
+    categories = Category.objects.bulk_create(
+        [Category(user=user, name=name, color=color, is_income=False) for name, color in names]
+        + [Category(user=user, name=name, color=color, is_income=True) for name, color in INCOME_CATEGORIES]
+    )
+    report_cache.categories_changed([user.id])
+    expense = [c for c in categories if not c.is_income]
+    income = [c for c in categories if c.is_income]
+
+    starts = month_starts(today, months)
+    Budget.objects.bulk_create([
+        Budget(user=user, category=category, limit=Decimal(rnd.randrange(100, 1000)),
+               month=month, currency=base)
+        for month in starts for category in expense[:10]
+    ])
+    MonthlyBudget.objects.bulk_create([
+        MonthlyBudget(user=user, month=month, income_plan=Decimal(3000),
+                      expense_plan=Decimal(2500), currency=base)
+        for month in starts
+    ])
+
+    if recurring:
+        by_name = {category.name: category for category in categories}
+        RecurringTransaction.objects.bulk_create([
+            RecurringTransaction(
+                user=user, category=by_name[name], amount=amount, currency=base,
+                description=name, frequency=frequency, start_date=starts[0],
+                next_date=today + timedelta(days=rnd.randrange(1, 8 if frequency == 'weekly' else 31)),
+            )
+            for name, frequency, amount in (
+                RECURRING_RULES[i % len(RECURRING_RULES)] for i in range(recurring)
+            )
+        ])
+
+    first_day = starts[0]
+    span = (today - first_day).days + 1
+    batch = []
+    for _ in range(transactions):
+        currency = base if rnd.random() < 0.8 else rnd.choice(currencies)
+        category = rnd.choice(income) if rnd.random() < 0.1 else rnd.choice(expense)
+        amount = Decimal(rnd.randrange(100, 50000)) / 100
+        batch.append(Transaction(
+            user=user,
+            category=category,
+            amount=amount,
+            currency=currency,
+            amount_base=(amount * currency.rate).quantize(Decimal('0.01')),
+            date=first_day + timedelta(days=rnd.randrange(span)),
+            description=rnd.choice(DESCRIPTIONS),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            rollups.add_transactions(Transaction.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        rollups.add_transactions(Transaction.objects.bulk_create(batch))
+
+    return categories
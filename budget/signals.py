@@ -0,0 +1,89 @@
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import currency_cache, db_pool, metrics, report_cache, rollups
+from .models import Budget, Category, Currency, ExchangeRate, MonthlyBudget, Transaction, UserPreferences
+
+ROLLUP_FIELDS = ('user_id', 'date', 'category_id', 'currency_id', 'amount', 'amount_base')
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if raw or instance._state.adding:
+        return
+    instance._rollup_previous = (
+        Transaction.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    deltas = rollups.collect([instance])
+    if previous:
+        deltas = rollups.merge(deltas, rollups.collect([previous], sign=-1))
+    if instance.user_id not in rollups.apply(deltas):
+        # Итоги не изменились (правка описания), а список операций — да
+        report_cache.changed([instance.user_id])
+    if created:
+        # Массовые пути (импорт, регулярные операции) считают свои операции сами
+        metrics.TRANSACTIONS_CREATED.labels('single').inc()
+
+
+def deleted_directly(origin):
+    """Удаление самой операции, а не каскад от категории или пользователя"""
+    return (
+        origin is None
+        or isinstance(origin, Transaction)
+        or getattr(origin, 'model', None) is Transaction
+    )
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # Итоги удалённой категории или пользователя удаляются каскадно вместе с ними
+    if deleted_directly(origin):
+        # apply() сбрасывает и отчёты пользователя
+        rollups.remove_transactions([instance])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        report_cache.categories_changed([instance.user_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=MonthlyBudget)
+@receiver(post_delete, sender=MonthlyBudget)
+@receiver(post_save, sender=UserPreferences)
+def invalidate_user_reports(sender, instance, raw=False, **kwargs):
+    if not raw:
+        report_cache.changed([instance.user_id])
+
+
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_currency_cache(sender, **kwargs):
+    currency_cache.invalidate()
+    # В отчётах есть валюты бюджетов — сбрасываем их у всех пользователей
+    report_cache.changed_all()
+    # Повторно после фиксации: другие воркеры могли успеть перечитать старые данные
+    transaction.on_commit(currency_cache.invalidate)
+
+
+@receiver(request_finished)
+def publish_pool_stats(sender, **kwargs):
+    # Для команды pool_stats; без пула соединений ничего не делает
+    db_pool.publish()
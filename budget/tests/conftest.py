@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+from budget import currency_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Версии данных и кеш валют не должны переходить из теста в тест
+    cache.clear()
+    currency_cache.invalidate()
@@ -0,0 +1,62 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from budget.models import Category, Currency, Transaction
+
+
+@pytest.fixture
+def user_data(client):
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    salary = Category.objects.create(name="Зарплата", is_income=True, user=user)
+    for day in range(1, 6):
+        Transaction.objects.create(user=user, category=food, amount=day, currency=cur,
+                                   date=date(2024, 3, day), description=f"Обед {day}")
+    Transaction.objects.create(user=user, category=salary, amount=1000, currency=cur, date=date(2024, 3, 10))
+    client.login(username="testuser", password="pass")
+    return user, food, salary
+
+
+@pytest.mark.django_db
+def test_pages_with_selected_fields(client, user_data):
+    url = reverse("transactions_json")
+    params = {"operation_type": "expense", "fields": "date,amount", "per_page": 2}
+
+    first = client.get(url, params).json()
+    assert first["results"] == [{"date": "2024-03-05", "amount": "5.00"},
+                                {"date": "2024-03-04", "amount": "4.00"}]
+    assert first["previous"] is None
+
+    second = client.get(url, {**params, "after": first["next"]}).json()
+    assert [row["date"] for row in second["results"]] == ["2024-03-03", "2024-03-02"]
+    back = client.get(url, {**params, "before": second["previous"]}).json()
+    assert back["results"] == first["results"]
+
+
+@pytest.mark.django_db
+def test_joins_only_for_requested_fields(client, user_data):
+    url = reverse("transactions_json")
+    with CaptureQueriesContext(connection) as queries:
+        row = client.get(url, {"fields": "id,amount_base"}).json()["results"][0]
+    assert set(row) == {"id", "amount_base"}
+    assert "budget_category" not in queries[-1]["sql"]
+
+    row = client.get(url, {"search": "обед", "date_from": "2024-03-05"}).json()["results"]
+    assert [(r["category_name"], r["currency"], r["is_income"]) for r in row] == [("Еда", "BYN", False)]
+
+
+@pytest.mark.django_db
+def test_bad_parameters(client, user_data):
+    url = reverse("transactions_json")
+    assert client.get(url, {"fields": "id,password"}).status_code == 400
+    assert client.get(url, {"per_page": 5000}).status_code == 400
+    assert "не указано ни одного поля" in client.get(url, {"fields": ","}).json()["error"]
+    for cursor in ("after", "before"):
+        response = client.get(url, {cursor: "garbage"})
+        assert response.status_code == 400
+        assert cursor in response.json()["error"]
+    assert "date_from" in client.get(url, {"date_from": "вчера"}).json()["errors"]
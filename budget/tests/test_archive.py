@@ -0,0 +1,130 @@
+import pytest
+from datetime import date
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from budget import archive, partitions, report_cache, rollups
+from budget.csv_io import export_transactions
+from budget.models import Category, Currency, MonthlyRollup, Transaction, TransactionArchive
+
+
+@pytest.fixture
+def user_data(client):
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    taxi = Category.objects.create(name="Такси", is_income=False, user=user)
+    for month in (1, 2, 3):
+        for day in (5, 20):
+            Transaction.objects.create(user=user, category=food, amount=month * 10 + day, currency=cur,
+                                       date=date(2022, month, day), description=f"Обед {month}.{day}")
+    Transaction.objects.create(user=user, category=taxi, amount=7, currency=cur, date=date(2022, 1, 9))
+    client.login(username="testuser", password="pass")
+    return user, food, taxi
+
+
+def rollup_rows(user):
+    return sorted(MonthlyRollup.objects.filter(user=user)
+                  .values_list("month", "category_id", "total", "total_base", "count"))
+
+
+def export(user, include_archive):
+    return "".join(export_transactions(user, include_archive=include_archive)).splitlines()
+
+
+@pytest.mark.django_db
+def test_archive_keeps_totals_and_exports(client, user_data):
+    user, food, taxi = user_data
+    totals = rollup_rows(user)
+    full_export = export(user, include_archive=False)
+    summary = client.get(reverse("monthly_summary"), {"year": 2022}).context["summary"]
+
+    report = archive.archive_transactions(date(2022, 3, 15))
+    assert (report.months, report.transactions) == (2, 5)
+    assert list(Transaction.objects.filter(user=user).values_list("date", flat=True).order_by("date")) == [
+        date(2022, 3, 5), date(2022, 3, 20)]
+    assert rollup_rows(user) == totals
+    report_cache.changed([user.pk])
+    assert client.get(reverse("monthly_summary"), {"year": 2022}).context["summary"] == summary
+
+    # Операция, добавленная в уже архивированный месяц, идёт в выгрузке по порядку
+    cur = Currency.objects.get(code="BYN")
+    Transaction.objects.create(user=user, category=taxi, amount=3, currency=cur, date=date(2022, 1, 15))
+    totals = rollup_rows(user)
+    assert rollups.rebuild(user) == len(totals)
+    assert rollup_rows(user) == totals
+
+    assert len(export(user, include_archive=False)) == 4
+    exported = export(user, include_archive=True)
+    assert exported[1:] == full_export[1:6] + ["2022-01-15,Такси,3.00,,BYN,3.00"] + full_export[6:]
+    response = client.get(reverse("export_csv"), {"archive": 1})
+    assert b"".join(response.streaming_content).decode().splitlines() == exported
+
+
+@pytest.mark.django_db
+def test_restore_month(user_data):
+    user, food, taxi = user_data
+    archive.archive_transactions(date(2022, 3, 1))
+    months = set(TransactionArchive.objects.values_list("month", flat=True))
+    assert months == {date(2022, 1, 1), date(2022, 2, 1)}
+
+    taxi.delete()
+    assert rollups.rebuild(user) == 3
+    assert archive.restore_month(user, date(2022, 1, 1)) == 2
+    restored = Transaction.objects.filter(user=user, date__month=1).order_by("date")
+    assert [(t.category, t.amount, t.description) for t in restored] == [
+        (food, 15, "Обед 1.5"), (food, 30, "Обед 1.20")]
+    assert TransactionArchive.objects.get().month == date(2022, 2, 1)
+    totals = rollup_rows(user)
+    rollups.rebuild(user)
+    assert rollup_rows(user) == totals
+
+
+@pytest.mark.django_db
+def test_archive_and_restore_change_etag(client, user_data):
+    user, food, taxi = user_data
+    url = reverse("transactions_list")
+    client.get(url)  # CSRF-cookie входит в ETag
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    archive.archive_transactions(date(2022, 3, 1))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.context["transactions"]) == 2
+
+    assert list(response.context["available_months"]) == [date(2022, 3, 1)]
+
+    etag = response["ETag"]
+    archive.restore_month(user, date(2022, 1, 1))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.context["transactions"]) == 5
+    assert list(response.context["available_months"]) == [date(2022, 3, 1), date(2022, 1, 1)]
+
+
+@pytest.mark.django_db
+def test_archive_command(user_data):
+    user, food, taxi = user_data
+    out = StringIO()
+    call_command("archive_transactions", "--before", "2022-03-01", stdout=out)
+    assert "Заархивировано операций: 5" in out.getvalue()
+    call_command("archive_transactions", "--user", "testuser", "--restore", "2022-02", stdout=out)
+    assert "Восстановлено операций: 2" in out.getvalue()
+    assert Transaction.objects.filter(user=user).count() == 4
+
+
+# Изменения схемы откатываются вместе с транзакцией теста
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="секционирование есть только в PostgreSQL")
+@pytest.mark.django_db
+def test_drop_empty_partitions(user_data):
+    user, food, taxi = user_data
+    partitions.partition_table("month", ahead=0, today=date(2022, 3, 1))
+    archive.archive_transactions(date(2022, 3, 1))
+    assert partitions.drop_empty_partitions(date(2022, 3, 1)) == [
+        "budget_transaction_p2022_01", "budget_transaction_p2022_02"]
+    assert [name for name, _, _ in partitions.partitions()] == ["budget_transaction_p2022_03"]
+    assert archive.restore_month(user, date(2022, 2, 1)) == 2
+    assert Transaction.objects.filter(user=user).count() == 4
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+import re
+from asgiref.sync import async_to_sync
+from datetime import date
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from budget import async_views, views
+from budget.dates import month_start
+from budget.models import Budget, Category, Currency, MonthlyBudget, Transaction, UserPreferences
+
+
+def call(view, user, path="/"):
+    request = RequestFactory().get(path)
+    request.user = user
+
+    async def auser():
+        return user
+
+    request.auser = auser
+    if asyncio.iscoroutinefunction(view):
+        return async_to_sync(view)(request)
+    return view(request)
+
+
+def without_csrf(content):
+    # Маскированный CSRF-токен свой при каждой отрисовке
+    return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b"", content)
+
+
+# Потоки пула работают через свои соединения и видят только зафиксированные данные
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("budget_type", ["monthly", "category"])
+def test_async_dashboard_matches_sync(budget_type):
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    Category.objects.create(name="Зарплата", is_income=True, user=user)
+    UserPreferences.objects.create(user=user, budget_type=budget_type)
+    month = month_start(date.today())
+    MonthlyBudget.objects.create(user=user, month=month, income_plan=100, expense_plan=50, currency=cur)
+    Budget.objects.create(user=user, category=food, limit=40, currency=cur, month=month)
+    Transaction.objects.create(user=user, category=food, amount=10, currency=cur, date=date.today())
+
+    expected = call(views.dashboard, user)
+    response = call(async_views.dashboard, user)
+
+    assert response.status_code == 200
+    assert without_csrf(response.content) == without_csrf(expected.content)
+    assert response["ETag"] == expected["ETag"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_analytics_categories():
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    Transaction.objects.create(user=user, category=food, amount=10, currency=cur, date=date(2024, 3, 5))
+
+    response = call(async_views.analytics_categories, user, "/?month=2024-03")
+
+    assert response.status_code == 200
+    assert response.content == call(views.analytics_categories, user, "/?month=2024-03").content
@@ -0,0 +1,95 @@
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from budget.models import Category, Currency, MonthlyRollup, Transaction
+
+
+@pytest.fixture
+def user_data(client):
+    user = User.objects.create_user(username="testuser", password="pass")
+    byn = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    usd = Currency.objects.create(code="USD", name="Доллар США", symbol="$", rate=Decimal("3.2"))
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    client.login(username="testuser", password="pass")
+    return user, byn, usd, food
+
+
+def post(client, items, **headers):
+    return client.post(reverse("transactions_batch"), json.dumps(items),
+                       content_type="application/json", **headers)
+
+
+@pytest.mark.django_db
+def test_batch_creates_valid_items(client, user_data, django_assert_max_num_queries):
+    user, byn, usd, food = user_data
+    other = Category.objects.create(name="Чужая", user=User.objects.create_user(username="other"))
+    items = [
+        {"date": "2024-03-01", "category": food.pk, "amount": "10.50", "description": "Обед"},
+        {"date": "2024-03-02", "category": food.pk, "amount": 2, "currency": usd.pk},
+        {"date": "2024-13-01", "category": other.pk, "amount": "abc"},
+        "не объект",
+    ] + [{"date": "2024-03-03", "category": food.pk, "amount": "1"}] * 100
+    post(client, items[:1])  # валюты загружаются в кеш
+
+    with django_assert_max_num_queries(12):
+        data = post(client, items).json()
+
+    assert (data["created"], data["errors"]) == (102, 2)
+    assert data["results"][0]["status"] == "created"
+    assert set(data["results"][2]["errors"]) == {"date", "category", "amount"}
+    assert data["results"][3]["errors"] == {"item": "ожидается объект"}
+    created = Transaction.objects.get(pk=data["results"][1]["id"])
+    assert (created.currency_id, created.amount_base) == (usd.pk, Decimal("6.40"))
+    assert MonthlyRollup.objects.get(user=user, currency=byn).count == 102
+
+
+@pytest.mark.django_db
+def test_batch_idempotency_key(client, user_data):
+    user, byn, usd, food = user_data
+    items = [{"date": "2024-03-01", "category": food.pk, "amount": "10"}]
+
+    first = post(client, items, HTTP_IDEMPOTENCY_KEY="sync-1")
+    retry = post(client, items, HTTP_IDEMPOTENCY_KEY="sync-1")
+
+    assert retry.json() == first.json()
+    assert retry["Idempotent-Replayed"] == "true"
+    assert Transaction.objects.filter(user=user).count() == 1
+    assert post(client, items * 2, HTTP_IDEMPOTENCY_KEY="sync-1").status_code == 422
+    assert post(client, items, HTTP_IDEMPOTENCY_KEY="sync-2").status_code == 200
+    assert Transaction.objects.filter(user=user).count() == 2
+
+
+@pytest.mark.django_db
+def test_batch_rejects_bad_body(client, user_data, settings, monkeypatch):
+    url = reverse("transactions_batch")
+    assert client.get(url).status_code == 405
+    assert client.post(url, "{", content_type="application/json").status_code == 400
+    assert post(client, {"date": "2024-03-01"}).status_code == 400
+    monkeypatch.setattr("budget.views.MAX_BATCH_SIZE", 2)
+    assert post(client, [{}] * 3).status_code == 413
+
+
+@pytest.mark.django_db
+def test_batch_script_session_flow(user_data):
+    user, byn, usd, food = user_data
+    script = Client(enforce_csrf_checks=True)
+    url = reverse("transactions_batch")
+    body = json.dumps([{"date": "2024-03-01", "category": food.pk, "amount": "1"}])
+
+    response = script.post(url, body, content_type="application/json")
+    assert response.status_code == 401
+    assert "error" in response.json()
+
+    # Как в docstring transactions_batch: cookie csrftoken, вход формой, X-CSRFToken
+    script.get(reverse("login"))
+    token = script.cookies["csrftoken"].value
+    script.post(reverse("login"), {"username": "testuser", "password": "pass", "csrfmiddlewaretoken": token})
+    token = script.cookies["csrftoken"].value
+    assert script.post(url, body, content_type="application/json").status_code == 403
+    response = script.post(url, body, content_type="application/json", HTTP_X_CSRFTOKEN=token)
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
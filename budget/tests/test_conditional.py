@@ -0,0 +1,60 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.urls import reverse
+from budget.models import Category, Currency, Transaction, UserPreferences
+
+
+@pytest.fixture
+def logged_in(client):
+    user = User.objects.create_user(username="testuser", password="pass")
+    client.login(username="testuser", password="pass")
+    return user
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ["dashboard", "transactions_list", "monthly_summary"])
+def test_not_modified_without_aggregation(client, logged_in, name, django_assert_max_num_queries):
+    url = reverse(name)
+    # Первый ответ выдаёт CSRF-cookie (а dashboard создаёт настройки) — ETag меняется один раз
+    client.get(url)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "Last-Modified" in response
+
+    # Только сессия и пользователь
+    with django_assert_max_num_queries(2):
+        response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_params_and_data(client, logged_in):
+    url = reverse("transactions_list")
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    assert client.get(url, {"search": "обед"}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=logged_in)
+    etag = client.get(url)["ETag"]
+    Transaction.objects.create(user=logged_in, category=food, amount=10, currency=cur, date=date(2024, 3, 5))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.context["transactions"]) == 1
+
+
+@pytest.mark.django_db
+def test_preferences_change_invalidates_dashboard(client, logged_in):
+    url = reverse("dashboard")
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    preferences = UserPreferences.objects.get(user=logged_in)
+    preferences.budget_type = "category"
+    preferences.save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.context["budget_type"] == "category"
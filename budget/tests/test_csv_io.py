@@ -0,0 +1,94 @@
+import io
+import pytest
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.urls import reverse
+from budget import currency_cache
+from budget.csv_io import import_transactions
+from budget.models import Category, Currency, Transaction
+
+
+def make_file(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+@pytest.mark.django_db
+def test_import_transactions_bulk(django_assert_max_num_queries):
+    user = User.objects.create_user(username="testuser", password="pass")
+    Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3.2)
+    Category.objects.create(name="Еда", is_income=False, user=user)
+    rows = "".join(f"2024-03-{i % 28 + 1:02d},Еда,10.50,Обед {i}\n" for i in range(50))
+    file = make_file(
+        "﻿Дата,Категория,Сумма,Описание,Валюта\n"
+        + rows
+        + "2024-03-15,Такси,5,Поездка,USD\n"
+        + "2024-13-01,Еда,1,Плохая дата\n"
+        + "2024-03-01,Еда,abc,Плохая сумма\n"
+        + "2024-03-01,Еда,1,Плохая валюта,XXX\n"
+    )
+    currency_cache.get_currencies()
+
+    with django_assert_max_num_queries(9):
+        report = import_transactions(user, file, batch_size=20)
+
+    assert report.created == 51
+    assert report.created_categories == 1
+    assert [line for line, _ in report.errors] == [53, 54, 55]
+    taxi = Transaction.objects.get(category__name="Такси")
+    assert taxi.amount_base == Decimal("16.00")
+    assert taxi.currency.code == "USD"
+
+
+@pytest.mark.django_db
+def test_import_skips_income_category_with_same_name():
+    user = User.objects.create_user(username="testuser", password="pass")
+    Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    Category.objects.create(name="Подарки", is_income=True, user=user)
+
+    report = import_transactions(user, make_file("Дата,Категория,Сумма,Описание\n2024-03-01,Подарки,20,Цветы\n"))
+
+    assert (report.created, report.created_categories) == (1, 1)
+    assert Transaction.objects.get().category.is_income is False
+
+
+@pytest.mark.django_db
+def test_import_transactions_unreadable_file_saves_nothing():
+    user = User.objects.create_user(username="testuser", password="pass")
+    Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    file = io.BytesIO("Дата,Категория,Сумма,Описание\n2024-03-01,Еда,1,x\n".encode() + b"\xff\xfe\n")
+
+    report = import_transactions(user, file)
+
+    assert report.created == 0
+    assert report.error_count == 1
+    assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db
+def test_export_streams_and_reimports(client, django_assert_num_queries):
+    user = User.objects.create_user(username="testuser", password="pass")
+    Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3.2)
+    cat = Category.objects.create(name="Еда", is_income=False, user=user)
+    for day in range(1, 11):
+        Transaction.objects.create(
+            user=user, category=cat, amount=10, currency=usd, date=f"2024-03-{day:02d}", description="Обед"
+        )
+    # Сумма в BYN, посчитанная по старому курсу, должна пережить повторный импорт
+    Transaction.objects.filter(user=user).update(amount_base=Decimal("30.00"))
+    client.login(username="testuser", password="pass")
+
+    response = client.get(reverse("export_csv"))
+    with django_assert_num_queries(1):
+        content = b"".join(response.streaming_content)
+
+    assert content.startswith("﻿Дата,Категория,Сумма,Описание,Валюта,Сумма в BYN".encode())
+    assert content.count(b"\n") == 11
+
+    other = User.objects.create_user(username="other", password="pass")
+    report = import_transactions(other, io.BytesIO(content))
+    assert report.created == 10 and not report.error_count
+    assert set(Transaction.objects.filter(user=other).values_list("currency__code", "amount_base")) == {
+        ("USD", Decimal("30.00"))
+    }
@@ -0,0 +1,78 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from budget import currency_cache
+from budget.forms import TransactionForm
+from budget.models import Category, Currency, Transaction
+
+
+@pytest.mark.django_db
+def test_rate_change_invalidates_cache():
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    assert currency_cache.get_rate(usd.pk) == 3
+
+    usd.rate = Decimal("3.5")
+    usd.save()
+
+    assert currency_cache.get_rate(usd.pk) == Decimal("3.5")
+    assert "USD" in currency_cache.by_code()
+
+
+@pytest.mark.django_db
+def test_currency_field_uses_cache(django_assert_num_queries):
+    user = User.objects.create_user(username="testuser", password="pass")
+    byn = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    category = Category.objects.create(name="Еда", is_income=False, user=user)
+    currency_cache.get_currencies()
+
+    form = TransactionForm(
+        data={"category": category.id, "amount": "10", "currency": usd.id, "date": "2024-03-05"},
+    )
+    assert form.is_valid(), form.errors
+    assert form.cleaned_data["currency"] == usd
+
+    with django_assert_num_queries(0):
+        html = form["currency"].as_widget()
+    assert f'value="{byn.id}"' in html and f'value="{usd.id}"' in html
+
+    transaction = form.save(commit=False)
+    transaction.user = user
+    with CaptureQueriesContext(connection) as queries:
+        transaction.save()
+    assert not [q for q in queries.captured_queries if "budget_currency" in q["sql"]]
+    assert Transaction.objects.get().amount_base == Decimal("30.00")
+
+
+@pytest.mark.django_db
+def test_unknown_currency_is_invalid():
+    user = User.objects.create_user(username="testuser", password="pass")
+    category = Category.objects.create(name="Еда", is_income=False, user=user)
+
+    form = TransactionForm(
+        data={"category": category.id, "amount": "10", "currency": 999999, "date": "2024-03-05"},
+    )
+
+    assert not form.is_valid()
+    assert "currency" in form.errors
+
+
+@pytest.mark.django_db
+def test_shared_version_checked_once_per_interval(monkeypatch):
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    currency_cache.get_rate(usd.pk)
+    reads = []
+    get = currency_cache.cache.get
+    monkeypatch.setattr(currency_cache.cache, "get", lambda key, *args: reads.append(key) or get(key, *args))
+
+    for _ in range(50):
+        assert currency_cache.get_rate(usd.pk, "2024-03-05") == 3
+        assert currency_cache.get_currency(usd.pk) == usd
+    assert reads == []
+
+    monkeypatch.setattr(currency_cache, "VERSION_CHECK_INTERVAL", 0)
+    currency_cache.get_rate(usd.pk)
+    assert reads == [currency_cache.VERSION_KEY]
@@ -0,0 +1,52 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from psycopg_pool import ConnectionPool
+from budget import db_pool
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="пул psycopg открывается только к PostgreSQL"
+)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Пул из тех же параметров, что у соединения Django, вместо OPTIONS['pool']
+    params = connection.get_connection_params()
+    pool = ConnectionPool(kwargs=params, min_size=1, max_size=2, open=True)
+    monkeypatch.setattr(db_pool, "get_pool", lambda alias=None: pool)
+    monkeypatch.setattr(db_pool, "_last_published", 0.0)
+    yield pool
+    pool.close()
+
+
+def test_no_pool_by_default():
+    assert db_pool.stats() is None
+
+
+def test_stats_track_checked_out_connections(pool):
+    with pool.connection():
+        with pool.connection():
+            stats = db_pool.stats()
+    assert (stats["checked_out"], stats["available"], stats["requests"]) == (2, 0, 2)
+
+    stats = db_pool.stats()
+    assert (stats["checked_out"], stats["available"], stats["waiting"]) == (0, 2, 0)
+
+
+def test_pool_stats_command(pool, capsys):
+    with pool.connection():
+        pass
+    db_pool.publish()
+    with pool.connection():
+        pass
+    # Чаще PUBLISH_INTERVAL снимок не обновляется
+    db_pool.publish()
+
+    snapshots = db_pool.collect()
+    assert [snapshot["requests"] for snapshot in snapshots.values()] == [1]
+
+    call_command("pool_stats")
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[:3] == ["pid", "размер", "занято"]
+    assert lines[-1].split()[0] == "всего"
@@ -0,0 +1,90 @@
+import io
+import subprocess
+import sys
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from budget.csv_io import import_transactions
+from budget.models import Category, Currency, RecurringTransaction, Transaction
+from budget.recurring import process_due
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+def test_request_metrics(client):
+    User.objects.create_user(username="testuser", password="pass")
+    client.login(username="testuser", password="pass")
+    labels = {"view": "dashboard", "method": "GET", "status": "200"}
+    requests = sample("budget_request_duration_seconds_count", **labels)
+    queries = sample("budget_db_queries_total", view="dashboard")
+
+    client.get(reverse("dashboard"))
+
+    assert sample("budget_request_duration_seconds_count", **labels) == requests + 1
+    assert sample("budget_db_queries_total", view="dashboard") > queries
+    response = client.get(reverse("metrics"))
+    assert response["Content-Type"].startswith("text/plain")
+    assert b'budget_request_duration_seconds_bucket{le="0.005",method="GET",status="200",view="dashboard"}' in response.content
+
+
+@pytest.mark.django_db
+def test_metrics_access(client, settings):
+    url = reverse("metrics")
+    assert client.get(url, REMOTE_ADDR="10.1.2.3").status_code == 403
+
+    settings.METRICS_ALLOWED_NETWORKS = ["10.0.0.0/8"]
+    assert client.get(url, REMOTE_ADDR="10.1.2.3").status_code == 200
+
+    settings.METRICS_TOKEN = "secret"
+    assert client.get(url, REMOTE_ADDR="10.1.2.3").status_code == 403
+    assert client.get(url, REMOTE_ADDR="10.1.2.3", HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get(url, REMOTE_ADDR="10.1.2.3", HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+
+
+@pytest.mark.django_db
+def test_business_counters():
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    before = {source: sample("budget_transactions_created_total", source=source)
+              for source in ("single", "import", "recurring")}
+    imported = sample("budget_import_rows_total", result="imported")
+    errors = sample("budget_import_rows_total", result="error")
+
+    Transaction.objects.create(user=user, category=food, amount=10, currency=cur, date=date(2024, 3, 1))
+    import_transactions(user, io.BytesIO(
+        "Дата,Категория,Сумма,Описание\n2024-03-02,Еда,5,Обед\n2024-03-03,Еда,abc,Ошибка\n".encode()
+    ))
+    RecurringTransaction.objects.create(
+        user=user, category=food, amount=3, currency=cur, frequency="weekly",
+        start_date=date(2024, 3, 1), next_date=date(2024, 3, 1),
+    )
+    process_due(user=user, today=date(2024, 3, 15))
+
+    after = {source: sample("budget_transactions_created_total", source=source) - before[source]
+             for source in before}
+    assert after == {"single": 1, "import": 1, "recurring": 3}
+    assert sample("budget_import_rows_total", result="imported") == imported + 1
+    assert sample("budget_import_rows_total", result="error") == errors + 1
+
+
+WORKER = """
+from prometheus_client import Counter
+Counter("budget_transactions_created", "", ["source"]).labels("single").inc(2)
+"""
+
+
+@pytest.mark.django_db
+def test_metrics_summed_across_processes(client, monkeypatch, tmp_path):
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, check=True)
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    response = client.get(reverse("metrics"))
+    assert b'budget_transactions_created_total{source="single"} 4.0' in response.content
@@ -0,0 +1,69 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from budget.models import Category, Currency, Transaction
+from budget.pagination import paginate_keyset
+
+ORDERING = ('-date', '-id')
+
+
+@pytest.fixture
+def transactions(db):
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    salary = Category.objects.create(name="Зарплата", is_income=True, user=user)
+    # Несколько операций в один день проверяют разрешение совпадений по id
+    days = [1, 2, 2, 2, 3, 4, 4, 5, 6, 7]
+    for i, day in enumerate(days):
+        Transaction.objects.create(
+            user=user, category=salary if i % 3 == 0 else food, amount=i + 1,
+            currency=cur, date=date(2024, 3, day), description=f"Операция {i}",
+        )
+    return user
+
+
+def test_keyset_pages_cover_everything_without_offset(transactions):
+    qs = Transaction.objects.filter(user=transactions)
+    expected = list(qs.order_by(*ORDERING).values_list("id", flat=True))
+
+    seen = []
+    cursor = None
+    with CaptureQueriesContext(connection) as ctx:
+        while True:
+            page = paginate_keyset(qs, ORDERING, after=cursor, per_page=3)
+            seen.extend(t.id for t in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+    assert seen == expected
+    assert not any("OFFSET" in q["sql"] or "COUNT(" in q["sql"] for q in ctx.captured_queries)
+
+    # Обратный проход по ссылкам «назад» даёт те же страницы
+    back = []
+    while page.has_previous:
+        page = paginate_keyset(qs, ORDERING, before=page.previous_cursor, per_page=3)
+        back = [t.id for t in page.items] + back
+    assert back == expected[:len(back)]
+    assert back[:3] == expected[:3]
+
+
+def test_keyset_ignores_broken_cursor(transactions):
+    qs = Transaction.objects.filter(user=transactions)
+    page = paginate_keyset(qs, ORDERING, after="not-a-cursor", per_page=3)
+    assert [t.id for t in page.items] == list(qs.order_by(*ORDERING).values_list("id", flat=True)[:3])
+    assert not page.has_previous
+
+
+def test_transactions_list_paginates_filtered(client, transactions, monkeypatch):
+    monkeypatch.setattr("budget.views.TRANSACTIONS_PER_PAGE", 2)
+    client.login(username="testuser", password="pass")
+    response = client.get(reverse("transactions_list"), {"operation_type": "expense"})
+    page = response.context["page"]
+    assert response.status_code == 200
+    assert len(page.items) == 2 and page.has_next
+    assert all(not t.category.is_income for t in page.items)
+    assert "operation_type=expense" in response.content.decode()
@@ -0,0 +1,88 @@
+import pytest
+from datetime import date
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from budget import partitions
+from budget.models import Category, Currency, Transaction
+from budget.query_plans import analyze, check_hot_queries, check_partition_pruning, seed_plan_data
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="секционирование есть только в PostgreSQL"
+)
+
+
+def rows_in(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+# Изменения схемы откатываются вместе с транзакцией теста
+@pytest.mark.django_db
+def test_partitioned_transactions():
+    user = User.objects.create_user(username="testuser", password="pass")
+    seed_plan_data(user, transactions=2000, months=6)
+    total = Transaction.objects.count()
+
+    partitions.partition_table("month", ahead=1)
+    analyze()
+
+    assert partitions.is_partitioned()
+    assert Transaction.objects.count() == total
+    # Индексы секций сводятся к индексам budget_transaction
+    results = check_hot_queries(user)
+    assert "budget_tx_user_date_idx" in results["transactions_list"][0]
+    for name, (scanned, expected) in check_partition_pruning(user).items():
+        assert set(scanned) <= set(expected), name
+
+    # Дата за пределами секций попадает в DEFAULT и переносится при создании секции
+    category = Category.objects.filter(user=user).first()
+    currency = Currency.objects.first()
+    future = Transaction.objects.create(user=user, category=category, amount=5, currency=currency,
+                                        date=date(2031, 1, 10))
+    assert rows_in(partitions.DEFAULT_PARTITION) == 1
+    created = partitions.ensure_partitions(today=date(2031, 1, 1), ahead=0)
+    assert created[-1] == "budget_transaction_p2031_01"
+    assert rows_in(partitions.DEFAULT_PARTITION) == 0
+    assert rows_in("budget_transaction_p2031_01") == 1
+    assert Transaction.objects.get(pk=future.pk).amount == 5
+
+    partitions.unpartition_table()
+    assert not partitions.is_partitioned()
+    assert Transaction.objects.count() == total + 1
+    assert Transaction.objects.create(user=user, category=category, amount=1, currency=currency,
+                                      date=date(2024, 1, 1)).pk > future.pk
+
+
+@pytest.mark.django_db
+def test_ensure_command_only_adds_partitions():
+    out = StringIO()
+    call_command("partition_transactions", "--ensure", stdout=out)
+    assert not partitions.is_partitioned()
+    assert "не секционирована" in out.getvalue()
+
+    partitions.partition_table("month", ahead=0)
+    last = partitions.partitions()[-1][0]
+    call_command("process_recurring", stdout=StringIO())
+    assert partitions.partitions()[-1][0] == last
+
+    call_command("partition_transactions", "--ensure", "--ahead", "2", stdout=StringIO())
+    assert len(partitions.partitions()) == 3
+
+
+@pytest.mark.django_db
+def test_old_dates_stay_in_default_partition():
+    user = User.objects.create_user(username="testuser", password="pass")
+    currency = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    category = Category.objects.create(name="Еда", is_income=False, user=user)
+    for day in (date(202, 1, 1), date(2024, 3, 5)):
+        Transaction.objects.create(user=user, category=category, amount=5, currency=currency, date=day)
+
+    partitions.partition_table("year", ahead=0, today=date(2024, 3, 1))
+    names = [name for name, _, _ in partitions.partitions()]
+    assert len(names) == partitions.HISTORY_YEARS + 1
+    assert names[0] == f"budget_transaction_p{2024 - partitions.HISTORY_YEARS}"
+    assert rows_in(partitions.DEFAULT_PARTITION) == 1
+    assert rows_in("budget_transaction_p2024") == 1
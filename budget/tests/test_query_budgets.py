@@ -0,0 +1,38 @@
+import pytest
+from django.contrib.auth.models import User
+from budget import query_budgets, urls
+from budget.models import UserPreferences
+from budget.seed import seed_user
+
+# Малый и большой объём: число запросов страниц не должно от него зависеть
+SIZES = [
+    {"transactions": 30, "recurring": 2},
+    {"transactions": 300, "recurring": 12, "extra_categories": 15},
+]
+
+
+def test_every_page_has_budget():
+    names = {pattern.name for pattern in urls.urlpatterns if getattr(pattern, "name", None)}
+    assert names <= set(query_budgets.QUERY_BUDGETS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("budget_type", ["monthly", "category"])
+def test_pages_within_query_budget(client, budget_type):
+    counts = []
+    for i, size in enumerate(SIZES):
+        user = User.objects.create(username=f"user{i}")
+        seed_user(user, months=3, **size)
+        UserPreferences.objects.create(user=user, budget_type=budget_type)
+        client.force_login(user)
+        counts.append({
+            name: query_budgets.count_queries(client, user, url)
+            for name, url in query_budgets.pages(user)
+        })
+
+    for name, (status, queries) in counts[-1].items():
+        assert status in (200, 302), name
+        assert queries <= query_budgets.QUERY_BUDGETS[name], name
+    small = {name: queries for name, (status, queries) in counts[0].items()}
+    large = {name: queries for name, (status, queries) in counts[-1].items()}
+    assert large == small
@@ -0,0 +1,23 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from budget.query_plans import check_hot_queries, seed_plan_data
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="EXPLAIN проверяется только на PostgreSQL"
+)
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes():
+    user = User.objects.create_user(username="testuser", password="pass")
+    seed_plan_data(user)
+
+    results = check_hot_queries(user)
+
+    missing = {name: (indexes, expected) for name, (indexes, expected) in results.items()
+               if expected and expected not in indexes}
+    assert missing == {}
+    checked = {expected for _, expected in results.values() if expected}
+    assert {"budget_tx_user_date_idx", "budget_tx_user_cat_date_idx",
+            "budget_budget_user_month_idx"} <= checked
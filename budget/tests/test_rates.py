@@ -0,0 +1,83 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from budget import currency_cache, rollups
+from budget.models import Budget, Category, Currency, ExchangeRate, MonthlyRollup, Transaction
+from budget.rates import recompute_amount_base
+from budget.views import get_category_budget_data
+
+
+def snapshot(user):
+    return sorted(
+        MonthlyRollup.objects.filter(user=user)
+        .values_list("month", "category_id", "currency_id", "total", "total_base", "count")
+    )
+
+
+@pytest.mark.django_db
+def test_rate_on_date():
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 2, 1), rate=Decimal("3.2"))
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 3, 1), rate=Decimal("3.3"))
+
+    assert currency_cache.get_rate(usd.pk, date(2024, 1, 31)) == 3
+    assert currency_cache.get_rate(usd.pk, date(2024, 2, 1)) == Decimal("3.2")
+    assert currency_cache.get_rate(usd.pk, date(2024, 2, 29)) == Decimal("3.2")
+    assert currency_cache.get_rate(usd.pk, date(2025, 1, 1)) == Decimal("3.3")
+    assert currency_cache.get_rate(usd.pk) == 3
+
+    user = User.objects.create_user(username="testuser", password="pass")
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    t = Transaction.objects.create(user=user, category=food, amount=10, currency=usd, date=date(2024, 2, 10))
+    t.refresh_from_db()
+    assert t.amount_base == Decimal("32.00")
+
+    # Дата строкой, как до full_clean
+    t = Transaction.objects.create(user=user, category=food, amount=10, currency=usd, date="2024-03-05")
+    t.refresh_from_db()
+    assert t.amount_base == Decimal("33.00")
+
+
+@pytest.mark.django_db
+def test_budget_limits_use_rate_history():
+    user = User.objects.create_user(username="testuser", password="pass")
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 2, 1), rate=Decimal("3.2"))
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 3, 10), rate=Decimal("3.3"))
+    usd.rate = 10  # после начала истории действует только до 2024-02-01
+    usd.save()
+
+    budgets = [Budget(user=user, category=food, limit=100, currency=usd, month=month)
+               for month in (date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1))]
+    limits = [row["limit_byn"] for row in get_category_budget_data(user, budgets, totals={})]
+    assert limits == [1000, Decimal("320"), Decimal("330")]
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="пересчёт написан для PostgreSQL")
+@pytest.mark.django_db
+def test_recompute_updates_range_and_rollups():
+    user = User.objects.create_user(username="testuser", password="pass")
+    byn = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    for day in (date(2024, 1, 15), date(2024, 2, 15), date(2024, 3, 15), date(2024, 3, 20)):
+        Transaction.objects.create(user=user, category=food, amount=10, currency=usd, date=day)
+    Transaction.objects.create(user=user, category=food, amount=10, currency=byn, date=date(2024, 3, 15))
+
+    # Курсы заданы задним числом, сохранённые суммы устарели
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 2, 1), rate=Decimal("3.2"))
+    ExchangeRate.objects.create(currency=usd, effective_date=date(2024, 3, 20), rate=Decimal("3.5"))
+
+    report = recompute_amount_base(date_from=date(2024, 2, 1), batch_size=2)
+
+    assert report.updated == 3
+    assert list(Transaction.objects.order_by("date", "currency_id").values_list("amount_base", flat=True)) == [
+        Decimal("30.00"), Decimal("32.00"), Decimal("10.00"), Decimal("32.00"), Decimal("35.00"),
+    ]
+    incremental = snapshot(user)
+    rollups.rebuild(user)
+    assert incremental == snapshot(user)
+    assert recompute_amount_base(date_from=date(2024, 2, 1)).updated == 0
@@ -0,0 +1,64 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from budget.dates import add_months
+from budget.models import Category, Currency, MonthlyRollup, RecurringTransaction, Transaction
+from budget.recurring import process_due
+
+
+def test_add_months_keeps_anchor_day():
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+    assert add_months(date(2024, 2, 29), 1, day=31) == date(2024, 3, 31)
+    assert add_months(date(2024, 12, 15), 1) == date(2025, 1, 15)
+    assert add_months(date(2024, 3, 31), -1) == date(2024, 2, 29)
+
+
+@pytest.fixture
+def setup(db):
+    user = User.objects.create_user(username="testuser", password="pass")
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    rent = Category.objects.create(name="Аренда", is_income=False, user=user)
+    return user, usd, rent
+
+
+def test_process_due_catches_up_with_calendar_months(setup):
+    user, usd, rent = setup
+    monthly = RecurringTransaction.objects.create(
+        user=user, category=rent, amount=100, currency=usd, description="Аренда",
+        frequency="monthly", start_date=date(2024, 1, 31), next_date=date(2024, 1, 31),
+    )
+    weekly = RecurringTransaction.objects.create(
+        user=user, category=rent, amount=10, currency=usd, description="Кружок",
+        frequency="weekly", start_date=date(2024, 4, 1), next_date=date(2024, 4, 1),
+    )
+
+    report = process_due(today=date(2024, 4, 30), batch_size=1)
+
+    assert report.items == 2
+    assert list(Transaction.objects.filter(recurring=monthly).order_by("date").values_list("date", flat=True)) == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30),
+    ]
+    assert Transaction.objects.filter(recurring=weekly).count() == 5
+    assert Transaction.objects.filter(recurring=monthly).first().amount_base == Decimal("300.00")
+    monthly.refresh_from_db()
+    weekly.refresh_from_db()
+    assert monthly.next_date == date(2024, 5, 31)
+    assert weekly.next_date == date(2024, 5, 6)
+    assert MonthlyRollup.objects.filter(user=user).count() == 4
+
+
+def test_process_due_is_idempotent(setup):
+    user, usd, rent = setup
+    item = RecurringTransaction.objects.create(
+        user=user, category=rent, amount=100, currency=usd, description="Аренда",
+        frequency="monthly", start_date=date(2024, 1, 10), next_date=date(2024, 1, 10),
+    )
+    process_due(today=date(2024, 2, 15))
+    # Сбой после вставки, но до сдвига next_date, не должен привести к дублям
+    RecurringTransaction.objects.filter(pk=item.pk).update(next_date=date(2024, 1, 10))
+
+    report = process_due(today=date(2024, 3, 15))
+
+    assert report.created == 1
+    assert Transaction.objects.filter(recurring=item).count() == 3
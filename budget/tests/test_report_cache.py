@@ -0,0 +1,115 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from budget import report_cache
+from budget.models import Budget, Category, Currency, Transaction
+
+
+@pytest.fixture
+def user_data():
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    Transaction.objects.create(user=user, category=food, amount=10, currency=cur, date=date(2024, 3, 5))
+    return user, cur, food
+
+
+@pytest.mark.django_db
+def test_analytics_cached_until_data_changes(client, user_data):
+    user, cur, food = user_data
+    client.login(username="testuser", password="pass")
+    url = reverse("analytics_categories")
+
+    before = report_cache.stats()
+    assert client.get(url, {"month": "2024-03"}).json()["values"] == [10.0]
+    assert client.get(url, {"month": "2024-03"}).json()["values"] == [10.0]
+    after = report_cache.stats()
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1)
+
+    Transaction.objects.create(user=user, category=food, amount=5, currency=cur, date=date(2024, 3, 6))
+    assert client.get(url, {"month": "2024-03"}).json()["values"] == [15.0]
+
+    food.name = "Продукты"
+    food.save()
+    assert client.get(url, {"month": "2024-03"}).json()["labels"] == ["Продукты"]
+
+
+@pytest.mark.django_db
+def test_chart_data_not_modified(client, user_data, django_assert_max_num_queries):
+    user, cur, food = user_data
+    client.login(username="testuser", password="pass")
+    url = reverse("analytics_trend")
+
+    response = client.get(url)
+    assert response.json() == {"labels": ["2024-03"], "values": [10.0]}
+    etag = response["ETag"]
+
+    # Сессия и пользователь — без запросов к итогам
+    with django_assert_max_num_queries(2):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    other_month = client.get(reverse("analytics_categories"), {"month": "2024-04"})
+    assert other_month["ETag"] != etag
+
+    Transaction.objects.create(user=user, category=food, amount=5, currency=cur, date=date(2024, 4, 1))
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["values"] == [10.0, 5.0]
+
+
+@pytest.mark.django_db
+def test_versions_are_per_user(user_data):
+    user, cur, food = user_data
+    other = User.objects.create_user(username="other", password="pass")
+    other_versions = report_cache.versions(other.pk)
+    user_versions = report_cache.versions(user.pk)
+
+    Budget.objects.create(user=user, category=food, limit=100, currency=cur, month=date(2024, 3, 1))
+
+    assert report_cache.versions(other.pk) == other_versions
+    assert report_cache.versions(user.pk) != user_versions
+
+
+@pytest.mark.django_db
+def test_dashboard_category_buttons_cached(client, user_data):
+    user, cur, food = user_data
+    client.login(username="testuser", password="pass")
+    url = reverse("dashboard")
+
+    client.get(url)  # создаются настройки пользователя
+    report_cache.categories_changed([user.pk])
+    with CaptureQueriesContext(connection) as first:
+        assert "Еда" in client.get(url).content.decode()
+    with CaptureQueriesContext(connection) as second:
+        assert "Еда" in client.get(url).content.decode()
+    # Запросы категорий расходов и доходов не выполняются
+    assert len(second) == len(first) - 2
+
+    Category.objects.create(name="Зарплата", is_income=True, user=user)
+    assert "Зарплата" in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_transaction_save_bumps_version_once(monkeypatch, user_data):
+    user, cur, food = user_data
+    transaction = Transaction.objects.get()
+    bumps = []
+    bump = report_cache._bump
+    monkeypatch.setattr(report_cache, "_bump", lambda key: bumps.append(key) or bump(key))
+    key = report_cache.USER_VERSION_KEY.format(user.pk)
+
+    transaction.amount = 12
+    transaction.save()
+    assert bumps == [key]
+
+    # Итоги не меняются, но ETag списка операций должен смениться
+    transaction.description = "Обед"
+    transaction.save()
+    assert bumps == [key, key]
+
+    transaction.delete()
+    assert bumps == [key, key, key]
@@ -0,0 +1,65 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.urls import reverse
+from budget import rollups
+from budget.models import Category, Currency, MonthlyRollup, Transaction
+from budget.seed import seed_user
+
+
+def snapshot(user):
+    return sorted(
+        MonthlyRollup.objects.filter(user=user)
+        .values_list("month", "category_id", "currency_id", "total", "total_base", "count")
+    )
+
+
+@pytest.mark.django_db
+def test_rollup_follows_create_update_delete():
+    user = User.objects.create_user(username="testuser", password="pass")
+    byn = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    usd = Currency.objects.create(code="USD", name="Доллар", symbol="$", rate=3)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    taxi = Category.objects.create(name="Такси", is_income=False, user=user)
+
+    first = Transaction.objects.create(user=user, category=food, amount=10, currency=byn, date=date(2024, 3, 5))
+    second = Transaction.objects.create(user=user, category=food, amount=5, currency=usd, date=date(2024, 3, 6))
+    assert snapshot(user) == [
+        (date(2024, 3, 1), food.id, byn.id, Decimal("10.00"), Decimal("10.00"), 1),
+        (date(2024, 3, 1), food.id, usd.id, Decimal("5.00"), Decimal("15.00"), 1),
+    ]
+
+    # Перенос в другую категорию и месяц
+    first.category = taxi
+    first.date = date(2024, 4, 1)
+    first.save()
+    second.delete()
+    assert snapshot(user) == [
+        (date(2024, 4, 1), taxi.id, byn.id, Decimal("10.00"), Decimal("10.00"), 1),
+    ]
+
+    taxi.delete()
+    assert snapshot(user) == []
+
+
+@pytest.mark.django_db
+def test_rollup_matches_rebuild_after_bulk_paths():
+    user = User.objects.create_user(username="testuser", password="pass")
+    seed_user(user, transactions=500, months=6)
+    Transaction.objects.filter(user=user)[:1].get().delete()
+
+    maintained = snapshot(user)
+    rollups.rebuild(user)
+    assert snapshot(user) == maintained
+
+
+@pytest.mark.django_db
+def test_reports_do_not_depend_on_transaction_count(client, django_assert_max_num_queries):
+    user = User.objects.create_user(username="testuser", password="pass")
+    seed_user(user, transactions=300, months=3)
+    client.login(username="testuser", password="pass")
+    with django_assert_max_num_queries(8):
+        assert client.get(reverse("monthly_summary")).status_code == 200
+    with django_assert_max_num_queries(8):
+        assert client.get(reverse("analytics")).status_code == 200
@@ -0,0 +1,74 @@
+import pytest
+from datetime import date
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from budget.models import Category, Currency, Transaction
+from budget.pagination import paginate_keyset
+from budget.search import RANKED_ORDERING, fts5_query, search
+
+
+@pytest.fixture
+def user_transactions():
+    user = User.objects.create_user(username="testuser", password="pass")
+    other = User.objects.create_user(username="other", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    for day, description in enumerate(
+        ["Обед с коллегами", "Такси домой", "Обеды в кафе", "обед", "Кофе", "Бизнес-обед и обед"], 1
+    ):
+        Transaction.objects.create(
+            user=user, category=food, amount=10, currency=cur, date=date(2024, 3, day), description=description
+        )
+    other_food = Category.objects.create(name="Еда", is_income=False, user=other)
+    Transaction.objects.create(user=other, category=other_food, amount=1, currency=cur, date=date(2024, 3, 1), description="Обед")
+    return user
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="словоформы различает только tsvector")
+@pytest.mark.django_db
+def test_search_matches_word_forms_ranked(user_transactions):
+    results = list(search(Transaction.objects.filter(user=user_transactions), "обедом").order_by(*RANKED_ORDERING))
+
+    descriptions = [t.description for t in results]
+    assert set(descriptions) == {"Обед с коллегами", "Обеды в кафе", "обед", "Бизнес-обед и обед"}
+    # Два вхождения слова ранжируются выше одного
+    assert descriptions[0] == "Бизнес-обед и обед"
+    assert all(a.rank >= b.rank for a, b in zip(results, results[1:]))
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="FTS5 есть только в SQLite")
+@pytest.mark.django_db
+def test_search_matches_prefixes_fts5(user_transactions):
+    results = list(search(Transaction.objects.filter(user=user_transactions), "обед").order_by(*RANKED_ORDERING))
+
+    assert {t.description for t in results} == {"Обед с коллегами", "Обеды в кафе", "обед", "Бизнес-обед и обед"}
+    assert all(a.rank >= b.rank for a, b in zip(results, results[1:]))
+
+
+@pytest.mark.django_db
+def test_ranked_keyset_pages(user_transactions):
+    qs = search(Transaction.objects.filter(user=user_transactions), "обед")
+    expected = [t.pk for t in qs.order_by(*RANKED_ORDERING)]
+
+    seen, cursor = [], None
+    while True:
+        page = paginate_keyset(qs, RANKED_ORDERING, after=cursor, per_page=2)
+        seen += [t.pk for t in page.items]
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_transactions_list_search(client, user_transactions):
+    client.login(username="testuser", password="pass")
+
+    response = client.get(reverse("transactions_list"), {"search": "кафе"})
+
+    assert [t.description for t in response.context["transactions"]] == ["Обеды в кафе"]
+
+
+def test_fts5_query_quotes_words():
+    assert fts5_query('обед "кафе" -x') == '"обед"* "кафе"* "x"*'
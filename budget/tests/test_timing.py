@@ -0,0 +1,70 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from budget import async_views, views
+from budget.models import Category, UserPreferences
+from budget.timing import RequestTimingMiddleware
+
+
+def timing_log(caplog):
+    return [json.loads(record.getMessage()) for record in caplog.records if record.name == "budget.timing"]
+
+
+@pytest.mark.django_db
+def test_sampled_request_reports_timing(client, settings, caplog):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    User.objects.create_user(username="testuser", password="pass")
+    client.login(username="testuser", password="pass")
+    client.get(reverse("dashboard"))
+    caplog.clear()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("dashboard"))
+
+    header = response["Server-Timing"]
+    assert f'desc="{len(queries)} queries"' in header
+    assert [part.split(";")[0] for part in header.split(", ")] == ["db", "tpl", "app", "total"]
+
+    line, = timing_log(caplog)
+    assert (line["view"], line["status"], line["queries"]) == ("dashboard", 200, len(queries))
+    assert line["template_ms"] > 0
+    assert len(line["slowest"]) == settings.REQUEST_TIMING_SLOW_QUERIES
+    assert line["slowest"][0]["ms"] >= line["slowest"][-1]["ms"]
+
+
+@pytest.mark.django_db
+def test_not_sampled(client, settings, caplog):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0
+    response = client.get(reverse("login"))
+    assert "Server-Timing" not in response
+    assert timing_log(caplog) == []
+
+
+# Запросы async_views идут из потоков пула со своими соединениями
+@pytest.mark.django_db(transaction=True)
+def test_async_view_counts_pool_queries(settings, caplog):
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+    user = User.objects.create_user(username="testuser", password="pass")
+    Category.objects.create(name="Еда", is_income=False, user=user)
+    UserPreferences.objects.create(user=user, budget_type="category")
+
+    def request():
+        request = RequestFactory().get("/")
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    RequestTimingMiddleware(views.dashboard)(request())
+    async_to_sync(RequestTimingMiddleware(async_views.dashboard))(request())
+
+    sync_line, async_line = timing_log(caplog)
+    assert async_line["queries"] == sync_line["queries"] > 0
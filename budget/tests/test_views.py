@@ -20,3 +20,82 @@ def test_transaction_create_view(client):
     assert response.status_code == 200
     # Проверка наличия формы
     assert b"form" in response.content
+
+@pytest.mark.django_db
+def test_category_budgets_single_query(django_assert_num_queries):
+    from datetime import date
+    from budget.models import Budget, Category, Currency, Transaction
+    from budget.views import get_category_budget_data
+
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    month = date.today().replace(day=1)
+    for i in range(5):
+        category = Category.objects.create(name=f"Категория {i}", user=user)
+        Budget.objects.create(user=user, category=category, limit=100, month=month, currency=cur)
+        Transaction.objects.create(user=user, category=category, amount=30 * i, currency=cur, date=month)
+    budgets = Budget.objects.filter(user=user).select_related("category", "currency").order_by("id")
+
+    with django_assert_num_queries(2):
+        data = get_category_budget_data(user, budgets)
+
+    assert [b["spent"] for b in data] == [0, 30, 60, 90, 120]
+    assert [b["count"] for b in data] == [1, 1, 1, 1, 1]
+    assert data[4]["exceeded"] and data[4]["ahead_of_pace"]
+    assert [round(b["used_percent"]) for b in data] == [0, 30, 60, 90, 120]
+    assert data[4]["overrun"] == 20
+
+@pytest.mark.django_db
+def test_monthly_summary_uses_month_range(django_assert_num_queries):
+    from datetime import date
+    from budget.models import Category, Currency, MonthlyBudget, Transaction
+    from budget.views import get_monthly_summary
+
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    salary = Category.objects.create(name="Зарплата", is_income=True, user=user)
+    today = date.today()
+    Transaction.objects.create(user=user, category=food, amount=40, currency=cur, date=today)
+    Transaction.objects.create(user=user, category=salary, amount=100, currency=cur, date=today)
+    budget = MonthlyBudget.objects.create(
+        user=user, month=today.replace(day=1), income_plan=200, expense_plan=80, currency=cur
+    )
+    budget = MonthlyBudget.objects.select_related("currency").get(pk=budget.pk)
+
+    with django_assert_num_queries(1) as ctx:
+        summary = get_monthly_summary(user, budget)
+
+    sql = ctx.captured_queries[0]["sql"]
+    assert "EXTRACT" not in sql.upper()
+    assert summary["actual_income"] == 100
+    assert summary["actual_expenses"] == 40
+    assert summary["expense_progress"] == 50
+
+@pytest.mark.django_db
+def test_monthly_summary_paginates_by_year(client, django_assert_max_num_queries):
+    from datetime import date
+    from budget.models import Category, Currency, MonthlyBudget, Transaction
+
+    user = User.objects.create_user(username="testuser", password="pass")
+    cur = Currency.objects.create(code="BYN", name="Белорусский рубль", symbol="р", rate=1)
+    food = Category.objects.create(name="Еда", is_income=False, user=user)
+    salary = Category.objects.create(name="Зарплата", is_income=True, user=user)
+    for year in (2021, 2022, 2023):
+        for month in range(1, 13):
+            MonthlyBudget.objects.create(
+                user=user, month=date(year, month, 1), income_plan=1, expense_plan=1, currency=cur
+            )
+        Transaction.objects.create(user=user, category=food, amount=10, currency=cur, date=date(year, 3, 1))
+        Transaction.objects.create(user=user, category=salary, amount=25, currency=cur, date=date(year, 4, 1))
+    client.login(username="testuser", password="pass")
+
+    with django_assert_max_num_queries(6):
+        response = client.get(reverse("monthly_summary"), {"year": 2022})
+
+    assert response.context["year"] == 2022
+    assert list(response.context["yearly_summary"]) == [2023, 2022, 2021]
+    assert response.context["yearly_summary"][2022] == {"total_incomes_byn": 25, "total_expenses_byn": 10}
+    assert list(response.context["summary"]) == ["2022-04", "2022-03"]
+    assert response.context["summary"]["2022-03"]["budget"]["expense_plan"] == 1
+    assert "Март 2022" in response.content.decode()
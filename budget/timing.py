@@ -0,0 +1,211 @@
+"""
+Замер запросов: число и время SQL, самые медленные запросы, время отрисовки
+шаблонов.
+
+Каждый запрос попадает в метрики Prometheus (budget.metrics, если включены
+METRICS_ENABLED). Для доли REQUEST_TIMING_SAMPLE_RATE запросов middleware
+ещё собирает самые медленные SQL, добавляет заголовок Server-Timing (виден
+в инструментах разработчика браузера) и пишет строку JSON в журнал
+budget.timing. Цена замера — два вызова perf_counter на SQL-запрос.
+
+Замер хранится в contextvar, поэтому учитываются и запросы из потоков
+budget.concurrency: sync_to_async копирует контекст в поток. Время шаблонов
+пишет бэкенд TimedDjangoTemplates (settings.TEMPLATES); запросы, выполненные
+при отрисовке (ленивые QuerySet), отнесены к SQL, а не к шаблонам.
+
+У потоковых ответов (экспорт CSV) запросы выполняются уже после выхода из
+middleware: в метрики попадает время до начала передачи, заголовка и
+строки журнала нет.
+"""
+import heapq
+import json
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+logger = logging.getLogger('budget.timing')
+
+# Длина текста запроса в журнале
+SQL_MAX_LENGTH = 300
+
+_current = ContextVar('budget_request_timing', default=None)
+
+
+class RequestTiming:
+    """Счётчики одного запроса"""
+
+    def __init__(self, sampled, slow_count):
+        self.start = perf_counter()
+        self.sampled = sampled
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_db = 0.0
+        self.template_depth = 0
+        self.slow_count = slow_count
+        self.slowest = []  # куча (время, sql) из slow_count самых долгих
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db += duration
+            if self.template_depth:
+                self.template_db += duration
+            if not self.slow_count:
+                return
+            if len(self.slowest) < self.slow_count:
+                heapq.heappush(self.slowest, (duration, sql))
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, sql))
+
+    def summary(self):
+        """Времена в миллисекундах: total, db, template (без SQL), app (остальное)"""
+        total = perf_counter() - self.start
+        template = self.template - self.template_db
+        return {
+            'total': total * 1000,
+            'db': self.db * 1000,
+            'template': template * 1000,
+            'app': max(total - self.db - template, 0) * 1000,
+        }
+
+
+def _record_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, perf_counter() - start)
+
+
+def install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+@contextmanager
+def template_rendering():
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    # Вложенные шаблоны (crispy, include через get_template) уже внутри внешнего
+    timing.template_depth += 1
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timing.template_depth -= 1
+        if not timing.template_depth:
+            timing.template += perf_counter() - start
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with template_rendering():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, сообщающий время отрисовки в замер запроса"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def server_timing(timing, times):
+    return ', '.join([
+        f'db;dur={times["db"]:.1f};desc="{timing.queries} queries"',
+        f'tpl;dur={times["template"]:.1f}',
+        f'app;dur={times["app"]:.1f}',
+        f'total;dur={times["total"]:.1f}',
+    ])
+
+
+def log_line(request, response, timing, times):
+    match = request.resolver_match
+    return json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'queries': timing.queries,
+        **{f'{name}_ms': round(value, 2) for name, value in times.items()},
+        'slowest': [
+            {'ms': round(duration * 1000, 2), 'sql': sql[:SQL_MAX_LENGTH]}
+            for duration, sql in sorted(timing.slowest, reverse=True)
+        ],
+    }, ensure_ascii=False)
+
+
+class RequestTimingMiddleware:
+    """Метрики всех запросов; Server-Timing и журнал для доли REQUEST_TIMING_SAMPLE_RATE"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self):
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        sampled = bool(rate) and random.random() < rate
+        if not sampled and not settings.METRICS_ENABLED:
+            return None, None
+        # Соединение потока могло открыться до загрузки middleware
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        timing = RequestTiming(sampled, settings.REQUEST_TIMING_SLOW_QUERIES if sampled else 0)
+        return timing, _current.set(timing)
+
+    def finish(self, request, response, timing, token):
+        _current.reset(token)
+        times = timing.summary()
+        if settings.METRICS_ENABLED:
+            metrics.observe(request, response, timing, times)
+        if not timing.sampled or response.streaming:
+            return response
+        response['Server-Timing'] = server_timing(timing, times)
+        logger.info(log_line(request, response, timing, times))
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing, token = self.start()
+        if timing is None:
+            return self.get_response(request)
+        response = self.get_response(request)
+        return self.finish(request, response, timing, token)
+
+    async def __acall__(self, request):
+        timing, token = self.start()
+        if timing is None:
+            return await self.get_response(request)
+        response = await self.get_response(request)
+        return self.finish(request, response, timing, token)
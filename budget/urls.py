@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.urls import path, include
-from . import views
+from . import async_views, metrics, views
 from .views import TransactionCreateView
 
+# Под ASGI — асинхронные версии представлений с параллельными запросами
+dashboard_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
+    path('', dashboard_views.dashboard, name='dashboard'),
     path('add_transaction/', views.add_transaction, name='add_transaction'),
     path('add_category/', views.add_category, name='add_category'),
     path('add_budget/', views.add_budget, name='add_budget'),
     path('register/', views.register, name='register'),
     path('accounts/', include('django.contrib.auth.urls')),
     path('analytics/', views.analytics, name='analytics'),
+    path('analytics/categories.json', dashboard_views.analytics_categories, name='analytics_categories'),
+    path('analytics/trend.json', dashboard_views.analytics_trend, name='analytics_trend'),
     path('export_csv/', views.export_transactions_csv, name='export_csv'),
     path('import_csv/', views.import_transactions_csv, name='import_csv'),
     path('transactions/', views.transactions_list, name='transactions_list'),
+    path('transactions.json', views.transactions_json, name='transactions_json'),
+    path('transactions/batch/', views.transactions_batch, name='transactions_batch'),
     path('recurring/', views.recurring_transactions, name='recurring_transactions'),
     path('process-recurring/', views.process_recurring_transactions, name='process_recurring'),
     path('recurring/delete/<int:pk>/', views.delete_recurring_transaction, name='delete_recurring'),
@@ -21,4 +29,5 @@ urlpatterns = [
     path('budget_settings/', views.budget_settings, name='budget_settings'),
     path('edit_monthly_budget/<int:pk>/', views.edit_monthly_budget, name='edit_monthly_budget'),
     path('transactions/create/', TransactionCreateView.as_view(), name='transaction_create'),
+    path('metrics', metrics.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,32 +1,63 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import Category, Transaction, Budget, RecurringTransaction, MonthlyBudget, UserPreferences
+from .models import Category, Transaction, Budget, RecurringTransaction, MonthlyBudget, MonthlyRollup, UserPreferences
 from .forms import CategoryForm, TransactionForm, BudgetForm, RegisterForm, ImportCSVForm, TransactionFilterForm, RecurringTransactionForm, MonthlyBudgetForm, UserPreferencesForm
 from django.contrib.auth import login
-from django.db.models import Sum
-from datetime import date, datetime, timedelta
+from django.db import transaction as db_transaction
+from django.db.models import Q, Sum
+import calendar
+import json
+from functools import wraps
+from datetime import date, timedelta
 from django.utils import timezone
-import csv
-from django.http import HttpResponse
-from io import TextIOWrapper
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib import messages
-from django.db.models.functions import TruncMonth
+from django.db.models.functions import TruncYear
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_POST
 from django.views.generic.edit import CreateView
+from .conditional import conditional_page
+from .batch import MAX_BATCH_SIZE, create_transactions
+from .csv_io import export_transactions, import_transactions
+from .currency_cache import get_currency, get_rate
+from . import api, idempotency, report_cache
+from .dates import add_months, month_filter, month_start, year_range
+from .pagination import InvalidCursor, paginate_keyset
+from .recurring import process_due
+
+TRANSACTIONS_PER_PAGE = 50
+
+
+def api_login_required(view):
+    """
+    login_required для JSON-эндпоинтов: без сессии — 401 с JSON, а не
+    редирект на HTML-форму входа, которую скрипт не разберёт
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'требуется вход: сессия Django, см. transactions_batch'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
 
 @login_required
+@conditional_page
 def dashboard(request):
     today = date.today()
     
     # Получаем предпочтения пользователя
     preferences, created = UserPreferences.objects.get_or_create(user=request.user)
     
-    # Общие данные для обоих типов бюджета
+    # Общие данные для обоих типов бюджета. Кнопки категорий кешируются
+    # фрагментом шаблона: при попадании в кеш запросы категорий не выполняются
     expense_categories = Category.objects.filter(user=request.user, is_income=False)
     income_categories = Category.objects.filter(user=request.user, is_income=True)
     
     context = {
         'expense_categories': expense_categories,
         'income_categories': income_categories,
+        'category_version': report_cache.category_version(request.user.id),
         'budget_type': preferences.budget_type,
     }
     
@@ -34,8 +65,7 @@ def dashboard(request):
         # Логика для месячного бюджета
         monthly_budget = MonthlyBudget.objects.filter(
             user=request.user,
-            month__year=today.year,
-            month__month=today.month
+            **month_filter('month', today)
         ).first()
         
         if monthly_budget:
@@ -44,9 +74,8 @@ def dashboard(request):
         # Логика для бюджета по категориям
         budgets = Budget.objects.filter(
             user=request.user,
-            month__year=today.year,
-            month__month=today.month
-        ).select_related('category', 'currency')
+            **month_filter('month', today)
+        ).select_related('category')
         
         context['budget_data'] = get_category_budget_data(request.user, budgets)
     
@@ -106,8 +135,7 @@ def add_monthly_budget(request):
             # Проверяем, нет ли уже бюджета на этот месяц
             existing_budget = MonthlyBudget.objects.filter(
                 user=request.user,
-                month__year=budget.month.year,
-                month__month=budget.month.month
+                **month_filter('month', budget.month)
             ).first()
             
             if existing_budget:
@@ -119,7 +147,7 @@ def add_monthly_budget(request):
             return redirect('dashboard')
     else:
         # Устанавливаем текущий месяц по умолчанию
-        initial_date = date.today().replace(day=1)
+        initial_date = month_start(date.today())
         form = MonthlyBudgetForm(initial={'month': initial_date})
     
     return render(request, 'budget/add_monthly_budget.html', {'form': form})
@@ -135,31 +163,55 @@ def register(request):
         form = RegisterForm()
     return render(request, "registration/register.html", {"form": form})
 
+def analytics_month(request):
+    """Месяц из ?month=ГГГГ-ММ; по умолчанию и при ошибке — текущий"""
+    today = timezone.now().date()
+    try:
+        return month_start(request.GET.get('month', ''))
+    except ValueError:
+        return month_start(today)
+
 @login_required
 def analytics(request):
-    # По умолчанию — текущий месяц
-    today = timezone.now().date()
-    month = request.GET.get('month', today.strftime('%Y-%m'))
-    year, month_num = map(int, month.split('-'))
-    start_date = date(year, month_num, 1)
-    if month_num == 12:
-        end_date = date(year + 1, 1, 1)
-    else:
-        end_date = date(year, month_num + 1, 1)
+    # Данные диаграмм страница загружает отдельно из analytics_categories и analytics_trend
+    return render(request, 'budget/analytics.html', {
+        'month': analytics_month(request).strftime('%Y-%m'),
+    })
 
-    # Получаем все месяцы, за которые есть транзакции
-    available_months = (Transaction.objects
-        .filter(user=request.user)
-        .dates('date', 'month', order='DESC')
-        .distinct())
+def analytics_categories_etag(request):
+    return report_cache.etag(request.user.pk, 'categories', analytics_month(request).isoformat())
+
+def analytics_trend_etag(request):
+    return report_cache.etag(request.user.pk, 'trend')
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=analytics_categories_etag)
+def analytics_categories(request):
+    start_date = analytics_month(request)
+    data = report_cache.get_or_compute(
+        request.user.pk, 'analytics_categories',
+        lambda: get_category_breakdown(request.user, start_date),
+        start_date.isoformat(),
+    )
+    return JsonResponse({'month': start_date.strftime('%Y-%m'), **data})
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=analytics_trend_etag)
+def analytics_trend(request):
+    data = report_cache.get_or_compute(
+        request.user.pk, 'analytics_trend', lambda: get_expense_trend(request.user)
+    )
+    return JsonResponse(data)
 
-    # Суммируем расходы по категориям
-    categories = Category.objects.filter(user=request.user, is_income=False)
+def get_category_breakdown(user, start_date):
+    """Расходы по категориям за месяц start_date"""
     data = (
-        Transaction.objects
-        .filter(user=request.user, date__gte=start_date, date__lt=end_date, category__in=categories)
+        MonthlyRollup.objects
+        .filter(user=user, category__is_income=False, **month_filter('month', start_date))
         .values('category__name', 'category__color')
-        .annotate(total=Sum('amount_base'))
+        .annotate(total=Sum('total_base'))
         .order_by('-total')
     )
 
@@ -173,48 +225,38 @@ def analytics(request):
     max_expense = max(values) if values else 0
     categories_count = len(values)
 
-    # Получаем данные по месяцам для графика трендов
-    monthly_trends = (
-        Transaction.objects
-        .filter(user=request.user, category__in=categories)
-        .annotate(month=TruncMonth('date'))
-        .values('month')
-        .annotate(total=Sum('amount_base'))
-        .order_by('month')
-    )
-
-    trend_labels = [item['month'].strftime('%B %Y') for item in monthly_trends]
-    trend_values = [float(item['total']) for item in monthly_trends]
-
-    return render(request, 'budget/analytics.html', {
+    return {
         'labels': labels,
         'values': values,
         'colors': colors,
-        'month': month,
-        'available_months': available_months,
         'total_expenses': total_expenses,
         'avg_expense': avg_expense,
         'max_expense': max_expense,
         'categories_count': categories_count,
-        'trend_labels': trend_labels,
-        'trend_values': trend_values,
-    })
+    }
+
+def get_expense_trend(user):
+    """Расходы по месяцам за всю историю для графика трендов"""
+    monthly_trends = (
+        MonthlyRollup.objects
+        .filter(user=user, category__is_income=False)
+        .values('month')
+        .annotate(total=Sum('total_base'))
+        .order_by('month')
+    )
+
+    return {
+        'labels': [item['month'].strftime('%Y-%m') for item in monthly_trends],
+        'values': [float(item['total']) for item in monthly_trends],
+    }
 
 @login_required
 def export_transactions_csv(request):
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(
+        export_transactions(request.user, include_archive=bool(request.GET.get('archive'))),
+        content_type='text/csv; charset=utf-8',
+    )
     response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
-
-    # Добавляем BOM для корректного открытия в Excel
-    response.write('\ufeff'.encode('utf8'))
-
-    writer = csv.writer(response)
-    writer.writerow(['Дата', 'Категория', 'Сумма', 'Описание'])
-
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')
-    for t in transactions:
-        writer.writerow([t.date, t.category.name, t.amount, t.description])
-
     return response
 
 @login_required
@@ -222,76 +264,129 @@ def import_transactions_csv(request):
     if request.method == 'POST':
         form = ImportCSVForm(request.POST, request.FILES)
         if form.is_valid():
-            file = form.cleaned_data['file']
-            # Открываем файл с правильной кодировкой
-            csv_file = TextIOWrapper(file, encoding='utf-8')
-            reader = csv.reader(csv_file)
-            next(reader)  # Пропускаем заголовок
-            count = 0
-            for row in reader:
-                try:
-                    date, category_name, amount, description = row
-                    category, _ = Category.objects.get_or_create(
-                        user=request.user, name=category_name, is_income=False
-                    )
-                    Transaction.objects.create(
-                        user=request.user,
-                        category=category,
-                        amount=amount,
-                        date=date,
-                        description=description
-                    )
-                    count += 1
-                except Exception as e:
-                    continue
-            messages.success(request, f'Импортировано операций: {count}')
-            return redirect('dashboard')
+            report = import_transactions(request.user, form.cleaned_data['file'])
+            if not report.error_count:
+                messages.success(request, f'Импортировано операций: {report.created}')
+                return redirect('dashboard')
+            messages.warning(
+                request,
+                f'Импортировано операций: {report.created}, строк с ошибками: {report.error_count}'
+            )
+            return render(request, 'budget/import_csv.html', {'form': ImportCSVForm(), 'report': report})
     else:
         form = ImportCSVForm()
     return render(request, 'budget/import_csv.html', {'form': form})
 
+# CSRF проверяется после входа: скрипт без сессии получает 401, а не 403 middleware
+@csrf_exempt
+@api_login_required
+@csrf_protect
+@require_POST
+def transactions_batch(request):
+    """
+    Пакетное создание операций для синхронизации с банком и мобильного
+    приложения. Тело — JSON-массив объектов {date, category, amount,
+    currency, description}, не длиннее MAX_BATCH_SIZE; currency необязательна
+    (BYN). Ответ — результат по каждому элементу в том же порядке. С заголовком
+    Idempotency-Key повтор запроса возвращает первый ответ, не создавая операций.
+
+    Отдельных токенов нет: клиент работает с сессией Django. Скрипт получает
+    cookie csrftoken запросом GET /accounts/login/, входит POST-ом формы
+    (username, password, csrfmiddlewaretoken), затем шлёт запросы с cookie
+    sessionid и заголовком X-CSRFToken. Без сессии ответ — 401 с JSON,
+    без CSRF-токена — 403 от CsrfViewMiddleware.
+    """
+    try:
+        items = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'тело запроса — не JSON'}, status=400)
+    if not isinstance(items, list):
+        return JsonResponse({'error': 'ожидается массив операций'}, status=400)
+    if len(items) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'не более {MAX_BATCH_SIZE} операций за запрос'}, status=413)
+
+    def handler():
+        return 200, create_transactions(request.user, items).as_dict()
+
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        with db_transaction.atomic():
+            status, data = handler()
+        return JsonResponse(data, status=status)
+    if len(key) > idempotency.MAX_KEY_LENGTH:
+        return JsonResponse({'error': 'слишком длинный Idempotency-Key'}, status=400)
+    try:
+        status, data, replayed = idempotency.run_once(request.user, key, request.body, handler)
+    except idempotency.KeyReused:
+        return JsonResponse({'error': 'Idempotency-Key уже использован с другим телом запроса'}, status=422)
+    response = JsonResponse(data, status=status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
 @login_required
+@conditional_page
 def transactions_list(request):
-    transactions = Transaction.objects.filter(user=request.user)
     form = TransactionFilterForm(request.user, request.GET)
 
-    # Получаем все доступные месяцы для фильтрации
+    # Месяцы, за которые в таблице есть операции: в MonthlyRollup остаются и
+    # архивированные месяцы, а их страницы были бы пустыми
     available_months = (Transaction.objects
         .filter(user=request.user)
-        .dates('date', 'month', order='DESC')
-        .distinct())
-
-    if form.is_valid():
-        op_type = form.cleaned_data.get('operation_type')
-        if op_type == 'income':
-            transactions = transactions.filter(category__is_income=True)
-        elif op_type == 'expense':
-            transactions = transactions.filter(category__is_income=False)
-        if form.cleaned_data['search']:
-            transactions = transactions.filter(
-                description__icontains=form.cleaned_data['search']
-            )
-        if form.cleaned_data['category']:
-            transactions = transactions.filter(
-                category=form.cleaned_data['category']
-            )
-        if form.cleaned_data['date_from']:
-            transactions = transactions.filter(
-                date__gte=form.cleaned_data['date_from']
-            )
-        if form.cleaned_data['date_to']:
-            transactions = transactions.filter(
-                date__lte=form.cleaned_data['date_to']
-            )
-
-    transactions = transactions.select_related('category', 'currency').order_by('-date')
+        .dates('date', 'month', order='DESC'))
+
+    transactions = form.filter_queryset(Transaction.objects.filter(user=request.user))
+    page = paginate_keyset(
+        transactions.select_related('category', 'currency'),
+        ordering=form.ordering(),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=TRANSACTIONS_PER_PAGE,
+    )
 
     return render(request, 'budget/transactions_list.html', {
-        'transactions': transactions,
+        'transactions': page.items,
+        'page': page,
         'form': form,
         'available_months': available_months,
     })
 
+@api_login_required
+def transactions_json(request):
+    """
+    Операции пользователя в JSON: фильтры TransactionFilterForm, поля fields=,
+    размер страницы per_page=, курсоры after/before из next и previous
+    """
+    form = TransactionFilterForm(request.user, request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        per_page = api.parse_per_page(request.GET.get('per_page'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    ordering = form.ordering()
+    columns = api.columns(fields, ordering)
+    transactions = form.filter_queryset(Transaction.objects.filter(user=request.user))
+    try:
+        # Клиент, перебирающий страницы по курсорам, не должен молча вернуться к первой
+        page = paginate_keyset(
+            transactions.values_list(*columns, named=True),
+            ordering=ordering,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            per_page=per_page,
+            strict=True,
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': api.serialize(page.items, fields, columns),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
 @login_required
 def recurring_transactions(request):
     if request.method == 'POST':
@@ -306,7 +401,9 @@ def recurring_transactions(request):
     else:
         form = RecurringTransactionForm()
 
-    recurring_list = RecurringTransaction.objects.filter(user=request.user)
+    recurring_list = (RecurringTransaction.objects
+        .filter(user=request.user)
+        .select_related('category', 'currency'))
     return render(request, 'budget/recurring_transactions.html', {
         'form': form,
         'recurring_list': recurring_list
@@ -314,39 +411,15 @@ def recurring_transactions(request):
 
 @login_required
 def process_recurring_transactions(request):
-    today = timezone.now().date()
-    recurring = RecurringTransaction.objects.filter(
-        user=request.user,
-        is_active=True,
-        next_date__lte=today
-    )
-
-    created_count = 0
-    for item in recurring:
-        # Создаем транзакцию с учетом валюты
-        Transaction.objects.create(
-            user=request.user,
-            category=item.category,
-            amount=item.amount,
-            currency=item.currency,  # Добавляем валюту
-            date=item.next_date,
-            description=f"Регулярный платеж: {item.description}"
-        )
-        created_count += 1
-
-        # Обновляем дату следующей операции
-        if item.frequency == 'monthly':
-            item.next_date = item.next_date + timedelta(days=30)
-        elif item.frequency == 'weekly':
-            item.next_date = item.next_date + timedelta(days=7)
-        item.save()
-
-    messages.success(request, f'Создано {created_count} регулярных операций')
+    report = process_due(user=request.user)
+    messages.success(request, f'Создано {report.created} регулярных операций')
     return redirect('recurring_transactions')
 
 @login_required
 def delete_recurring_transaction(request, pk):
-    recurring = get_object_or_404(RecurringTransaction, pk=pk, user=request.user)
+    recurring = get_object_or_404(
+        RecurringTransaction.objects.select_related('category', 'currency'), pk=pk, user=request.user
+    )
     if request.method == 'POST':
         recurring.delete()
         messages.success(request, 'Регулярная операция удалена')
@@ -354,56 +427,98 @@ def delete_recurring_transaction(request, pk):
     return render(request, 'budget/delete_recurring.html', {'recurring': recurring})
 
 @login_required
+@conditional_page
 def monthly_summary(request):
-    # Получаем все транзакции пользователя, сгруппированные по месяцам
+    user_id = request.user.pk
+    yearly_summary = report_cache.get_or_compute(
+        user_id, 'yearly_summary', lambda: get_yearly_summary(request.user)
+    )
+
+    # Показываем по одному году, по умолчанию — последний
+    try:
+        year = int(request.GET.get('year', ''))
+    except ValueError:
+        year = None
+    if year not in yearly_summary:
+        year = next(iter(yearly_summary), date.today().year)
+
+    summary = report_cache.get_or_compute(
+        user_id, 'monthly_summary', lambda: get_year_summary(request.user, year), year
+    )
+
+    return render(request, 'budget/monthly_summary.html', {
+        'summary': summary,
+        'yearly_summary': yearly_summary,
+        'year': year,
+    })
+
+def get_yearly_summary(user):
+    """Итоги по годам, от последнего к первому; заодно дают список лет для навигации"""
+    yearly_totals = (
+        MonthlyRollup.objects
+        .filter(user=user)
+        .annotate(year=TruncYear('month'))
+        .values('year')
+        .annotate(
+            total_incomes_byn=Sum('total_base', filter=Q(category__is_income=True)),
+            total_expenses_byn=Sum('total_base', filter=Q(category__is_income=False)),
+        )
+        .order_by('-year')
+    )
+    return {
+        row['year'].year: {
+            'total_incomes_byn': row['total_incomes_byn'] or 0,
+            'total_expenses_byn': row['total_expenses_byn'] or 0,
+        }
+        for row in yearly_totals
+    }
+
+def get_year_summary(user, year):
+    """Итоги по месяцам года с планами месячных бюджетов"""
+    year_start, year_end = year_range(year)
+
+    # Получаем итоги пользователя за год, сгруппированные по месяцам
     monthly_transactions = (
-        Transaction.objects
-        .filter(user=request.user)
-        .annotate(month=TruncMonth('date'))
+        MonthlyRollup.objects
+        .filter(user=user, month__gte=year_start, month__lt=year_end)
         .values('month', 'currency__code', 'currency__symbol', 'category__is_income')
         .annotate(
-            total=Sum('amount'),
-            total_byn=Sum('amount_base')  # Сумма в BYN
+            total=Sum('total'),
+            total_byn=Sum('total_base')  # Сумма в BYN
         )
         .order_by('-month', 'currency__code')
     )
 
-    # Получаем все месяцы, за которые есть бюджеты
-    budgets = MonthlyBudget.objects.filter(user=request.user).order_by('-month')
+    # Бюджеты за год, по месяцам
+    budgets = {
+        month_start(budget.month): budget
+        for budget in MonthlyBudget.objects.filter(
+            user=user, month__gte=year_start, month__lt=year_end
+        )
+    }
 
-    # Группируем по месяцам
+    # Группируем по месяцам (строки уже отсортированы от новых к старым)
     summary = {}
-    yearly_summary = {}
 
     for transaction in monthly_transactions:
-        month_key = transaction['month'].strftime('%Y-%m')
-        year_key = transaction['month'].strftime('%Y')
-        
+        month = transaction['month']
+        month_key = month.strftime('%Y-%m')
+
         if month_key not in summary:
+            budget = budgets.get(month)
             summary[month_key] = {
+                'month': month,
                 'expenses': [],
                 'incomes': [],
                 'total_expenses_byn': 0,
                 'total_incomes_byn': 0,
-                'budget': None
-            }
-        
-        if year_key not in yearly_summary:
-            yearly_summary[year_key] = {
-                'total_expenses_byn': 0,
-                'total_incomes_byn': 0
-            }
-
-        # Добавляем данные о бюджете
-        for budget in budgets:
-            if budget.month.strftime('%Y-%m') == month_key:
-                summary[month_key]['budget'] = {
+                'budget': {
                     'income_plan': budget.income_plan,
                     'expense_plan': budget.expense_plan,
-                    'currency': budget.currency,
+                    'currency': get_currency(budget.currency_id),
                     'notes': budget.notes
-                }
-                break
+                } if budget else None
+            }
 
         # Добавляем транзакцию
         transaction_data = {
@@ -416,20 +531,11 @@ def monthly_summary(request):
         if transaction['category__is_income']:
             summary[month_key]['incomes'].append(transaction_data)
             summary[month_key]['total_incomes_byn'] += transaction['total_byn']
-            yearly_summary[year_key]['total_incomes_byn'] += transaction['total_byn']
         else:
             summary[month_key]['expenses'].append(transaction_data)
             summary[month_key]['total_expenses_byn'] += transaction['total_byn']
-            yearly_summary[year_key]['total_expenses_byn'] += transaction['total_byn']
 
-    # Сортируем по месяцам (от новых к старым)
-    summary = dict(sorted(summary.items(), reverse=True))
-    yearly_summary = dict(sorted(yearly_summary.items(), reverse=True))
-
-    return render(request, 'budget/monthly_summary.html', {
-        'summary': summary,
-        'yearly_summary': yearly_summary,
-    })
+    return summary
 
 @login_required
 def budget_settings(request):
@@ -446,35 +552,34 @@ def budget_settings(request):
     
     return render(request, 'budget/budget_settings.html', {'form': form})
 
-def get_monthly_summary(user, monthly_budget):
-    """Получение сводки по месячному бюджету"""
-    today = date.today()
-    
-    # Получаем все транзакции за текущий месяц
-    month_transactions = Transaction.objects.filter(
+def get_month_totals(user, month):
+    """Фактические доходы и расходы за месяц в BYN — одним запросом к итогам"""
+    totals = MonthlyRollup.objects.filter(
         user=user,
-        date__year=today.year,
-        date__month=today.month
+        **month_filter('month', month)
+    ).aggregate(
+        income=Sum('total_base', filter=Q(category__is_income=True)),
+        expenses=Sum('total_base', filter=Q(category__is_income=False)),
     )
-
-    # Считаем фактические доходы и расходы
-    actual_income = month_transactions.filter(
-        category__is_income=True
-    ).aggregate(total=Sum('amount_base'))['total'] or 0
-
-    actual_expenses = month_transactions.filter(
-        category__is_income=False
-    ).aggregate(total=Sum('amount_base'))['total'] or 0
-
-    # Конвертируем планы в базовую валюту (BYN)
-    income_plan_byn = monthly_budget.income_plan * monthly_budget.currency.rate
-    expense_plan_byn = monthly_budget.expense_plan * monthly_budget.currency.rate
+    return totals['income'] or 0, totals['expenses'] or 0
+
+def get_monthly_summary(user, monthly_budget, totals=None):
+    """Получение сводки по месячному бюджету; totals — готовый результат get_month_totals"""
+    if totals is None:
+        totals = get_month_totals(user, date.today())
+    actual_income, actual_expenses = totals
+
+    # Конвертируем планы в базовую валюту (BYN); валюта берётся из кеша
+    currency = get_currency(monthly_budget.currency_id)
+    rate = plan_rate(currency.pk, monthly_budget.month, date.today())
+    income_plan_byn = monthly_budget.income_plan * rate
+    expense_plan_byn = monthly_budget.expense_plan * rate
     
     return {
         'id': monthly_budget.id,
         'income_plan': monthly_budget.income_plan,
         'expense_plan': monthly_budget.expense_plan,
-        'currency': monthly_budget.currency,
+        'currency': currency,
         'income_plan_byn': income_plan_byn,
         'expense_plan_byn': expense_plan_byn,
         'actual_income': actual_income,
@@ -486,36 +591,80 @@ def get_monthly_summary(user, monthly_budget):
         'notes': monthly_budget.notes
     }
 
-def get_category_budget_data(user, budgets):
-    """Получение данных о бюджетах по категориям"""
+def plan_rate(currency_id, month, today):
+    """
+    Курс для плана или лимита месяца — из той же истории курсов, что и у
+    операций: на последний день прошедшего месяца, для текущего и будущих — на сегодня
+    """
+    last_day = add_months(month_start(month), 1) - timedelta(days=1)
+    return get_rate(currency_id, min(today, last_day))
+
+def month_elapsed_share(month, today):
+    """Доля прошедшего месяца: 0 для будущих, 1 для прошедших месяцев"""
+    if (month.year, month.month) < (today.year, today.month):
+        return 1
+    if (month.year, month.month) > (today.year, today.month):
+        return 0
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    return today.day / days_in_month
+
+
+def get_category_totals(user, months, categories=None):
+    """Потраченное и число операций по (категория, месяц) — одним запросом к итогам"""
+    rollups = MonthlyRollup.objects.filter(user=user, month__in=months)
+    if categories is not None:
+        rollups = rollups.filter(category__in=categories)
+    return {
+        (row['category_id'], row['month']): row
+        for row in rollups.values('category_id', 'month').annotate(
+            spent=Sum('total_base'), count=Sum('count')
+        )
+    }
+
+def get_category_budget_data(user, budgets, totals=None):
+    """Получение данных о бюджетах по категориям; totals — результат get_category_totals"""
     today = date.today()
+    budgets = list(budgets)
     budget_data = []
-    
+
+    if totals is None:
+        totals = get_category_totals(
+            user,
+            months={month_start(budget.month) for budget in budgets},
+            categories={budget.category_id for budget in budgets},
+        ) if budgets else {}
+
     for budget in budgets:
+        row = totals.get((budget.category_id, month_start(budget.month)), {})
         # Считаем потраченное в BYN (amount_base)
-        spent = Transaction.objects.filter(
-            user=user,
-            category=budget.category,
-            date__year=budget.month.year,
-            date__month=budget.month.month
-        ).aggregate(total=Sum('amount_base'))['total'] or 0
+        spent = row.get('spent') or 0
 
         # Лимит бюджета в BYN
-        budget_limit_byn = budget.limit * budget.currency.rate
+        currency = get_currency(budget.currency_id)
+        budget_limit_byn = budget.limit * plan_rate(currency.pk, budget.month, today)
 
         left = budget_limit_byn - spent
         exceeded = spent > budget_limit_byn
 
+        # Темп: какая часть лимита израсходована к текущему дню месяца
+        elapsed_share = month_elapsed_share(budget.month, today)
+        spent_share = float(spent / budget_limit_byn) if budget_limit_byn else 0
+
         budget_data.append({
             'category': budget.category,
             'limit': budget.limit,
-            'currency': budget.currency,
+            'currency': currency,
             'limit_byn': budget_limit_byn,
             'spent': spent,
             'left': left,
+            'overrun': -left,
             'exceeded': exceeded,
+            'used_percent': spent_share * 100,
+            'count': row.get('count') or 0,
+            'elapsed_percent': elapsed_share * 100,
+            'ahead_of_pace': spent_share > elapsed_share,
         })
-    
+
     return budget_data
 
 @login_required
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'budget',
     'crispy_forms',
     'crispy_bootstrap5',
@@ -47,6 +48,8 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    # Первым: в замер попадают все остальные middleware
+    'budget.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +63,10 @@ ROOT_URLCONF = 'finance_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки (budget.timing). Без
+        # OPTIONS['loaders'] Django оборачивает загрузчики в cached.Loader:
+        # шаблоны разбираются один раз на процесс (при DEBUG — до изменения файла)
+        'BACKEND': 'budget.timing.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,6 +82,35 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'finance_manager.wsgi.application'
 
+# Замер запросов (budget.timing): доля запросов с заголовком Server-Timing и
+# строкой в журнале budget.timing, число самых медленных SQL в строке журнала
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get("DJANGO_TIMING_SAMPLE_RATE", "0.1"))
+REQUEST_TIMING_SLOW_QUERIES = int(os.environ.get("DJANGO_TIMING_SLOW_QUERIES", "3"))
+
+# Метрики Prometheus (budget.metrics) на /metrics: только с этих адресов и,
+# если задан токен, с заголовком Authorization: Bearer <токен>. Под gunicorn
+# нужен общий каталог PROMETHEUS_MULTIPROC_DIR (см. gunicorn.conf.py).
+METRICS_ENABLED = os.environ.get("DJANGO_METRICS", "1") == "1"
+METRICS_ALLOWED_NETWORKS = os.environ.get(
+    "DJANGO_METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128"
+).split(",")
+METRICS_TOKEN = os.environ.get("DJANGO_METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        # Одна строка JSON на измеренный запрос
+        "budget.timing": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -83,12 +118,49 @@ WSGI_APPLICATION = 'finance_manager.wsgi.application'
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get("POSTGRES_DB", "budget"),
         "USER": os.environ.get("POSTGRES_USER", "budget"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "my_budget"),
         "HOST": os.environ.get("POSTGRES_HOST", "postgres"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", "0")),
+        # Проверка соединения перед повторным использованием: постоянного (CONN_MAX_AGE > 0)
+        # или взятого из пула — лишний round-trip, зато без ошибок после рестарта базы
+        "CONN_HEALTH_CHECKS": os.environ.get("POSTGRES_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": {},
+    }
+}
+
+# Пул соединений psycopg 3 — по одному на процесс. Несовместим с CONN_MAX_AGE > 0.
+# Синхронному воркеру gunicorn нужно одно соединение; под ASGI
+# нужно не меньше ASYNC_DB_WORKERS + 1. Статистика: python manage.py pool_stats.
+if os.environ.get("POSTGRES_POOL", "0") == "1":
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "4")),
+        # Сколько секунд ждать свободного соединения, прежде чем вернуть ошибку
+        "timeout": float(os.environ.get("POSTGRES_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.environ.get("POSTGRES_POOL_MAX_IDLE", "600")),
+        "max_lifetime": float(os.environ.get("POSTGRES_POOL_MAX_LIFETIME", "3600")),
+    }
+
+# Асинхронные dashboard и аналитика (budget.async_views) — только для запуска под ASGI.
+# ASYNC_DB_WORKERS — число потоков (и соединений с базой) для параллельных запросов.
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "0") == "1"
+ASYNC_DB_WORKERS = int(os.environ.get("DJANGO_ASYNC_DB_WORKERS", "4"))
+
+
+# Cache
+# Версия справочника валют хранится в кеше, поэтому воркерам gunicorn нужен
+# общий бэкенд (файловый, memcached, redis); locmem подходит для одного процесса.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "budget"),
     }
 }
 
@@ -0,0 +1,23 @@
+"""
+Настройки gunicorn: загружаются автоматически при запуске из корня проекта.
+
+Метрики Prometheus собираются по всем воркерам через каталог
+PROMETHEUS_MULTIPROC_DIR (см. budget/metrics.py): он очищается при старте
+сервера, а файлы завершившихся воркеров помечаются, чтобы их датчики
+(gauge) не попадали в сумму.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)